@@ -0,0 +1,93 @@
+"""Описание полей ресурсов API.
+
+Клиент выбирает поля параметром ?fields=id,text,author; запрос к базе
+строится только под них: в only() попадают нужные колонки, а в
+select_related - только связи выбранных полей, так что ни одно поле не
+догружается отдельным запросом.
+"""
+from collections import namedtuple
+
+from posts.models import Comment, Group, Post
+
+# columns - колонки для only(), related - связь для select_related,
+# get - значение поля у объекта.
+Field = namedtuple('Field', 'columns related get')
+
+
+def image_url(post):
+    return post.image.url if post.image else None
+
+
+class Resource:
+    def __init__(self, model, fields, key_columns=('id',)):
+        self.model = model
+        self.fields = fields
+        # Колонки, нужные независимо от выбранных полей: ключ курсора.
+        self.key_columns = key_columns
+
+    def parse_fields(self, value):
+        """Имена полей из ?fields=; ValueError для неизвестных."""
+        if not value:
+            return list(self.fields)
+        names = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown or not names:
+            raise ValueError(
+                f'Неизвестные поля: {", ".join(unknown)}. '
+                f'Доступны: {", ".join(self.fields)}'
+            )
+        return names
+
+    def select(self, queryset, names):
+        """queryset, загружающий только колонки и связи полей names."""
+        fields = [self.fields[name] for name in names]
+        related = {field.related for field in fields if field.related}
+        columns = set(self.key_columns)
+        for field in fields:
+            columns.update(field.columns)
+        if related:
+            # Без аргументов select_related пошёл бы по всем связям.
+            queryset = queryset.select_related(*sorted(related))
+        return queryset.only(*sorted(columns))
+
+    def serialize(self, obj, names):
+        return {name: self.fields[name].get(obj) for name in names}
+
+
+POSTS = Resource(Post, {
+    'id': Field(('id',), None, lambda post: post.pk),
+    'text': Field(('text',), None, lambda post: post.text),
+    'pub_date': Field(('pub_date',), None, lambda post: post.pub_date),
+    'author': Field(
+        ('author', 'author__username'), 'author',
+        lambda post: post.author.username,
+    ),
+    'group': Field(
+        ('group', 'group__slug'), 'group',
+        lambda post: post.group.slug if post.group_id else None,
+    ),
+    'image': Field(('image',), None, image_url),
+    'comment_count': Field(
+        ('comment_count',), None, lambda post: post.comment_count
+    ),
+}, key_columns=('id', 'pub_date'))
+
+COMMENTS = Resource(Comment, {
+    'id': Field(('id',), None, lambda comment: comment.pk),
+    'post': Field(('post',), None, lambda comment: comment.post_id),
+    'author': Field(
+        ('author', 'author__username'), 'author',
+        lambda comment: comment.author.username,
+    ),
+    'text': Field(('text',), None, lambda comment: comment.text),
+    'pub_date': Field(('pub_date',), None, lambda comment: comment.pub_date),
+}, key_columns=('id', 'pub_date'))
+
+GROUPS = Resource(Group, {
+    'id': Field(('id',), None, lambda group: group.pk),
+    'slug': Field(('slug',), None, lambda group: group.slug),
+    'title': Field(('title',), None, lambda group: group.title),
+    'description': Field(
+        ('description',), None, lambda group: group.description
+    ),
+})
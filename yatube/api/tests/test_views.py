@@ -0,0 +1,179 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='Author')
+        cls.reader = User.objects.create(username='Reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        Group.objects.create(title='Другая', slug='other', description='')
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author,
+                group=cls.group if i % 2 else None,
+                text=f'Пост {i}',
+            )
+            for i in range(5)
+        ]
+        Post.objects.create(author=cls.reader, text='Пост читателя')
+        cls.post = cls.posts[-1]
+        for i in range(3):
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text=f'Комментарий {i}'
+            )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def collect(self, url, client=None, **params):
+        """Все страницы списка, по курсорам."""
+        client = client or self.client
+        results = []
+        while True:
+            data = client.get(url, params).json()
+            results.extend(data['results'])
+            if not data['next_cursor']:
+                return results
+            params['cursor'] = data['next_cursor']
+
+    def test_posts_cursor_pagination(self):
+        """Курсоры проходят все посты от новых к старым без повторов"""
+        results = self.collect(reverse('api:posts'), limit=2)
+        self.assertEqual(
+            [post['id'] for post in results],
+            list(Post.objects.order_by('-pub_date', '-pk').values_list(
+                'pk', flat=True
+            )),
+        )
+        self.assertEqual(results[-1], {
+            'id': self.posts[0].pk,
+            'text': 'Пост 0',
+            'pub_date': results[-1]['pub_date'],
+            'author': 'Author',
+            'group': None,
+            'image': None,
+            'comment_count': 0,
+        })
+
+    def test_sparse_fields_limit_query(self):
+        """Запрос читает только колонки и связи выбранных полей"""
+        url = reverse('api:posts')
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(url, {'fields': 'id,text'}).json()
+        self.assertEqual(set(data['results'][0]), {'id', 'text'})
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('auth_user', queries[0]['sql'])
+        self.assertNotIn('comment_count', queries[0]['sql'])
+        with self.assertNumQueries(1):
+            data = self.client.get(url, {'fields': 'author,group'}).json()
+        self.assertEqual(data['results'][2], {
+            'author': 'Author', 'group': 'group',
+        })
+
+    def test_filters(self):
+        """Посты фильтруются по группе и автору"""
+        url = reverse('api:posts')
+        results = self.collect(url, group='group', author='Author')
+        self.assertEqual(len(results), 2)
+        self.assertEqual({post['group'] for post in results}, {'group'})
+
+    def test_bad_parameters(self):
+        """Неверные поля, размер страницы и курсор - ошибка 400"""
+        url = reverse('api:posts')
+        for params in (
+            {'fields': 'id,password'},
+            {'limit': 0},
+            {'limit': 'много'},
+            {'cursor': 'мусор'},
+        ):
+            with self.subTest(params=params):
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+
+    def test_details(self):
+        """Пост, группа и комментарий по id, отсутствующие - 404"""
+        comment = self.post.comments.first()
+        urls = {
+            reverse('api:post_detail', args=[self.post.pk]): self.post.text,
+            reverse('api:group_detail', args=['group']): 'Группа',
+            reverse('api:comment_detail', args=[comment.pk]): comment.text,
+        }
+        for url, text in urls.items():
+            with self.subTest(url=url):
+                self.assertIn(text, self.client.get(url).json().values())
+        for url in (
+            reverse('api:post_detail', args=[0]),
+            reverse('api:group_detail', args=['missing']),
+            reverse('api:comment_detail', args=[0]),
+            reverse('api:post_comments', args=[0]),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response.json(), {'error': 'Не найдено'})
+
+    def test_lists(self):
+        """Комментарии поста и группы постранично"""
+        comments = self.collect(
+            reverse('api:post_comments', args=[self.post.pk]),
+            limit=2, fields='text,author',
+        )
+        self.assertEqual(comments, [
+            {'text': f'Комментарий {i}', 'author': 'Reader'}
+            for i in (2, 1, 0)
+        ])
+        groups = self.collect(reverse('api:groups'), limit=1, fields='slug')
+        self.assertEqual(groups, [{'slug': 'group'}, {'slug': 'other'}])
+
+    def test_follow_feed(self):
+        """Лента подписок только для вошедших и только из подписок"""
+        url = reverse('api:follow')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        results = self.collect(url, self.reader_client, fields='author')
+        self.assertEqual(results, [{'author': 'Author'}] * 5)
+
+    def test_read_only(self):
+        """API только читает"""
+        response = self.reader_client.post(reverse('api:posts'))
+        self.assertEqual(response.status_code, 405)
+
+    @override_settings(API_EXPORT_CHUNK_SIZE=2)
+    def test_export_streams_chunks(self):
+        """Выгрузка отдаёт весь массив кусками по API_EXPORT_CHUNK_SIZE"""
+        response = self.client.get(
+            reverse('api:export_posts'), {'fields': 'id,group'}
+        )
+        self.assertTrue(response.streaming)
+        chunks = [
+            chunk.decode() for chunk in response.streaming_content
+        ]
+        self.assertEqual(len(chunks), 2 + 3)
+        exported = json.loads(''.join(chunks))
+        self.assertEqual(
+            [post['id'] for post in exported],
+            list(Post.objects.order_by('pk').values_list('pk', flat=True)),
+        )
+        response = self.client.get(
+            reverse('api:export_comments'), {'post': self.post.pk}
+        )
+        exported = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(len(exported), 3)
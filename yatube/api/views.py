@@ -0,0 +1,233 @@
+"""JSON API только для чтения.
+
+Списки отдаются страницами по курсору: {"results": [...],
+"next_cursor": ..., "previous_cursor": ...}, размер страницы задаёт
+?limit=, набор полей - ?fields=. Выгрузки /export/ отдают все строки
+одним массивом JSON, который кодируется по мере чтения из базы.
+"""
+from functools import wraps
+from itertools import islice
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.encoding import force_str
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+from django.views.decorators.http import require_GET
+
+from posts.models import Comment, Group, Post, TimelineEntry
+from posts.paginator import KeysetPaginator
+from posts.timeline import TimelinePaginator, pulled_posts
+
+from .resources import COMMENTS, GROUPS, POSTS
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def api_view(view):
+    """Только GET; ApiError превращается в ответ {"error": ...}."""
+    @require_GET
+    @wraps(view)
+    def inner(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except ApiError as error:
+            return JsonResponse({'error': error.message}, status=error.status)
+    return inner
+
+
+def not_found():
+    return ApiError('Не найдено', status=404)
+
+
+def requested_fields(request, resource):
+    try:
+        return resource.parse_fields(request.GET.get('fields'))
+    except ValueError as error:
+        raise ApiError(str(error))
+
+
+def page_size(request):
+    limit = request.GET.get('limit')
+    if limit is None:
+        return settings.API_PAGE_SIZE
+    maximum = settings.API_MAX_PAGE_SIZE
+    try:
+        limit = int(limit)
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= maximum:
+        raise ApiError(f'limit - целое число от 1 до {maximum}')
+    return limit
+
+
+def keyset_page(request, queryset, paginator_class=KeysetPaginator, **kwargs):
+    """Страница по курсору из (pub_date, id), без COUNT и OFFSET."""
+    cursor = request.GET.get('cursor')
+    if cursor and KeysetPaginator.decode_cursor(cursor) is None:
+        raise ApiError('Неверный курсор')
+    paginator = paginator_class(
+        queryset, page_size(request), max_offset_pages=1, **kwargs
+    )
+    return paginator.get_page(cursor=cursor)
+
+
+def page_response(resource, names, page):
+    return JsonResponse({
+        'results': [resource.serialize(obj, names) for obj in page],
+        'next_cursor': page.next_cursor,
+        'previous_cursor': page.previous_cursor,
+    })
+
+
+def detail_response(resource, names, queryset):
+    obj = resource.select(queryset, names).first()
+    if obj is None:
+        raise not_found()
+    return JsonResponse(resource.serialize(obj, names))
+
+
+def filter_posts(request, queryset):
+    group = request.GET.get('group')
+    if group:
+        queryset = queryset.filter(group__slug=group)
+    author = request.GET.get('author')
+    if author:
+        queryset = queryset.filter(author__username=author)
+    return queryset
+
+
+def stream_json(resource, names, queryset):
+    """Массив JSON по кускам: в памяти не больше API_EXPORT_CHUNK_SIZE
+    объектов, сколько бы строк ни было в выгрузке."""
+    chunk_size = settings.API_EXPORT_CHUNK_SIZE
+    encode = DjangoJSONEncoder(ensure_ascii=False).encode
+    rows = resource.select(queryset, names).iterator(chunk_size=chunk_size)
+    yield '['
+    separator = ''
+    while True:
+        chunk = [
+            encode(resource.serialize(obj, names))
+            for obj in islice(rows, chunk_size)
+        ]
+        if not chunk:
+            break
+        yield separator + ','.join(chunk)
+        separator = ','
+    yield ']'
+
+
+def export_response(request, resource, queryset):
+    names = requested_fields(request, resource)
+    return StreamingHttpResponse(
+        stream_json(resource, names, queryset.order_by('pk')),
+        content_type='application/json',
+    )
+
+
+@api_view
+def posts(request):
+    names = requested_fields(request, POSTS)
+    queryset = filter_posts(request, POSTS.select(Post.objects.all(), names))
+    return page_response(POSTS, names, keyset_page(request, queryset))
+
+
+@api_view
+def post_detail(request, post_id):
+    names = requested_fields(request, POSTS)
+    return detail_response(POSTS, names, Post.objects.filter(pk=post_id))
+
+
+@api_view
+def post_comments(request, post_id):
+    names = requested_fields(request, COMMENTS)
+    page = keyset_page(request, COMMENTS.select(
+        Comment.objects.filter(post_id=post_id), names
+    ))
+    if not page and not Post.objects.filter(pk=post_id).exists():
+        raise not_found()
+    return page_response(COMMENTS, names, page)
+
+
+@api_view
+def comment_detail(request, comment_id):
+    names = requested_fields(request, COMMENTS)
+    return detail_response(
+        COMMENTS, names, Comment.objects.filter(pk=comment_id)
+    )
+
+
+def encode_id_cursor(pk):
+    return urlsafe_base64_encode(str(pk).encode())
+
+
+def decode_id_cursor(cursor):
+    try:
+        return int(force_str(urlsafe_base64_decode(cursor)))
+    except (TypeError, ValueError):
+        raise ApiError('Неверный курсор')
+
+
+@api_view
+def groups(request):
+    """Группы по возрастанию id; групп немного, курсор - id последней."""
+    names = requested_fields(request, GROUPS)
+    limit = page_size(request)
+    queryset = GROUPS.select(Group.objects.order_by('pk'), names)
+    cursor = request.GET.get('cursor')
+    if cursor:
+        queryset = queryset.filter(pk__gt=decode_id_cursor(cursor))
+    rows = list(queryset[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_id_cursor(rows[-1].pk)
+    return JsonResponse({
+        'results': [GROUPS.serialize(group, names) for group in rows],
+        'next_cursor': next_cursor,
+        'previous_cursor': None,
+    })
+
+
+@api_view
+def group_detail(request, slug):
+    names = requested_fields(request, GROUPS)
+    return detail_response(GROUPS, names, Group.objects.filter(slug=slug))
+
+
+@api_view
+def follow_feed(request):
+    """Лента подписок вошедшего пользователя, как на странице follow."""
+    if not request.user.is_authenticated:
+        raise ApiError('Нужно войти', status=401)
+    names = requested_fields(request, POSTS)
+    page = keyset_page(
+        request,
+        TimelineEntry.objects.filter(user=request.user),
+        TimelinePaginator,
+        pulled=pulled_posts(request.user),
+    )
+    return page_response(POSTS, names, page)
+
+
+@api_view
+def export_posts(request):
+    return export_response(
+        request, POSTS, filter_posts(request, Post.objects.all())
+    )
+
+
+@api_view
+def export_comments(request):
+    queryset = Comment.objects.all()
+    post = request.GET.get('post')
+    if post:
+        if not post.isdigit():
+            raise ApiError('post - id поста')
+        queryset = queryset.filter(post_id=post)
+    return export_response(request, COMMENTS, queryset)
@@ -0,0 +1,90 @@
+"""Бенчмарки проекта.
+
+Запускаются из каталога yatube как модули: python -m benchmarks.<имя>.
+"""
+import json
+import logging
+import math
+import multiprocessing
+import os
+import statistics
+
+import django
+
+
+def setup():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+    django.setup()
+
+
+def write_results(results, path):
+    """Печатает результаты и, если задан путь, сохраняет их в JSON."""
+    for name, values in results.items():
+        line = ', '.join(f'{key}={value}' for key, value in values.items())
+        print(f'{name}: {line}')
+    if path:
+        with open(path, 'w') as output:
+            json.dump(results, output, indent=2, ensure_ascii=False)
+
+
+def serve(queue, environ):
+    """Многопоточный WSGI-сервер проекта, порт уходит в queue."""
+    os.environ.update(environ)
+    setup()
+    from django.conf import settings
+    from django.core.servers.basehttp import (
+        ThreadedWSGIServer, WSGIRequestHandler
+    )
+    from django.core.wsgi import get_wsgi_application
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    application = get_wsgi_application()
+    settings.DEBUG = False
+    logging.getLogger('core.profiling').disabled = True
+    server = ThreadedWSGIServer(('127.0.0.1', 0), QuietHandler)
+    server.set_app(application)
+    queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+def start_server(target=serve, **environ):
+    """Запускает target (по умолчанию serve) в отдельном процессе.
+
+    Возвращает процесс и порт сервера.
+    """
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(
+        target=target, args=(queue, environ), daemon=True
+    )
+    process.start()
+    return process, queue.get()
+
+
+def session_cookie(user_id):
+    """Cookie сессии, в которой пользователь уже вошёл."""
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.test import Client
+
+    client = Client()
+    client.force_login(get_user_model().objects.get(pk=user_id))
+    session = client.cookies[settings.SESSION_COOKIE_NAME].value
+    return f'{settings.SESSION_COOKIE_NAME}={session}'
+
+
+def latency_stats(latencies, prefix=''):
+    """Медиана и 99-й перцентиль задержек в миллисекундах."""
+    if len(latencies) < 2:
+        return {}
+    ordered = sorted(latencies)
+    # 99-й перцентиль по ближайшему рангу: statistics.quantiles есть
+    # только с Python 3.8.
+    p99 = ordered[math.ceil(len(ordered) * 0.99) - 1]
+    return {
+        f'{prefix}p50_ms': round(statistics.median(ordered) * 1000, 2),
+        f'{prefix}p99_ms': round(p99 * 1000, 2),
+    }
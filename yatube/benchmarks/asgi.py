@@ -0,0 +1,307 @@
+"""Страницы постов под WSGI и ASGI при многих одновременных соединениях.
+
+WSGI - многопоточный сервер Django, поток на соединение. ASGI -
+yatube.asgi за минимальным HTTP/1.1-сервером на asyncio из этого модуля
+(готовых ASGI-серверов в зависимостях проекта нет): соединения
+обслуживает цикл событий, Django выполняется в пуле из ASGI_THREADS
+потоков. Каждое из --connections соединений шлёт запросы по очереди
+через keep-alive, адреса страниц index, group_posts, profile,
+post_detail и follow_index перемешаны; --idle соединений всё время
+замера открыты и молчат, как медленные клиенты. Кроме запросов в секунду
+и задержек выводятся запросы без ответа за 30 секунд и наибольшее число
+потоков процесса сервера.
+
+    python -m benchmarks.asgi --connections 8 64 256 --idle 200
+"""
+import argparse
+import asyncio
+import itertools
+import logging
+import os
+import random
+import socket
+import tempfile
+import threading
+import time
+from http import HTTPStatus
+from http.client import HTTPConnection, HTTPException
+from urllib.parse import unquote
+
+from benchmarks import (
+    latency_stats, session_cookie, setup, start_server, write_results
+)
+from benchmarks.views import VIEWS, pick_targets, prepare
+
+
+async def read_request(reader):
+    """Метод, адрес, заголовки и тело запроса; None, если клиент ушёл."""
+    line = await reader.readline()
+    if not line:
+        return None
+    method, target, _ = line.decode('latin-1').split()
+    headers = []
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, value = line.split(b':', 1)
+        headers.append((name.strip().lower(), value.strip()))
+    length = int(dict(headers).get(b'content-length', 0))
+    body = await reader.readexactly(length) if length else b''
+    return method, target, headers, body
+
+
+class ResponseWriter:
+    """send ASGI: ответ без Content-Length уходит с chunked-кодированием."""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.chunked = False
+
+    async def __call__(self, message):
+        if message['type'] == 'http.response.start':
+            self.start(message['status'], message['headers'])
+            return
+        data = message.get('body', b'')
+        if not self.chunked:
+            self.writer.write(data)
+        elif data:
+            self.writer.write(b'%x\r\n%s\r\n' % (len(data), data))
+        if self.chunked and not message.get('more_body'):
+            self.writer.write(b'0\r\n\r\n')
+        await self.writer.drain()
+
+    def start(self, status, headers):
+        lines = [f'HTTP/1.1 {status} {HTTPStatus(status).phrase}']
+        lines.extend(
+            f'{name.decode("latin-1")}: {value.decode("latin-1")}'
+            for name, value in headers
+        )
+        self.chunked = all(
+            name.lower() != b'content-length' for name, _ in headers
+        )
+        if self.chunked:
+            lines.append('Transfer-Encoding: chunked')
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+
+
+async def serve_connection(application, reader, writer):
+    """Запросы одного соединения HTTP/1.1 по очереди."""
+    server = writer.get_extra_info('sockname')[:2]
+    client = writer.get_extra_info('peername')[:2]
+    try:
+        while True:
+            request = await read_request(reader)
+            if request is None:
+                return
+            method, target, headers, body = request
+            path, _, query = target.partition('?')
+            scope = {
+                'type': 'http',
+                'http_version': '1.1',
+                'method': method,
+                'scheme': 'http',
+                'path': unquote(path),
+                'raw_path': path.encode('latin-1'),
+                'root_path': '',
+                'query_string': query.encode('latin-1'),
+                'headers': headers,
+                'server': server,
+                'client': client,
+            }
+            messages = [{'type': 'http.request', 'body': body}]
+
+            async def receive():
+                if messages:
+                    return messages.pop()
+                return {'type': 'http.disconnect'}
+
+            await application(scope, receive, ResponseWriter(writer))
+            if dict(headers).get(b'connection', b'').lower() == b'close':
+                return
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+def serve_asgi(queue, environ):
+    """ASGI-приложение проекта за сервером на asyncio, порт уходит в queue."""
+    os.environ.update(environ)
+    setup()
+    from django.conf import settings
+    from yatube.asgi import application
+
+    settings.DEBUG = False
+    logging.getLogger('core.profiling').disabled = True
+
+    async def main():
+        server = await asyncio.start_server(
+            lambda reader, writer: serve_connection(
+                application, reader, writer
+            ),
+            '127.0.0.1',
+            0,
+            backlog=1024,
+        )
+        queue.put(server.sockets[0].getsockname()[1])
+        await server.serve_forever()
+
+    asyncio.run(main())
+
+
+def thread_count(pid):
+    """Число потоков процесса по /proc; None, где его нет."""
+    try:
+        with open(f'/proc/{pid}/status') as status:
+            for line in status:
+                if line.startswith('Threads:'):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+
+
+def fetch(connection, url, cookie):
+    """Задержка GET-запроса url по соединению connection."""
+    began = time.perf_counter()
+    connection.request('GET', url, headers={'Cookie': cookie})
+    response = connection.getresponse()
+    response.read()
+    assert response.status == 200, (url, response.status)
+    return time.perf_counter() - began
+
+
+def login_cookies(targets):
+    """Cookie сессий пользователей из targets; гостю - пустая."""
+    cookies = {None: ''}
+    for _, user_id in targets:
+        if user_id not in cookies:
+            cookies[user_id] = session_cookie(user_id)
+    return cookies
+
+
+class ThreadSampler(threading.Thread):
+    """Наибольшее число потоков процесса pid, пока не вызван stop."""
+
+    def __init__(self, pid):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.done = threading.Event()
+        self.peak = None
+
+    def run(self):
+        while not self.done.wait(0.05):
+            count = thread_count(self.pid)
+            if count is not None:
+                self.peak = max(self.peak or 0, count)
+
+    def stop(self):
+        self.done.set()
+        self.join()
+        return self.peak
+
+
+def run_load(port, pid, targets, requests, connections, idle):
+    """connections keep-alive соединений делят requests запросов к серверу.
+
+    pid - процесс сервера, у которого замеряется наибольшее число потоков.
+    """
+    cookies = login_cookies(targets)
+    idle_sockets = [
+        socket.create_connection(('127.0.0.1', port)) for _ in range(idle)
+    ]
+    lock = threading.Lock()
+    jobs = itertools.islice(itertools.cycle(targets), requests)
+    latencies, errors = [], []
+
+    def worker():
+        connection = HTTPConnection('127.0.0.1', port, timeout=30)
+        while True:
+            with lock:
+                job = next(jobs, None)
+            if job is None:
+                connection.close()
+                return
+            url, user_id = job
+            try:
+                latency = fetch(connection, url, cookies[user_id])
+            except (OSError, HTTPException):
+                # Не дождались соединения или ответа за timeout.
+                connection.close()
+                with lock:
+                    errors.append(url)
+                continue
+            with lock:
+                latencies.append(latency)
+
+    sampler = ThreadSampler(pid)
+    sampler.start()
+    threads = [threading.Thread(target=worker) for _ in range(connections)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    for idle_socket in idle_sockets:
+        idle_socket.close()
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'rps': round(len(latencies) / elapsed, 1),
+        **latency_stats(latencies),
+        'server_threads': sampler.stop(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument(
+        '--database',
+        default=os.path.join(tempfile.gettempdir(), 'yatube_bench.sqlite3'),
+        help='Файл базы; если его нет, он создаётся и заполняется.',
+    )
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--posts', type=int, default=20000)
+    parser.add_argument('--comments', type=int, default=50000)
+    parser.add_argument('--follows', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Сколько процессов заполняют базу.')
+    parser.add_argument('--urls', type=int, default=20,
+                        help='Сколько разных адресов на страницу.')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--connections', type=int, nargs='+',
+                        default=(8, 64, 256))
+    parser.add_argument('--idle', type=int, default=0,
+                        help='Сколько молчащих соединений держать открытыми.')
+    parser.add_argument('--servers', nargs='+', choices=('wsgi', 'asgi'),
+                        default=('wsgi', 'asgi'))
+    parser.add_argument('--json', help='Куда сохранить результаты.')
+    args = parser.parse_args()
+
+    prepare(args.database, args)
+    by_view = pick_targets(args.urls, args.seed)
+    targets = [target for view in VIEWS for target in by_view[view]]
+    random.Random(args.seed).shuffle(targets)
+    servers = {'wsgi': {}, 'asgi': {'target': serve_asgi}}
+    results = {}
+    for name in args.servers:
+        server, port = start_server(
+            YATUBE_DATABASE=args.database, **servers[name]
+        )
+        try:
+            run_load(port, server.pid, targets, len(targets), 1, 0)
+            for connections in args.connections:
+                results[f'{name}:{connections}'] = run_load(
+                    port, server.pid, targets, args.requests, connections,
+                    args.idle,
+                )
+        finally:
+            server.terminate()
+            server.join()
+    write_results(results, args.json)
+
+
+if __name__ == '__main__':
+    main()
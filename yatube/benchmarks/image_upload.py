@@ -0,0 +1,104 @@
+"""Память и время на одну загрузку картинки поста.
+
+Сравнивает прежнее сохранение оригинала (только проверка ImageField) с
+нормализацией posts.images. Каждый режим работает в отдельном процессе:
+пиковый RSS учитывает и буферы Pillow, которые не видит tracemalloc.
+
+    python -m benchmarks.image_upload --width 6000 --height 4000
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks import setup, write_results
+
+MODES = ('store', 'normalize')
+
+
+def make_photo(path, width, height):
+    """Шумная фотография с EXIF, плохо сжимаемая, как снимок с камеры."""
+    from PIL import Image
+
+    image = Image.effect_noise((width, height), 64).convert('RGB')
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    exif[0x010F] = 'Camera'
+    image.save(path, 'JPEG', quality=95, exif=exif.tobytes())
+
+
+def upload_from(path):
+    """Загрузка во временном файле, как её передаёт Django."""
+    from django.core.files.uploadedfile import TemporaryUploadedFile
+
+    upload = TemporaryUploadedFile(
+        os.path.basename(path), 'image/jpeg', os.path.getsize(path), None
+    )
+    with open(path, 'rb') as source:
+        shutil.copyfileobj(source, upload)
+    upload.seek(0)
+    return upload
+
+
+def run_mode(mode, path, uploads, queue):
+    setup()
+    from posts.forms import PostForm
+    from posts.images import normalize_image
+
+    field = PostForm.base_fields['image']
+    files = [upload_from(path) for _ in range(uploads)]
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    start = time.perf_counter()
+    stored = 0
+    for upload in files:
+        image = field.clean(upload)
+        if mode == 'normalize':
+            image = normalize_image(image)
+        with tempfile.TemporaryFile() as destination:
+            for chunk in image.chunks():
+                destination.write(chunk)
+            stored += destination.tell()
+    elapsed = time.perf_counter() - start
+    python_peak = tracemalloc.get_traced_memory()[1]
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put({
+        'uploads': uploads,
+        'ms_per_upload': round(elapsed * 1000 / uploads, 1),
+        'rss_peak_mb': round((peak - baseline) / 1024, 1),
+        'python_peak_mb': round(python_peak / 2 ** 20, 1),
+        'stored_kb_per_upload': round(stored / 1024 / uploads, 1),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--width', type=int, default=4000)
+    parser.add_argument('--height', type=int, default=3000)
+    parser.add_argument('--uploads', type=int, default=5)
+    parser.add_argument('--json', help='Куда сохранить результаты.')
+    args = parser.parse_args()
+    context = multiprocessing.get_context('spawn')
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'photo.jpg')
+        make_photo(path, args.width, args.height)
+        original_kb = round(os.path.getsize(path) / 1024, 1)
+        for mode in MODES:
+            queue = context.Queue()
+            process = context.Process(
+                target=run_mode, args=(mode, path, args.uploads, queue)
+            )
+            process.start()
+            results[mode] = queue.get()
+            process.join()
+            results[mode]['original_kb'] = original_kb
+    write_results(results, args.json)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""Чтение и запись под одновременной нагрузкой: SQLite как есть и с
+настройками core.backends.sqlite3.
+
+Для каждого режима запускается WSGI-сервер над копией одной и той же
+базы. Читатели запрашивают страницы постов и профилей, писатели
+комментируют посты и публикуют новые. Каждый поток держит одно
+keep-alive соединение, так что в режиме tuned соединение с базой
+переживает запрос (CONN_MAX_AGE). Ошибки - ответы 5xx, обычно
+«database is locked».
+
+    python -m benchmarks.sqlite_tuning --seconds 10 --readers 8 --writers 4
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from http.client import HTTPConnection
+from urllib.parse import urlencode
+
+from benchmarks import (
+    latency_stats, session_cookie, setup, start_server, write_results
+)
+
+MODES = {'stock': '0', 'tuned': '1'}
+# Значение cookie и заголовка CSRF; Django принимает такой секрет как есть.
+CSRF_TOKEN = 'b' * 32
+
+
+def prepare(database, args):
+    """Заполняет базу-образец и готовит адреса и сессии писателей."""
+    os.environ['YATUBE_DATABASE'] = database
+    os.environ['YATUBE_SQLITE_TUNING'] = '0'
+    setup()
+    from django.core.management import call_command
+    from django.db import connection
+    from django.urls import reverse
+    from posts.models import Post, Profile
+
+    call_command('migrate', verbosity=0)
+    if not Post.objects.exists():
+        call_command(
+            'seed', users=args.users, posts=args.posts,
+            comments=args.comments, follows=args.follows, seed=args.seed,
+        )
+    rng = random.Random(args.seed)
+    post_ids = list(Post.objects.order_by('pk').values_list('pk', flat=True))
+    authors = list(Profile.objects.filter(post_count__gt=0).order_by(
+        'pk'
+    ).values_list('user__username', flat=True))
+    reads = [
+        reverse('posts:post_detail', args=[pk])
+        for pk in rng.choices(post_ids, k=50)
+    ] + [
+        reverse('posts:profile', args=[name])
+        for name in rng.choices(authors, k=50)
+    ]
+    commented = [
+        reverse('posts:add_comment', args=[pk])
+        for pk in rng.choices(post_ids, k=50)
+    ]
+    cookies = [
+        session_cookie(user_id)
+        for user_id in Profile.objects.order_by('pk').values_list(
+            'pk', flat=True
+        )[:args.writers]
+    ]
+    connection.close()
+    return reads, commented, cookies
+
+
+def load(port, seconds, readers, writers, reads, commented, cookies):
+    stop = time.monotonic() + seconds
+    lock = threading.Lock()
+    latencies = {'read': [], 'write': []}
+    errors = []
+
+    def request(connection, kind, method, url, body=None, headers=None):
+        began = time.perf_counter()
+        connection.request(method, url, body=body, headers=headers or {})
+        response = connection.getresponse()
+        response.read()
+        latency = time.perf_counter() - began
+        with lock:
+            if response.status >= 500:
+                errors.append(response.status)
+            else:
+                latencies[kind].append(latency)
+
+    def reader(number):
+        rng = random.Random(number)
+        connection = HTTPConnection('127.0.0.1', port)
+        while time.monotonic() < stop:
+            request(connection, 'read', 'GET', rng.choice(reads))
+        connection.close()
+
+    def writer(number):
+        rng = random.Random(-number)
+        connection = HTTPConnection('127.0.0.1', port)
+        headers = {
+            'Cookie': f'{cookies[number]}; csrftoken={CSRF_TOKEN}',
+            'X-CSRFToken': CSRF_TOKEN,
+            'Content-Type': 'application/x-www-form-urlencoded',
+        }
+        written = 0
+        while time.monotonic() < stop:
+            written += 1
+            # Каждая пятая запись - новый пост, остальные - комментарии.
+            url = '/create/' if written % 5 == 0 else rng.choice(commented)
+            body = urlencode({'text': f'Нагрузка {number} {written}'})
+            request(connection, 'write', 'POST', url, body, headers)
+        connection.close()
+
+    threads = [
+        threading.Thread(target=reader, args=(number,))
+        for number in range(readers)
+    ] + [
+        threading.Thread(target=writer, args=(number,))
+        for number in range(writers)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return {
+        'read_rps': round(len(latencies['read']) / elapsed, 1),
+        **latency_stats(latencies['read'], 'read_'),
+        'write_rps': round(len(latencies['write']) / elapsed, 1),
+        **latency_stats(latencies['write'], 'write_'),
+        'errors': len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument(
+        '--database',
+        default=os.path.join(tempfile.gettempdir(), 'yatube_rw.sqlite3'),
+        help='База-образец; если её нет, она создаётся и заполняется.',
+    )
+    parser.add_argument('--users', type=int, default=300)
+    parser.add_argument('--posts', type=int, default=5000)
+    parser.add_argument('--comments', type=int, default=10000)
+    parser.add_argument('--follows', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--json', help='Куда сохранить результаты.')
+    args = parser.parse_args()
+
+    targets = prepare(args.database, args)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for mode, tuning in MODES.items():
+            # Каждый режим начинает с одинаковой копии образца.
+            database = os.path.join(directory, f'{mode}.sqlite3')
+            shutil.copyfile(args.database, database)
+            server, port = start_server(
+                YATUBE_DATABASE=database, YATUBE_SQLITE_TUNING=tuning
+            )
+            try:
+                results[mode] = load(
+                    port, args.seconds, args.readers, args.writers, *targets
+                )
+            finally:
+                server.terminate()
+                server.join()
+    write_results(results, args.json)
+
+
+if __name__ == '__main__':
+    main()
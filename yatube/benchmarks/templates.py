@@ -0,0 +1,154 @@
+"""Время рендеринга страниц с разными загрузчиками шаблонов.
+
+Контекст страниц index, group_posts, profile, post_detail и about
+берётся из настоящих views над синтетической базой, затем каждая
+страница рендерится render_to_string, как это делает shortcuts.render:
+
+- debug - загрузчики по умолчанию с DEBUG = True, как в yatube.settings:
+  шаблоны читаются и разбираются при каждом рендеринге;
+- cached - кэширующий загрузчик yatube.settings_production: первый
+  рендеринг каждой страницы разбирает её шаблоны;
+- precompiled - то же после core.templates.precompile_templates, как в
+  рабочем процессе с TEMPLATES_PRECOMPILE.
+
+first_ms - первый рендеринг каждой страницы в свежем движке, p50/p99 -
+последующие.
+
+    python -m benchmarks.templates --renders 500 --json templates.json
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks import latency_stats, setup, write_results
+
+MODES = ('debug', 'cached', 'precompiled')
+
+
+def prepare(database, args):
+    os.environ['YATUBE_DATABASE'] = database
+    setup()
+    from django.core.management import call_command
+    from posts.models import Post
+
+    call_command('migrate', verbosity=0)
+    if not Post.objects.exists():
+        call_command(
+            'seed', users=args.users, posts=args.posts,
+            comments=args.comments, follows=args.follows, seed=args.seed,
+        )
+
+
+def capture_pages():
+    """Запрос, имя шаблона и контекст каждой страницы из её view."""
+    from unittest import mock
+
+    from django.contrib.auth.models import AnonymousUser
+    from django.http import HttpResponse
+    from django.test import RequestFactory
+    from posts import views
+    from posts.models import Group, Post, Profile
+
+    post = Post.objects.order_by('-comment_count', 'pk').first()
+    pages = {
+        'index': (views.index, {}),
+        'group_posts': (views.group_posts, {
+            'slug': Group.objects.order_by('pk').first().slug,
+        }),
+        'profile': (views.profile, {
+            'username': Profile.objects.order_by(
+                '-post_count', 'pk'
+            ).first().user.username,
+        }),
+        'post_detail': (views.post_detail, {'post_id': post.pk}),
+    }
+    captured = {}
+    for page, (view, kwargs) in pages.items():
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+
+        def render(request, template_name, context):
+            captured[page] = (request, template_name, context)
+            return HttpResponse()
+
+        with mock.patch.object(views, 'render', render):
+            view(request, **kwargs)
+    request = RequestFactory().get('/')
+    request.user = AnonymousUser()
+    captured['about'] = (request, 'about/author.html', {})
+    return captured
+
+
+def templates_setting(mode):
+    from django.conf import settings
+    from yatube import settings_production
+
+    if mode == 'debug':
+        return settings.TEMPLATES
+    return settings_production.TEMPLATES
+
+
+def run_mode(mode, pages, renders):
+    from django.test import override_settings
+    from django.template.loader import render_to_string
+
+    from core.templates import precompile_templates
+
+    results = {}
+    with override_settings(TEMPLATES=templates_setting(mode)):
+        if mode == 'precompiled':
+            start = time.perf_counter()
+            precompile_templates()
+            results['startup'] = {'precompile_ms': round(
+                (time.perf_counter() - start) * 1000, 2
+            )}
+        for page, (request, template_name, context) in pages.items():
+            latencies = []
+            for _ in range(renders + 1):
+                began = time.perf_counter()
+                render_to_string(template_name, context, request)
+                latencies.append(time.perf_counter() - began)
+            results[page] = {
+                'first_ms': round(latencies[0] * 1000, 2),
+                **latency_stats(latencies[1:]),
+                'mean_ms': round(statistics.mean(latencies[1:]) * 1000, 3),
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument(
+        '--database',
+        default=os.path.join(tempfile.gettempdir(), 'yatube_bench.sqlite3'),
+        help='Файл базы; если его нет, он создаётся и заполняется.',
+    )
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--posts', type=int, default=20000)
+    parser.add_argument('--comments', type=int, default=50000)
+    parser.add_argument('--follows', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--renders', type=int, default=200,
+                        help='Сколько раз рендерить каждую страницу.')
+    parser.add_argument('--json', help='Куда сохранить результаты.')
+    args = parser.parse_args()
+
+    prepare(args.database, args)
+    from django.template.loader import render_to_string
+
+    pages = capture_pages()
+    # Ленивые страницы лент, миниатюры и кэш фрагментов готовы заранее,
+    # так что замеряются только шаблоны.
+    for request, template_name, context in pages.values():
+        render_to_string(template_name, context, request)
+    results = {}
+    for mode in MODES:
+        for page, values in run_mode(mode, pages, args.renders).items():
+            results[f'{mode}:{page}'] = values
+    write_results(results, args.json)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+"""Пропускная способность, задержки и число SQL-запросов страниц постов.
+
+Страницы index, group_posts, profile, post_detail и follow_index
+запрашиваются через тестовый клиент Django (без сети, в одном потоке) и
+через настоящий многопоточный WSGI-сервер в отдельном процессе. Адреса
+выбираются из синтетической базы, которую при первом запуске создаёт в
+отдельном файле команда seed. Перед замером каждый адрес
+запрашивается один раз, так что кэши прогреты.
+
+    python -m benchmarks.views --requests 500 --json views.json
+"""
+import argparse
+import itertools
+import os
+import random
+import re
+import statistics
+import tempfile
+import threading
+import time
+from http.client import HTTPConnection
+
+from benchmarks import (
+    latency_stats, session_cookie, setup, start_server, write_results
+)
+
+VIEWS = ('index', 'group_posts', 'profile', 'post_detail', 'follow_index')
+QUERIES = re.compile(r'sql;[^,]*desc="(\d+) queries')
+
+
+def prepare(database, args):
+    os.environ['YATUBE_DATABASE'] = database
+    setup()
+    from django.conf import settings
+    from django.core.management import call_command
+    from posts.models import Post
+
+    settings.DEBUG = False
+    call_command('migrate', verbosity=0)
+    if not Post.objects.exists():
+        print('Создаётся база для бенчмарка...')
+        call_command(
+            'seed', users=args.users, posts=args.posts,
+            comments=args.comments, follows=args.follows, seed=args.seed,
+            workers=args.workers,
+        )
+
+
+def pick_targets(count, seed):
+    """По count адресов на страницу: (адрес, id пользователя или None)."""
+    from django.urls import reverse
+    from posts.models import Follow, Group, Post, Profile
+
+    rng = random.Random(seed)
+    slugs = list(Group.objects.order_by('pk').values_list('slug', flat=True))
+    authors = list(Profile.objects.filter(post_count__gt=0).order_by(
+        'pk'
+    ).values_list('user__username', flat=True))
+    post_ids = list(Post.objects.order_by('pk').values_list('pk', flat=True))
+    readers = list(Follow.objects.order_by('user_id').values_list(
+        'user_id', flat=True
+    ).distinct())
+
+    def sample(values, url):
+        return [(url(value), None) for value in rng.choices(values, k=count)]
+
+    return {
+        'index': [(reverse('posts:index'), None)] * count,
+        'group_posts': sample(
+            slugs, lambda slug: reverse('posts:group', args=[slug])
+        ),
+        'profile': sample(
+            authors, lambda name: reverse('posts:profile', args=[name])
+        ),
+        'post_detail': sample(
+            post_ids, lambda pk: reverse('posts:post_detail', args=[pk])
+        ),
+        'follow_index': [
+            (reverse('posts:follow_index'), user_id)
+            for user_id in rng.choices(readers, k=count)
+        ],
+    }
+
+
+def summarize(latencies, queries, elapsed):
+    return {
+        'requests': len(latencies),
+        'rps': round(len(latencies) / elapsed, 1),
+        **latency_stats(latencies),
+        'queries': round(statistics.mean(queries), 1),
+    }
+
+
+def run_client(targets, requests):
+    """Тестовый клиент: запросы по очереди, SQL считает сам Django."""
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+
+    clients = {}
+
+    def client_for(user_id):
+        if user_id not in clients:
+            clients[user_id] = Client()
+            if user_id is not None:
+                clients[user_id].force_login(
+                    get_user_model().objects.get(pk=user_id)
+                )
+        return clients[user_id]
+
+    for url, user_id in targets:
+        client_for(user_id).get(url)
+    latencies, queries = [], []
+    start = time.perf_counter()
+    for url, user_id in itertools.islice(itertools.cycle(targets), requests):
+        client = client_for(user_id)
+        with CaptureQueriesContext(connection) as captured:
+            began = time.perf_counter()
+            response = client.get(url)
+            latencies.append(time.perf_counter() - began)
+        assert response.status_code == 200, (url, response.status_code)
+        queries.append(len(captured))
+    return summarize(latencies, queries, time.perf_counter() - start)
+
+
+def run_wsgi(port, targets, requests, concurrency):
+    """Настоящий сервер: concurrency потоков шлют запросы по HTTP."""
+    cookies = {None: ''}
+    for _, user_id in targets:
+        if user_id not in cookies:
+            cookies[user_id] = session_cookie(user_id)
+    lock = threading.Lock()
+    latencies, queries = [], []
+
+    def fetch(url, user_id):
+        connection = HTTPConnection('127.0.0.1', port)
+        began = time.perf_counter()
+        connection.request('GET', url, headers={'Cookie': cookies[user_id]})
+        response = connection.getresponse()
+        response.read()
+        latency = time.perf_counter() - began
+        connection.close()
+        assert response.status == 200, (url, response.status)
+        return latency, int(QUERIES.search(
+            response.getheader('Server-Timing')
+        ).group(1))
+
+    def worker(jobs):
+        while True:
+            with lock:
+                job = next(jobs, None)
+            if job is None:
+                return
+            latency, count = fetch(*job)
+            with lock:
+                latencies.append(latency)
+                queries.append(count)
+
+    for target in targets:
+        fetch(*target)
+    jobs = itertools.islice(itertools.cycle(targets), requests)
+    threads = [
+        threading.Thread(target=worker, args=(jobs,))
+        for _ in range(concurrency)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, queries, time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument(
+        '--database',
+        default=os.path.join(tempfile.gettempdir(), 'yatube_bench.sqlite3'),
+        help='Файл базы; если его нет, он создаётся и заполняется.',
+    )
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--posts', type=int, default=20000)
+    parser.add_argument('--comments', type=int, default=50000)
+    parser.add_argument('--follows', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Сколько процессов заполняют базу.')
+    parser.add_argument('--urls', type=int, default=20,
+                        help='Сколько разных адресов на страницу.')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--views', nargs='+', choices=VIEWS, default=VIEWS)
+    parser.add_argument('--servers', nargs='+', choices=('client', 'wsgi'),
+                        default=('client', 'wsgi'))
+    parser.add_argument('--json', help='Куда сохранить результаты.')
+    args = parser.parse_args()
+
+    prepare(args.database, args)
+    targets = pick_targets(args.urls, args.seed)
+    results = {}
+    if 'client' in args.servers:
+        for view in args.views:
+            results[f'client:{view}'] = run_client(
+                targets[view], args.requests
+            )
+    if 'wsgi' in args.servers:
+        server, port = start_server(
+            YATUBE_DATABASE=args.database, YATUBE_REQUEST_PROFILING='1'
+        )
+        try:
+            for view in args.views:
+                results[f'wsgi:{view}'] = run_wsgi(
+                    port, targets[view], args.requests, args.concurrency
+                )
+        finally:
+            server.terminate()
+            server.join()
+    write_results(results, args.json)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+"""ASGI-приложение поверх обработчика WSGI Django.
+
+Django 2.2 не поддерживает ASGI, поэтому ASGIHandler переводит HTTP-запрос
+ASGI в вызов обычного обработчика WSGI со всеми middleware. Соединения,
+чтение тела запроса и отправку ответа обслуживает цикл событий сервера,
+а сам Django выполняется в ограниченном пуле из ASGI_THREADS потоков:
+медленные клиенты и простаивающие keep-alive соединения не занимают
+поток, а к базе одновременно обращается не больше ASGI_THREADS запросов.
+
+Потоковые ответы (StreamingHttpResponse) читаются в том же потоке пула,
+что выполнял view: их курсоры принадлежат соединению этого потока.
+"""
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+
+
+def get_asgi_application():
+    django.setup(set_prefix=False)
+    return ASGIHandler()
+
+
+def wsgi_str(value):
+    """Строка в кодировке environ WSGI: байты UTF-8 как latin-1."""
+    return value.encode('utf-8').decode('latin-1')
+
+
+def wsgi_environ(scope, body, size):
+    """environ WSGI для HTTP-запроса ASGI с телом в файле body."""
+    root_path = scope.get('root_path', '')
+    path = scope['path']
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': wsgi_str(root_path),
+        'PATH_INFO': wsgi_str(path),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'REMOTE_ADDR': client[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', ()):
+        # Как и серверы WSGI, заголовки с подчёркиванием отбрасываются:
+        # в environ их не отличить от заголовков с дефисом.
+        if b'_' in name:
+            continue
+        name = name.decode('latin-1').upper().replace('-', '_')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        value = value.decode('latin-1')
+        if name in environ:
+            value = f'{environ[name]},{value}'
+        environ[name] = value
+    environ['CONTENT_LENGTH'] = str(size)
+    return environ
+
+
+class ASGIHandler:
+    def __init__(self, threads=None):
+        self.wsgi = WSGIHandler()
+        self.executor = ThreadPoolExecutor(
+            threads or settings.ASGI_THREADS, thread_name_prefix='asgi'
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            raise ValueError(f'Неподдерживаемый тип: {scope["type"]}')
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        loop = asyncio.get_running_loop()
+
+        def send_from_thread(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        messages = await loop.run_in_executor(
+            self.executor, self.handle, scope, body, send_from_thread
+        )
+        for message in messages:
+            await send(message)
+
+    async def read_body(self, receive):
+        """Тело запроса в файле; None, если клиент отключился."""
+        body = tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+        )
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None
+            body.write(message.get('body', b''))
+            if not message.get('more_body'):
+                body.seek(0)
+                return body
+
+    def handle(self, scope, body, send_from_thread):
+        """Выполняет запрос в потоке пула.
+
+        Возвращает сообщения ответа, которые отправит цикл событий;
+        потоковый ответ отправляется отсюда же по частям, и тогда
+        список пуст.
+        """
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started.update({
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [
+                    (name.encode('latin-1'), value.encode('latin-1'))
+                    for name, value in headers
+                ],
+            })
+
+        size = body.seek(0, 2)
+        body.seek(0)
+        try:
+            response = self.wsgi(
+                wsgi_environ(scope, body, size), start_response
+            )
+            try:
+                if not response.streaming:
+                    return [
+                        started,
+                        {'type': 'http.response.body',
+                         'body': response.content},
+                    ]
+                send_from_thread(started)
+                for chunk in response:
+                    if chunk:
+                        send_from_thread({
+                            'type': 'http.response.body',
+                            'body': chunk,
+                            'more_body': True,
+                        })
+                send_from_thread({'type': 'http.response.body'})
+                return []
+            finally:
+                # Сигнал request_finished закрывает соединения с базой
+                # этого потока по CONN_MAX_AGE.
+                response.close()
+        finally:
+            body.close()
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await asyncio.get_running_loop().run_in_executor(
+                    None, self.executor.shutdown
+                )
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
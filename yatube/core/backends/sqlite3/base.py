@@ -0,0 +1,36 @@
+"""SQLite с настройками для работы под нагрузкой.
+
+В OPTIONS базы можно задать:
+
+- pragmas - словарь PRAGMA, выполняемых при каждом подключении
+  (journal_mode=WAL, synchronous=NORMAL, mmap_size, cache_size,
+  busy_timeout и т. п.);
+- остальные ключи, как обычно, передаются в sqlite3.connect.
+
+Транзакция, открытая core.db.immediate_transaction, начинается с
+BEGIN IMMEDIATE: блокировка записи берётся сразу, а не при первой записи,
+когда ждать её уже нельзя и SQLite отвечает «database is locked».
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    begin_immediate = False
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pragmas', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        pragmas = self.settings_dict['OPTIONS'].get('pragmas', {})
+        for name, value in pragmas.items():
+            connection.execute(f'PRAGMA {name} = {value}')
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        if self.begin_immediate:
+            self.cursor().execute('BEGIN IMMEDIATE')
+        else:
+            super()._start_transaction_under_autocommit()
@@ -0,0 +1,31 @@
+import time
+
+from django.conf import settings
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+
+def get_or_set_locked(cache, key, compute, timeout=DEFAULT_TIMEOUT):
+    """cache.get_or_set с защитой от одновременного пересчёта.
+
+    При промахе значение вычисляет только процесс, взявший блокировку,
+    остальные ждут его результат не дольше CACHE_LOCK_WAIT секунд и лишь
+    потом считают сами.
+    """
+    value = cache.get(key)
+    if value is not None:
+        return value
+    lock_key = f'{key}:lock'
+    if cache.add(lock_key, 1, settings.CACHE_LOCK_TIMEOUT):
+        try:
+            value = compute()
+            cache.set(key, value, timeout)
+        finally:
+            cache.delete(lock_key)
+        return value
+    deadline = time.monotonic() + settings.CACHE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(settings.CACHE_LOCK_POLL)
+        value = cache.get(key)
+        if value is not None:
+            return value
+    return compute()
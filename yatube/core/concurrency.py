@@ -0,0 +1,65 @@
+"""Одновременное выполнение независимых запросов внутри view.
+
+Функции, переданные в gather, выполняются в общем ограниченном пуле из
+CONCURRENT_LOOKUP_THREADS потоков, у каждого из которых своё соединение
+с базой: ожидание одной базы или кэша не задерживает остальные. Первая
+функция выполняется в текущем потоке, чтобы не ждать свободного потока
+пула ради неё.
+
+Внутри транзакции (и в тестах, которые выполняются в транзакции)
+функции выполняются по очереди в текущем потоке: другие соединения не
+видят её незафиксированных изменений. Так же они выполняются в потоках
+самого пула, чтобы вложенный gather не ждал занятых им же потоков.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+_executor = None
+_executor_lock = threading.Lock()
+_local = threading.local()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                settings.CONCURRENT_LOOKUP_THREADS,
+                thread_name_prefix='lookup',
+            )
+        return _executor
+
+
+def run_lookup(function):
+    """Вызов function в потоке пула.
+
+    Соединения потоков пула не закрываются сигналом request_finished,
+    поэтому после вызова они закрываются по тем же правилам
+    (CONN_MAX_AGE, ошибки), что и соединения обработчиков запросов.
+    """
+    _local.in_pool = True
+    try:
+        return function()
+    finally:
+        close_old_connections()
+
+
+def gather(*functions):
+    """Результаты вызова functions в том же порядке."""
+    sequential = (
+        len(functions) < 2
+        or not settings.CONCURRENT_LOOKUP_THREADS
+        or connection.in_atomic_block
+        or getattr(_local, 'in_pool', False)
+    )
+    if sequential:
+        return [function() for function in functions]
+    executor = get_executor()
+    futures = [
+        executor.submit(run_lookup, function) for function in functions[1:]
+    ]
+    first = functions[0]()
+    return [first, *(future.result() for future in futures)]
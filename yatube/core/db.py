@@ -0,0 +1,27 @@
+from contextlib import contextmanager
+
+from django.db import transaction
+
+
+@contextmanager
+def immediate_transaction(using=None):
+    """transaction.atomic, которая сразу берёт блокировку записи.
+
+    Для записи во views: на SQLite из core.backends транзакция
+    начинается с BEGIN IMMEDIATE, и одновременные записи ждут друг друга
+    busy_timeout, а не падают с «database is locked». На других базах и
+    внутри уже открытой транзакции это обычная atomic.
+    """
+    connection = transaction.get_connection(using)
+    immediate = (
+        hasattr(connection, 'begin_immediate')
+        and not connection.in_atomic_block
+    )
+    if immediate:
+        connection.begin_immediate = True
+    try:
+        with transaction.atomic(using=using):
+            yield
+    finally:
+        if immediate:
+            connection.begin_immediate = False
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.template import TemplateSyntaxError
+
+from core.templates import precompile_templates
+
+
+class Command(BaseCommand):
+    help = (
+        'Разбирает все шаблоны проекта и проверяет, что шаблоны из '
+        '{% extends %} и {% include %} существуют. Для шага сборки: '
+        'с ошибкой в шаблоне команда завершается с ненулевым кодом.'
+    )
+
+    def handle(self, *args, **options):
+        try:
+            names = precompile_templates()
+        except TemplateSyntaxError as error:
+            raise CommandError(f'Ошибки в шаблонах:\n{error}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено шаблонов: {len(names)}'
+        ))
@@ -0,0 +1,192 @@
+"""Профилирование запросов.
+
+ProfilingMiddleware считает для каждого запроса число SQL-запросов и их
+время, повторы одинаковых запросов, время рендера шаблонов, попадания и
+промахи кэша. Итог отдаётся заголовком Server-Timing и пишется в лог
+core.profiling одной строкой JSON. Повторы выдают N+1: один и тот же
+SQL, выполненный для каждой записи страницы.
+
+Профилирование включается настройкой REQUEST_PROFILING. Когда она
+выключена, middleware исключает себя из цепочки, а шаблоны и кэш не
+оборачиваются, так что накладных расходов нет.
+"""
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import Template
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+_instrumented = set()
+_instrument_lock = threading.Lock()
+
+
+class RequestProfile:
+    def __init__(self):
+        self.queries = []
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.in_cache = False
+
+    def __call__(self, execute, sql, params, many, context):
+        """Обёртка выполнения SQL для connection.execute_wrapper."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - start
+            self.queries.append((sql, repr(params)))
+
+    def summary(self, total):
+        exact = Counter(self.queries)
+        similar = Counter(sql for sql, _ in self.queries)
+        limit = settings.REQUEST_PROFILING_REPEAT_LIMIT
+        return {
+            'queries': len(self.queries),
+            'sql_ms': round(self.sql_time * 1000, 2),
+            'duplicates': sum(count - 1 for count in exact.values()),
+            'repeated': [
+                {'sql': sql, 'count': count}
+                for sql, count in similar.most_common()
+                if count > limit
+            ],
+            'template_ms': round(self.template_time * 1000, 2),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'total_ms': round(total * 1000, 2),
+        }
+
+
+def current_profile():
+    return getattr(_local, 'profile', None)
+
+
+def timed_render(render):
+    @wraps(render)
+    def wrapper(self, context):
+        profile = current_profile()
+        if profile is None:
+            return render(self, context)
+        # Вложенные шаблоны ({% include %}) уже входят во время внешнего.
+        profile.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            profile.template_depth -= 1
+            if not profile.template_depth:
+                profile.template_time += time.perf_counter() - start
+    return wrapper
+
+
+def counted_get(get):
+    @wraps(get)
+    def wrapper(self, key, default=None, *args, **kwargs):
+        value = get(self, key, default, *args, **kwargs)
+        profile = current_profile()
+        if profile is not None and not profile.in_cache:
+            if value is default:
+                profile.cache_misses += 1
+            else:
+                profile.cache_hits += 1
+        return value
+    return wrapper
+
+
+def counted_get_many(get_many):
+    @wraps(get_many)
+    def wrapper(self, keys, *args, **kwargs):
+        profile = current_profile()
+        if profile is None or profile.in_cache:
+            return get_many(self, keys, *args, **kwargs)
+        keys = list(keys)
+        # Бэкенды без своего get_many читают ключи по одному через get.
+        profile.in_cache = True
+        try:
+            values = get_many(self, keys, *args, **kwargs)
+        finally:
+            profile.in_cache = False
+        profile.cache_hits += len(values)
+        profile.cache_misses += len(keys) - len(values)
+        return values
+    return wrapper
+
+
+def patch(owner, name, decorator):
+    if (owner, name) in _instrumented:
+        return
+    setattr(owner, name, decorator(getattr(owner, name)))
+    _instrumented.add((owner, name))
+
+
+def instrument():
+    """Оборачивает рендер шаблонов и чтение настроенных кэшей."""
+    with _instrument_lock:
+        patch(Template, 'render', timed_render)
+        for alias in settings.CACHES:
+            backend = type(caches[alias])
+            patch(backend, 'get', counted_get)
+            patch(backend, 'get_many', counted_get_many)
+
+
+def server_timing(stats):
+    """Значение заголовка Server-Timing."""
+    return ', '.join((
+        'sql;dur={sql_ms};desc="{queries} queries, '
+        '{duplicates} duplicates"'.format(**stats),
+        'tpl;dur={template_ms};desc="templates"'.format(**stats),
+        'cache;desc="{cache_hits} hits, {cache_misses} misses"'.format(
+            **stats
+        ),
+        'total;dur={total_ms}'.format(**stats),
+    ))
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        if not settings.REQUEST_PROFILING:
+            raise MiddlewareNotUsed
+        instrument()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile = _local.profile = RequestProfile()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile))
+                response = self.get_response(request)
+        finally:
+            _local.profile = None
+        stats = profile.summary(time.perf_counter() - start)
+        response['Server-Timing'] = server_timing(stats)
+        stats.update(
+            method=request.method,
+            path=request.path,
+            view=getattr(request.resolver_match, 'view_name', None),
+            status=response.status_code,
+        )
+        level = (
+            logging.WARNING if stats['duplicates'] or stats['repeated']
+            else logging.INFO
+        )
+        logger.log(
+            level,
+            json.dumps(stats, ensure_ascii=False),
+            extra={'profile': stats},
+        )
+        return response
@@ -0,0 +1,54 @@
+import os
+
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.template.loader_tags import ExtendsNode, IncludeNode
+
+
+def template_names(engine):
+    """Имена всех шаблонов из DIRS движка, как их передают get_template."""
+    for directory in engine.dirs:
+        for root, dirs, files in os.walk(directory):
+            dirs.sort()
+            for file in sorted(files):
+                path = os.path.relpath(os.path.join(root, file), directory)
+                yield path.replace(os.sep, '/')
+
+
+def referenced_names(template):
+    """Имена шаблонов, которые template расширяет и включает строкой."""
+    nodes = template.nodelist.get_nodes_by_type(ExtendsNode)
+    expressions = [node.parent_name for node in nodes]
+    nodes = template.nodelist.get_nodes_by_type(IncludeNode)
+    expressions += [node.template for node in nodes]
+    return [
+        expression.var for expression in expressions
+        if isinstance(expression.var, str) and not expression.filters
+    ]
+
+
+def precompile_templates(using='django'):
+    """Разбирает все шаблоны проекта и проверяет ссылки между ними.
+
+    Ошибки синтаксиса, неизвестные теги и фильтры, {% extends %} и
+    {% include %} несуществующих шаблонов собираются по всем шаблонам в
+    одно TemplateSyntaxError. С кэширующим загрузчиком разобранные
+    шаблоны остаются в его кэше, и первый запрос их уже не разбирает.
+    Возвращает имена разобранных шаблонов.
+    """
+    engine = engines[using].engine
+    names = list(template_names(engine))
+    errors = []
+    for name in names:
+        try:
+            template = engine.get_template(name)
+        except (TemplateSyntaxError, TemplateDoesNotExist) as error:
+            errors.append(f'{name}: {error}')
+            continue
+        for referenced in referenced_names(template):
+            try:
+                engine.get_template(referenced)
+            except TemplateDoesNotExist:
+                errors.append(f'{name}: нет шаблона {referenced}')
+    if errors:
+        raise TemplateSyntaxError('\n'.join(errors))
+    return names
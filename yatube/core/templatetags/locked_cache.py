@@ -0,0 +1,52 @@
+from django import template
+from django.core.cache import caches
+from django.core.cache.utils import make_template_fragment_key
+from django.templatetags.cache import CacheNode
+
+from core.cache import get_or_set_locked
+
+register = template.Library()
+
+
+class LockedCacheNode(CacheNode):
+    def render(self, context):
+        expire_time = self.expire_time_var.resolve(context)
+        if expire_time is not None:
+            expire_time = int(expire_time)
+        cache_name = 'default'
+        if self.cache_name:
+            cache_name = self.cache_name.resolve(context)
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        return get_or_set_locked(
+            caches[cache_name],
+            make_template_fragment_key(self.fragment_name, vary_on),
+            lambda: self.nodelist.render(context),
+            expire_time,
+        )
+
+
+@register.tag('lockedcache')
+def do_locked_cache(parser, token):
+    """Тег {% cache %}, который при промахе рендерит фрагмент один раз.
+
+    {% lockedcache timeout name [vary_on ...] [using="cache"] %}
+    ...
+    {% endlockedcache %}
+    """
+    nodelist = parser.parse(('endlockedcache',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 3:
+        raise template.TemplateSyntaxError(
+            f"'{tokens[0]}' tag requires at least 2 arguments."
+        )
+    cache_name = None
+    if len(tokens) > 3 and tokens[-1].startswith('using='):
+        cache_name = parser.compile_filter(tokens.pop()[len('using='):])
+    return LockedCacheNode(
+        nodelist,
+        parser.compile_filter(tokens[1]),
+        tokens[2],
+        [parser.compile_filter(token) for token in tokens[3:]],
+        cache_name,
+    )
@@ -0,0 +1,25 @@
+"""Помощники тестов."""
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+@contextmanager
+def capture_on_commit_callbacks(using=DEFAULT_DB_ALIAS, execute=False):
+    """TestCase.captureOnCommitCallbacks из Django 3.2.
+
+    В TestCase транзакция теста не фиксируется, и функции
+    transaction.on_commit не вызываются. Контекст собирает функции,
+    зарегистрированные внутри него, и с execute=True вызывает их на
+    выходе, как будто транзакция зафиксирована.
+    """
+    callbacks = []
+    start_count = len(connections[using].run_on_commit)
+    try:
+        yield callbacks
+    finally:
+        run_on_commit = connections[using].run_on_commit[start_count:]
+        callbacks[:] = [func for sids, func in run_on_commit]
+        if execute:
+            for callback in callbacks:
+                callback()
@@ -0,0 +1,141 @@
+import asyncio
+import json
+from io import BytesIO
+from urllib.parse import urlencode
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIRequest
+from django.test import (
+    SimpleTestCase, TransactionTestCase, override_settings
+)
+from django.urls import reverse
+
+from core.asgi import ASGIHandler, wsgi_environ
+from posts.models import Post
+
+User = get_user_model()
+
+
+def http_scope(path, method='GET', query_string=b'', headers=()):
+    return {
+        'type': 'http',
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'root_path': '',
+        'query_string': query_string,
+        'headers': [(b'host', b'testserver'), *headers],
+        'server': ('testserver', 80),
+        'client': ('127.0.0.1', 50000),
+    }
+
+
+def call(application, scope, *messages):
+    """Сообщения, которые приложение отправило в ответ на messages."""
+    incoming = list(messages) or [{'type': 'http.request'}]
+    sent = []
+
+    async def receive():
+        return incoming.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(application(scope, receive, send))
+    return sent
+
+
+class WsgiEnvironTest(SimpleTestCase):
+    def test_request_from_scope(self):
+        """Путь, параметры, заголовки и тело доходят до запроса Django"""
+        body = urlencode({'text': 'Привет'}).encode()
+        scope = http_scope(
+            '/группа/', 'POST', b'page=2', [
+                (b'content-type', b'application/x-www-form-urlencoded'),
+                (b'accept', b'text/html'),
+                (b'accept', b'*/*'),
+                (b'x_forwarded_for', b'10.0.0.1'),
+            ],
+        )
+        request = WSGIRequest(
+            wsgi_environ(scope, BytesIO(body), len(body))
+        )
+        self.assertEqual(request.path, '/группа/')
+        self.assertEqual(request.GET['page'], '2')
+        self.assertEqual(request.POST['text'], 'Привет')
+        self.assertEqual(request.META['HTTP_ACCEPT'], 'text/html,*/*')
+        self.assertNotIn('HTTP_X_FORWARDED_FOR', request.META)
+        self.assertEqual(request.get_host(), 'testserver')
+
+
+class ASGIHandlerTest(TransactionTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.application = ASGIHandler(threads=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.application.executor.shutdown()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        author = User.objects.create(username='Author')
+        for i in range(3):
+            Post.objects.create(author=author, text=f'Пост {i}')
+
+    def test_page(self):
+        """Страница отдаётся целиком: статус, заголовки и тело"""
+        start, body = call(
+            self.application, http_scope(reverse('posts:index'))
+        )
+        self.assertEqual(start['status'], 200)
+        self.assertIn(
+            (b'Content-Type', b'text/html; charset=utf-8'), start['headers']
+        )
+        self.assertIn('Пост 2', body['body'].decode())
+        self.assertFalse(body.get('more_body'))
+        start, _ = call(self.application, http_scope('/missing/'))
+        self.assertEqual(start['status'], 404)
+
+    @override_settings(API_EXPORT_CHUNK_SIZE=1)
+    def test_streaming_response(self):
+        """Потоковый ответ отправляется по частям"""
+        start, *chunks = call(
+            self.application, http_scope(reverse('api:export_posts'))
+        )
+        self.assertEqual(start['status'], 200)
+        self.assertGreater(len(chunks), 3)
+        self.assertTrue(all(chunk['more_body'] for chunk in chunks[:-1]))
+        self.assertFalse(chunks[-1].get('more_body'))
+        exported = json.loads(b''.join(
+            chunk.get('body', b'') for chunk in chunks
+        ))
+        self.assertEqual(len(exported), 3)
+
+    def test_disconnect_before_body(self):
+        """Если клиент отключился до конца тела, Django не вызывается"""
+        sent = call(
+            self.application,
+            http_scope('/', 'POST'),
+            {'type': 'http.request', 'body': b'a', 'more_body': True},
+            {'type': 'http.disconnect'},
+        )
+        self.assertEqual(sent, [])
+
+    def test_lifespan(self):
+        """Запуск и остановка сервера подтверждаются"""
+        application = ASGIHandler(threads=1)
+        sent = call(
+            application,
+            {'type': 'lifespan'},
+            {'type': 'lifespan.startup'},
+            {'type': 'lifespan.shutdown'},
+        )
+        self.assertEqual(sent, [
+            {'type': 'lifespan.startup.complete'},
+            {'type': 'lifespan.shutdown.complete'},
+        ])
@@ -0,0 +1,60 @@
+import threading
+
+from django.core.cache import caches
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+
+from core.cache import get_or_set_locked
+
+
+@override_settings(CACHE_LOCK_WAIT=0.5, CACHE_LOCK_POLL=0.01)
+class LockedCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.cache = caches['default']
+        self.cache.clear()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return 'значение'
+
+    def test_miss_computes_once(self):
+        """При промахе значение считается и сохраняется"""
+        for _ in range(2):
+            self.assertEqual(
+                get_or_set_locked(self.cache, 'key', self.compute),
+                'значение'
+            )
+        self.assertEqual(self.calls, 1)
+        self.assertIsNone(self.cache.get('key:lock'))
+
+    def test_waits_for_lock_holder(self):
+        """Пока другой процесс считает значение, остальные его ждут"""
+        self.cache.add('key:lock', 1)
+        timer = threading.Timer(
+            0.05, self.cache.set, args=('key', 'от соседа')
+        )
+        timer.start()
+        value = get_or_set_locked(self.cache, 'key', self.compute)
+        timer.join()
+        self.assertEqual(value, 'от соседа')
+        self.assertEqual(self.calls, 0)
+
+    def test_computes_when_lock_holder_is_late(self):
+        """Если значение не появилось за CACHE_LOCK_WAIT, считаем сами"""
+        self.cache.add('key:lock', 1)
+        with self.settings(CACHE_LOCK_WAIT=0.05):
+            value = get_or_set_locked(self.cache, 'key', self.compute)
+        self.assertEqual(value, 'значение')
+        self.assertEqual(self.calls, 1)
+
+    def test_lockedcache_tag(self):
+        """Тег lockedcache кэширует фрагмент в указанном кэше"""
+        template = Template(
+            '{% load locked_cache %}'
+            '{% lockedcache None fragment key using="feeds" %}'
+            '{{ value }}{% endlockedcache %}'
+        )
+        for value in ('первое', 'второе'):
+            rendered = template.render(Context({'key': 1, 'value': value}))
+        self.assertEqual(rendered, 'первое')
@@ -0,0 +1,39 @@
+import threading
+
+from django.db import transaction
+from django.test import TransactionTestCase, override_settings
+
+from core.concurrency import gather
+
+
+class GatherTest(TransactionTestCase):
+    def test_runs_concurrently(self):
+        """Вне транзакции функции выполняются в разных потоках"""
+        barrier = threading.Barrier(2, timeout=5)
+
+        def lookup(value):
+            barrier.wait()
+            return value, threading.get_ident()
+
+        (first, first_thread), (second, second_thread) = gather(
+            lambda: lookup(1), lambda: lookup(2)
+        )
+        self.assertEqual((first, second), (1, 2))
+        self.assertNotEqual(first_thread, second_thread)
+
+    def test_sequential_in_transaction(self):
+        """В транзакции функции выполняются по очереди в текущем потоке"""
+        with transaction.atomic():
+            threads = gather(threading.get_ident, threading.get_ident)
+        self.assertEqual(threads, [threading.get_ident()] * 2)
+
+    @override_settings(CONCURRENT_LOOKUP_THREADS=0)
+    def test_disabled(self):
+        """При CONCURRENT_LOOKUP_THREADS=0 пул не используется"""
+        threads = gather(threading.get_ident, threading.get_ident)
+        self.assertEqual(threads, [threading.get_ident()] * 2)
+
+    def test_errors_propagate(self):
+        """Исключение из потока пула доходит до вызывающего"""
+        with self.assertRaises(ZeroDivisionError):
+            gather(lambda: 1, lambda: 1 / 0)
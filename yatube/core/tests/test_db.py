@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from core.db import immediate_transaction
+
+
+class PragmaTest(TestCase):
+    def test_pragmas_are_applied(self):
+        """Настройки SQLite выполняются при подключении"""
+        with connection.cursor() as cursor:
+            for name in ('synchronous', 'busy_timeout', 'cache_size'):
+                cursor.execute(f'PRAGMA {name}')
+                with self.subTest(pragma=name):
+                    self.assertEqual(
+                        cursor.fetchone()[0],
+                        {'synchronous': 1}.get(
+                            name, settings.SQLITE_PRAGMAS[name]
+                        ),
+                    )
+
+
+class ImmediateTransactionTest(TransactionTestCase):
+    def begins(self, block):
+        with CaptureQueriesContext(connection) as queries:
+            block()
+        return [
+            query['sql'] for query in queries
+            if query['sql'].startswith('BEGIN')
+        ]
+
+    def test_write_transaction_begins_immediate(self):
+        """Транзакция записи сразу берёт блокировку"""
+        def write():
+            with immediate_transaction():
+                pass
+            with transaction.atomic():
+                pass
+        self.assertEqual(self.begins(write), ['BEGIN IMMEDIATE', 'BEGIN'])
+
+    def test_nested_transaction_is_savepoint(self):
+        """Внутри открытой транзакции ничего не начинается заново"""
+        def write():
+            with transaction.atomic(), immediate_transaction():
+                pass
+        self.assertEqual(self.begins(write), ['BEGIN'])
+        self.assertFalse(connection.begin_immediate)
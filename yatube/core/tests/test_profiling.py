@@ -0,0 +1,70 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.profiling import RequestProfile
+from posts.models import Post
+
+User = get_user_model()
+
+
+@override_settings(REQUEST_PROFILING=True, REQUEST_PROFILING_REPEAT_LIMIT=2)
+class ProfilingTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Author')
+        cls.posts = [
+            Post.objects.create(author=cls.author, text=f'Пост {i}')
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, url):
+        with self.assertLogs('core.profiling') as logs:
+            response = Client().get(url)
+        return response, logs.records[0].profile
+
+    def test_stats_are_reported(self):
+        """Запрос получает заголовок Server-Timing и строку лога"""
+        response, profile = self.get(reverse('posts:index'))
+        self.assertIn('sql;dur=', response['Server-Timing'])
+        self.assertIn('tpl;dur=', response['Server-Timing'])
+        self.assertGreater(profile['queries'], 0)
+        self.assertGreater(profile['template_ms'], 0)
+        self.assertEqual(profile['view'], 'posts:index')
+        self.assertEqual(profile['status'], 200)
+
+    def test_cache_hits_are_counted(self):
+        """Повторный запрос страницы попадает в кэш"""
+        _, first = self.get(reverse('posts:index'))
+        _, second = self.get(reverse('posts:index'))
+        self.assertGreater(first['cache_misses'], 0)
+        self.assertGreater(second['cache_hits'], first['cache_hits'])
+        self.assertLess(second['queries'], first['queries'])
+
+    def test_repeated_queries_are_flagged(self):
+        """Запрос в цикле по записям отмечается как N+1"""
+        profile = RequestProfile()
+        with connection.execute_wrapper(profile):
+            authors = [post.author for post in Post.objects.all()]
+        stats = profile.summary(0)
+        self.assertEqual(len(authors), 3)
+        self.assertEqual(stats['queries'], 4)
+        self.assertEqual(stats['duplicates'], 2)
+        self.assertEqual(
+            [repeated['count'] for repeated in stats['repeated']], [3]
+        )
+
+    @override_settings(REQUEST_PROFILING=False)
+    def test_disabled_middleware_is_skipped(self):
+        """Выключенное профилирование не добавляет заголовок"""
+        self.assertIn(
+            'core.profiling.ProfilingMiddleware', settings.MIDDLEWARE
+        )
+        response = Client().get(reverse('posts:index'))
+        self.assertNotIn('Server-Timing', response)
@@ -0,0 +1,79 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.template import TemplateSyntaxError, engines
+from django.test import SimpleTestCase, override_settings
+
+from core.templates import precompile_templates
+from yatube import settings_production
+
+
+class PrecompileTemplatesTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name, text):
+        path = os.path.join(self.directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as template:
+            template.write(text)
+
+    def templates(self):
+        return override_settings(TEMPLATES=[{
+            **settings.TEMPLATES[0],
+            'DIRS': [self.directory],
+        }])
+
+    def test_project_templates_compile(self):
+        """Все шаблоны проекта разбираются без ошибок"""
+        names = precompile_templates()
+        self.assertIn('base.html', names)
+        self.assertIn('posts/includes/post_list.html', names)
+
+    def test_errors_of_all_templates_reported(self):
+        """Ошибки всех шаблонов, включая ссылки на несуществующие"""
+        self.write('base.html', '{% block content %}{% endblock %}')
+        self.write('broken.html', '{% if %}')
+        self.write('unknown.html', '{{ text|no_such_filter }}')
+        self.write('pages/page.html', (
+            "{% extends 'base.html' %}{% block content %}"
+            "{% include 'pages/missing.html' %}{% endblock %}"
+        ))
+        with self.templates():
+            with self.assertRaises(TemplateSyntaxError) as raised:
+                precompile_templates()
+        message = str(raised.exception)
+        self.assertIn('broken.html', message)
+        self.assertIn('no_such_filter', message)
+        self.assertIn(
+            'pages/page.html: нет шаблона pages/missing.html', message
+        )
+        self.assertNotIn('base.html:', message)
+
+    def test_cached_loader_keeps_parsed_templates(self):
+        """С кэширующим загрузчиком шаблоны не читаются заново"""
+        self.write('page.html', 'старый')
+        with override_settings(TEMPLATES=[{
+            **settings_production.TEMPLATES[0],
+            'DIRS': [self.directory],
+        }]):
+            self.assertEqual(precompile_templates(), ['page.html'])
+            self.write('page.html', 'новый')
+            template = engines['django'].get_template('page.html')
+            self.assertEqual(template.render(), 'старый')
+
+    def test_command(self):
+        """Команда сообщает число шаблонов или завершается с ошибкой"""
+        self.write('page.html', 'страница')
+        output = StringIO()
+        with self.templates():
+            call_command('precompile_templates', stdout=output)
+            self.assertIn('Проверено шаблонов: 1', output.getvalue())
+            self.write('broken.html', '{% endblock %}')
+            with self.assertRaises(CommandError):
+                call_command('precompile_templates', stdout=output)
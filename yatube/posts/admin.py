@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Group, Post, Comment
+from .search import matching_post_ids
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -15,6 +16,12 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        # Ищем по тому же индексу, что и поиск на сайте, а не LIKE по тексту.
+        if not search_term:
+            return queryset, False
+        return queryset.filter(pk__in=matching_post_ids(search_term)), False
+
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = (
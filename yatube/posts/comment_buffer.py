@@ -0,0 +1,185 @@
+"""Буферизованная запись комментариев.
+
+В режиме POSTS_COMMENT_WRITES = 'buffered' проверенный формой
+комментарий сразу принимается, а в базу попадает пачкой вместе с другими
+комментариями того же поста: когда их набирается POSTS_COMMENT_BATCH_SIZE
+или раз в POSTS_COMMENT_FLUSH_INTERVAL миллисекунд. Счётчик комментариев
+поста сдвигается один раз на пачку. Принятые, но не записанные
+комментарии пропадут, если процесс упадёт; при обычном завершении
+процесса буфер сбрасывается в базу. Пачка, которую не удалось записать
+из-за временной ошибки базы, возвращается в буфер до следующего сброса,
+но не больше POSTS_COMMENT_WRITE_RETRIES раз. При нарушении ограничений
+комментарии пачки пишутся по одному, а нарушающие отбрасываются. В
+режиме 'direct' комментарий сохраняется в запросе, как обычно.
+"""
+import atexit
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, OperationalError, close_old_connections
+
+from core.db import immediate_transaction
+
+from .feed_cache import bump_feed_versions
+from .models import Comment, Post
+from .signals import after_commit, bump
+
+logger = logging.getLogger(__name__)
+
+DIRECT = 'direct'
+BUFFERED = 'buffered'
+
+
+def is_buffered():
+    return settings.POSTS_COMMENT_WRITES == BUFFERED
+
+
+class CommentBuffer:
+    def __init__(self):
+        self._comments = defaultdict(list)
+        # Сколько раз подряд не удалось записать комментарии поста.
+        self._failures = defaultdict(int)
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._started = False
+
+    def add(self, comment):
+        """Принимает комментарий; полную пачку поста пишет сразу."""
+        post_id = comment.post_id
+        with self._lock:
+            batch = self._comments[post_id]
+            batch.append(comment)
+            full = len(batch) >= settings.POSTS_COMMENT_BATCH_SIZE
+            if full:
+                del self._comments[post_id]
+        if full:
+            self.write(post_id, batch)
+        else:
+            self.start()
+
+    def start(self):
+        """Регистрирует сброс при завершении процесса и запускает
+        фоновый сброс, если задан интервал."""
+        if self._started:
+            return
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            atexit.register(self.drain)
+            if settings.POSTS_COMMENT_FLUSH_INTERVAL:
+                threading.Thread(
+                    target=self.run, name='comment-flusher', daemon=True
+                ).start()
+
+    def run(self):
+        interval = settings.POSTS_COMMENT_FLUSH_INTERVAL / 1000
+        while not self._stopped.wait(interval):
+            close_old_connections()
+            self.flush()
+
+    def flush(self):
+        """Пишет все накопленные комментарии, возвращает их число."""
+        with self._lock:
+            pending, self._comments = self._comments, defaultdict(list)
+        return sum(
+            self.write(post_id, batch) for post_id, batch in pending.items()
+        )
+
+    def drain(self):
+        """Останавливает фоновый сброс и пишет остаток буфера."""
+        self._stopped.set()
+        return self.flush()
+
+    def write(self, post_id, batch):
+        """Пишет пачку комментариев поста, возвращает число записанных."""
+        try:
+            written = self.save(post_id, batch)
+        except IntegrityError:
+            return self.save_each(post_id, batch)
+        except OperationalError:
+            self.retry(post_id, batch)
+            return 0
+        except Exception:
+            logger.exception(
+                'Не удалось записать комментарии поста %s, отброшено: %s',
+                post_id, len(batch),
+            )
+            written = 0
+        self.reset(post_id)
+        return written
+
+    @staticmethod
+    def save(post_id, batch):
+        with immediate_transaction():
+            if not Post.objects.filter(pk=post_id).exists():
+                logger.warning(
+                    'Пост %s удалён, комментариев отброшено: %s',
+                    post_id, len(batch),
+                )
+                return 0
+            Comment.objects.bulk_create(batch)
+            bump(Post, post_id, comment_count=len(batch))
+            after_commit(bump_feed_versions, [f'post:{post_id}'])
+        return len(batch)
+
+    def save_each(self, post_id, batch):
+        """Пишет комментарии по одному, отбрасывая нарушающие ограничения.
+
+        Каждый комментарий пишется в своей транзакции: на SQLite внешние
+        ключи проверяются только при коммите.
+        """
+        written = 0
+        for index, comment in enumerate(batch):
+            try:
+                written += self.save(post_id, [comment])
+            except IntegrityError as error:
+                logger.warning(
+                    'Комментарий автора %s к посту %s отброшен: %s',
+                    comment.author_id, post_id, error,
+                )
+            except OperationalError:
+                self.retry(post_id, batch[index:])
+                return written
+        self.reset(post_id)
+        return written
+
+    def reset(self, post_id):
+        with self._lock:
+            self._failures.pop(post_id, None)
+
+    def retry(self, post_id, batch):
+        """Возвращает пачку в буфер, пока не исчерпаны попытки."""
+        with self._lock:
+            self._failures[post_id] += 1
+            failures = self._failures[post_id]
+            retry = failures <= settings.POSTS_COMMENT_WRITE_RETRIES
+            if retry:
+                # Пачка встаёт перед комментариями, принятыми после неё.
+                self._comments[post_id][:0] = batch
+            else:
+                del self._failures[post_id]
+        if retry:
+            logger.warning(
+                'Не удалось записать комментарии поста %s, они вернулись '
+                'в буфер (попытка %s)', post_id, failures, exc_info=True,
+            )
+        else:
+            logger.error(
+                'Не удалось записать комментарии поста %s за %s попыток, '
+                'отброшено: %s', post_id, failures, len(batch),
+                exc_info=True,
+            )
+
+
+comment_buffer = CommentBuffer()
+
+
+def save_comment(comment):
+    if is_buffered():
+        comment_buffer.add(comment)
+    else:
+        with immediate_transaction():
+            comment.save()
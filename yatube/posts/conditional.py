@@ -0,0 +1,80 @@
+"""Условные GET страниц лент и постов.
+
+ETag страницы строится из версий лент (posts.feed_cache), которые
+сигналы меняют при каждой записи, видимой на странице, и из того, кто
+её смотрит: вошедший пользователь видит своё имя в шапке и свои кнопки
+подписки, поэтому в ETag входят его id и версия его подписок.
+Валидаторы считаются до загрузки записей и рендеринга, по кэшу версий,
+поэтому ответ 304 обходится без запросов за содержимым.
+
+Last-Modified - время самой свежей версии. Он отдаётся только
+анонимным посетителям: клиент, который присылает одно
+If-Modified-Since, после входа получил бы 304 на страницу для гостя.
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .feed_cache import GROUPS, get_feed_versions
+
+
+def version_validators(feeds, viewer=None):
+    """ETag и Last-Modified (секунды или None) по версиям feeds.
+
+    viewer - id вошедшего пользователя, если содержимое зависит от него.
+    """
+    feeds = [*feeds, GROUPS]
+    if viewer is not None:
+        # Кнопки подписки меняются с подписками пользователя.
+        feeds.append(f'follows:{viewer}')
+    versions = get_feed_versions(*feeds)
+    parts = [*feeds, *versions, viewer or '']
+    last_modified = None
+    if viewer is None:
+        last_modified = max(versions) // 10 ** 9
+    etag = hashlib.md5(':'.join(map(str, parts)).encode()).hexdigest()
+    # Слабый ETag: CSRF-токен на странице разный при каждом рендеринге.
+    return f'W/"{etag}"', last_modified
+
+
+def page_validators(request, *feeds):
+    """Валидаторы страницы из feeds для того, кто её смотрит."""
+    user = request.user
+    return version_validators(
+        feeds, user.pk if user.is_authenticated else None
+    )
+
+
+def not_modified(request, validators, private=None):
+    """Ответ 304, если страница у клиента актуальна, иначе None."""
+    etag, last_modified = validators
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is not None:
+        set_validators(request, response, validators, private)
+    return response
+
+
+def set_validators(request, response, validators, private=None):
+    """Добавляет валидаторы к ответу и требует от кэшей сверяться с ними.
+
+    private - можно ли хранить ответ в общих кэшах; по умолчанию нельзя
+    для вошедших пользователей.
+    """
+    etag, last_modified = validators
+    if response.status_code not in (200, 304):
+        return response
+    response.setdefault('ETag', etag)
+    if last_modified is not None:
+        response.setdefault('Last-Modified', http_date(last_modified))
+    if private is None:
+        private = request.user.is_authenticated
+    # patch_cache_control пишет private=False буквально, поэтому
+    # директива передаётся, только если она нужна.
+    directives = {'no_cache': True}
+    if private:
+        directives['private'] = True
+    patch_cache_control(response, **directives)
+    return response
@@ -0,0 +1,15 @@
+from django.utils.functional import SimpleLazyObject
+
+from .follows import followed_author_ids
+
+
+def following(request):
+    """Авторы, на которых подписан пользователь, для кнопок подписки.
+
+    Множество загружается из кэша, только если шаблон к нему обратится.
+    """
+    return {
+        'followed_author_ids': SimpleLazyObject(
+            lambda: followed_author_ids(request.user)
+        ),
+    }
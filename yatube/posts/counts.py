@@ -0,0 +1,97 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DatabaseError, connection
+
+from core.cache import get_or_set_locked
+
+EXACT = 'exact'
+CACHED = 'cached'
+ESTIMATED = 'estimated'
+
+
+def count_cache_key(feed):
+    return f'posts:feed_count:{feed}'
+
+
+def estimate_table_rows(model):
+    """Оценка числа строк таблицы по статистике БД или None."""
+    table = model._meta.db_table
+    queries = {
+        'postgresql': (
+            'SELECT reltuples FROM pg_class WHERE relname = %s'
+        ),
+        'mysql': (
+            'SELECT table_rows FROM information_schema.tables '
+            'WHERE table_schema = DATABASE() AND table_name = %s'
+        ),
+        'sqlite': 'SELECT stat FROM sqlite_stat1 WHERE tbl = %s',
+    }
+    if connection.vendor not in queries:
+        return None
+    if connection.vendor == 'sqlite' and 'sqlite_stat1' not in (
+        connection.introspection.table_names()
+    ):
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(queries[connection.vendor], [table])
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    if row is None or row[0] is None:
+        return None
+    # В sqlite_stat1 первое число строки stat - количество записей.
+    estimate = int(float(str(row[0]).split()[0]))
+    return estimate if estimate >= 0 else None
+
+
+class FeedCounter:
+    """Считает записи ленты выбранной стратегией.
+
+    После вызова count() в strategy записана фактически применённая
+    стратегия: оценка по статистике откатывается к кэшу, если статистики
+    нет, лента отфильтрована или таблица слишком мала для оценки.
+    """
+
+    def __init__(self, feed, strategy=EXACT):
+        self.feed = feed
+        self.strategy = strategy
+
+    def count(self, queryset):
+        if self.strategy == ESTIMATED:
+            estimate = None
+            if not queryset.query.where:
+                estimate = estimate_table_rows(queryset.model)
+            if (
+                estimate is not None
+                and estimate >= settings.POSTS_COUNT_ESTIMATE_MIN
+            ):
+                return estimate
+            self.strategy = CACHED
+        if self.strategy == CACHED:
+            return get_or_set_locked(
+                caches['counts'], count_cache_key(self.feed), queryset.count
+            )
+        return queryset.count()
+
+
+def get_feed_counter(feed):
+    kind = feed.split(':', 1)[0]
+    return FeedCounter(
+        feed, settings.POSTS_COUNT_STRATEGIES.get(kind, EXACT)
+    )
+
+
+def adjust_feed_counts(feeds, delta):
+    """Сдвигает закэшированные счётчики, не трогая отсутствующие."""
+    for feed in feeds:
+        try:
+            caches['counts'].incr(count_cache_key(feed), delta)
+        except ValueError:
+            pass
+
+
+def reset_feed_counts(feeds):
+    caches['counts'].delete_many(
+        [count_cache_key(feed) for feed in feeds]
+    )
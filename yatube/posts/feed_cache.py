@@ -0,0 +1,72 @@
+"""Версии публичных лент для кэширования отрендеренных страниц.
+
+Ключ фрагмента включает версию ленты, поэтому запись в ленту делает
+старые фрагменты недостижимыми. Недостижимые фрагменты истекают через
+POSTS_FEED_FRAGMENT_TIMEOUT, а сами версии хранятся без срока.
+Версия - время последнего изменения в наносекундах (или время, когда
+вытесненная версия создана заново), поэтому она же служит для
+Last-Modified страниц.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+VERSION_KEY = 'posts:feed_version:{}'
+# Версия, общая для всех лент: меняется при правке групп, ссылки и
+# названия которых выводятся в любой ленте.
+GROUPS = 'groups'
+
+_last_version = 0
+_version_lock = threading.Lock()
+
+
+def new_version():
+    # Версия от времени не повторяет старую после вытеснения ключа, а
+    # в одном процессе растёт и при грубых часах.
+    global _last_version
+    with _version_lock:
+        _last_version = max(time.time_ns(), _last_version + 1)
+        return _last_version
+
+
+def get_feed_versions(*feeds):
+    keys = [VERSION_KEY.format(feed) for feed in feeds]
+    cache = caches['feeds']
+    versions = cache.get_many(keys)
+    missing = {key: new_version() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def bump_feed_versions(feeds):
+    version = new_version()
+    caches['feeds'].set_many(
+        {VERSION_KEY.format(feed): version for feed in feeds}, None
+    )
+
+
+def feed_cache_context(request, feed, page_key):
+    """Параметры тега {% cache %} для страницы ленты.
+
+    page_key описывает страницу, которую выбрал пагинатор, а не сырые
+    параметры запроса: иначе произвольные ?page= и ?cursor= плодили бы
+    фрагменты без ограничений.
+    """
+    version, groups_version = get_feed_versions(feed, GROUPS)
+    key = (
+        feed,
+        version,
+        groups_version,
+        page_key,
+        request.user.is_authenticated,
+    )
+    return {
+        'feed_cache': {
+            'timeout': settings.POSTS_FEED_FRAGMENT_TIMEOUT,
+            'key': ':'.join(map(str, key)),
+        },
+    }
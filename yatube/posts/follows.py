@@ -0,0 +1,35 @@
+"""Кэш авторов, на которых подписан пользователь.
+
+Множество id авторов хранится в кэше 'timeline' и сбрасывается сигналами
+подписки и отписки, поэтому шаблоны проверяют подписку без запросов.
+"""
+from django.core.cache import caches
+
+from core.cache import get_or_set_locked
+
+from .models import Follow
+
+FOLLOWED_KEY = 'posts:followed:{}'
+
+
+def followed_author_ids(user):
+    if not user.is_authenticated:
+        return frozenset()
+    return get_or_set_locked(
+        caches['timeline'],
+        FOLLOWED_KEY.format(user.pk),
+        lambda: frozenset(Follow.objects.filter(
+            user=user
+        ).values_list('author_id', flat=True)),
+    )
+
+
+def forget_followed_authors(user_id):
+    caches['timeline'].delete(FOLLOWED_KEY.format(user_id))
+
+
+def is_following(user, author):
+    """Подписан ли user на author: один EXISTS по индексу (user, author)."""
+    return user.is_authenticated and Follow.objects.filter(
+        user=user, author=author
+    ).exists()
@@ -1,4 +1,6 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
+from posts.images import normalize_image
 from posts.models import Comment, Post
 
 
@@ -17,6 +19,12 @@ class PostForm(forms.ModelForm):
             'image': 'Можете добавить картинку',
         }
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            return normalize_image(image)
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,136 @@
+"""Нормализация картинок, загружаемых в посты.
+
+Большие картинки уменьшаются до POSTS_IMAGE_MAX_SIDE по длинной стороне,
+перекодируются в POSTS_IMAGE_FORMAT и теряют метаданные (EXIF, профили).
+Картинка читается из файла загрузки, JPEG сразу декодируется в
+уменьшенном масштабе (Image.thumbnail), результат пишется во временный
+файл, который остаётся в памяти, только пока он небольшой.
+
+Анимации не перекодируются: они сохраняются как есть, если укладываются
+в POSTS_IMAGE_MAX_SIDE и их кадры вместе - в POSTS_IMAGE_MAX_PIXELS, а
+иначе отклоняются.
+"""
+import os
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
+from PIL import Image
+
+EXIF_ORIENTATION = 0x0112
+ORIENTATION_TRANSPOSE = {
+    2: Image.FLIP_LEFT_RIGHT,
+    3: Image.ROTATE_180,
+    4: Image.FLIP_TOP_BOTTOM,
+    5: Image.TRANSPOSE,
+    6: Image.ROTATE_270,
+    7: Image.TRANSVERSE,
+    8: Image.ROTATE_90,
+}
+EXTENSIONS = {'JPEG': '.jpg', 'PNG': '.png', 'WEBP': '.webp'}
+SAVE_OPTIONS = {
+    'JPEG': {'optimize': True, 'progressive': True},
+    'PNG': {'optimize': True},
+    'WEBP': {'method': 4},
+}
+
+
+def has_metadata(image):
+    return bool(image.getexif()) or 'icc_profile' in image.info
+
+
+def needs_normalizing(image, upload):
+    return (
+        max(image.size) > settings.POSTS_IMAGE_MAX_SIDE
+        or upload.size > settings.POSTS_IMAGE_KEEP_SIZE
+        or has_metadata(image)
+    )
+
+
+def output_format(image):
+    # Прозрачность теряется в JPEG, такие картинки сохраняются в PNG.
+    has_alpha = image.mode in ('RGBA', 'LA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
+    if has_alpha and settings.POSTS_IMAGE_FORMAT == 'JPEG':
+        return 'PNG'
+    return settings.POSTS_IMAGE_FORMAT
+
+
+def check_size(image):
+    """Отклоняет картинку, которую слишком дорого декодировать."""
+    width, height = image.size
+    if width * height > settings.POSTS_IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            'Картинка слишком большая: %(width)s×%(height)s.',
+            code='image_too_large',
+            params={'width': width, 'height': height},
+        )
+    if not getattr(image, 'is_animated', False):
+        return
+    frames = image.n_frames
+    if (
+        max(width, height) > settings.POSTS_IMAGE_MAX_SIDE
+        or width * height * frames > settings.POSTS_IMAGE_MAX_PIXELS
+    ):
+        raise ValidationError(
+            'Анимация слишком большая: %(width)s×%(height)s, '
+            'кадров: %(frames)s.',
+            code='animation_too_large',
+            params={'width': width, 'height': height, 'frames': frames},
+        )
+
+
+def reencode(image, format_):
+    """Уменьшенная копия картинки без метаданных во временном файле."""
+    side = settings.POSTS_IMAGE_MAX_SIDE
+    orientation = image.getexif().get(EXIF_ORIENTATION)
+    image.thumbnail((side, side), Image.LANCZOS)
+    if orientation in ORIENTATION_TRANSPOSE:
+        image = image.transpose(ORIENTATION_TRANSPOSE[orientation])
+    if format_ != 'PNG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    output = SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+    )
+    image.save(
+        output,
+        format_,
+        quality=settings.POSTS_IMAGE_QUALITY,
+        **SAVE_OPTIONS.get(format_, {}),
+    )
+    return output
+
+
+def normalize_image(upload):
+    """Возвращает нормализованную копию загруженной картинки.
+
+    Небольшие картинки без метаданных и анимации возвращаются как есть.
+    Картинка, которую не удалось декодировать, вызывает ValidationError.
+    """
+    upload.seek(0)
+    with Image.open(upload) as image:
+        check_size(image)
+        animated = getattr(image, 'is_animated', False)
+        if animated or not needs_normalizing(image, upload):
+            upload.seek(0)
+            return upload
+        format_ = output_format(image)
+        try:
+            output = reencode(image, format_)
+        except OSError:
+            # Файл повреждён или обрезан: заголовок прочитался, а данные
+            # картинки - нет.
+            raise ValidationError(
+                'Не удалось прочитать картинку.', code='invalid_image'
+            )
+    size = output.tell()
+    output.seek(0)
+    name = os.path.splitext(os.path.basename(upload.name))[0]
+    return UploadedFile(
+        output,
+        name=name + EXTENSIONS.get(format_, '.' + format_.lower()),
+        content_type=Image.MIME[format_],
+        size=size,
+    )
@@ -0,0 +1,104 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+from posts.paginator import NEXT, KeysetPaginator
+
+User = get_user_model()
+
+INDEX_ONLY = 'index-only range scan'
+INDEX = 'index range scan'
+FULL_SCAN = 'full scan'
+
+
+def first_pk(model):
+    return model.objects.values_list('pk', flat=True).first() or 0
+
+
+def classify(plan, table):
+    """Как план читает таблицу ленты и нужна ли ему сортировка."""
+    if connection.vendor == 'postgresql':
+        lines = [line for line in plan if f' on {table}' in line]
+        if any('Index Only Scan' in line for line in lines):
+            scan = INDEX_ONLY
+        elif any('Index Scan' in line for line in lines):
+            scan = INDEX
+        else:
+            scan = FULL_SCAN
+        return scan, any(re.search(r'\bSort\b', line) for line in plan)
+    lines = [
+        line for line in plan
+        if re.search(rf'\b(SCAN|SEARCH)( TABLE)? {table}\b', line)
+    ]
+    if any('COVERING INDEX' in line for line in lines):
+        scan = INDEX_ONLY
+    elif any('USING INDEX' in line or 'PRIMARY KEY' in line
+             for line in lines):
+        scan = INDEX
+    else:
+        scan = FULL_SCAN
+    return scan, any('TEMP B-TREE' in line for line in plan)
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет EXPLAIN для запросов лент и сообщает, читают ли они '
+        'таблицу по индексу без сортировки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verbose-plans',
+            action='store_true',
+            help='Печатать планы целиком.',
+        )
+
+    def feed_queries(self):
+        per_page = 10
+        user = first_pk(User)
+        post = Post.objects.order_by('-pub_date', '-pk').values_list(
+            'pub_date', 'pk'
+        ).first()
+        feeds = {
+            'index': Post.objects.for_feed(),
+            'group': Post.objects.filter(group=first_pk(Group)).for_feed(),
+            'author': Post.objects.filter(author=user).for_feed(),
+        }
+        for name, queryset in feeds.items():
+            yield name, Post, KeysetPaginator.seek(
+                queryset, NEXT, post
+            )[:per_page]
+        yield 'follow', TimelineEntry, KeysetPaginator.seek(
+            TimelineEntry.objects.filter(user=user).for_feed(),
+            NEXT,
+            post,
+            'post_id',
+        )[:per_page]
+        yield 'comments', Comment, KeysetPaginator.seek(
+            Comment.objects.filter(post=first_pk(Post)).for_list(),
+            NEXT,
+        )[:per_page]
+        yield 'follow_exists', Follow, Follow.objects.filter(
+            user=user, author=user
+        ).values('pk')[:1]
+
+    def handle(self, *args, verbose_plans, **options):
+        slow = 0
+        for name, model, queryset in self.feed_queries():
+            plan = queryset.explain().splitlines()
+            scan, sort = classify(plan, model._meta.db_table)
+            ok = scan != FULL_SCAN and not sort
+            slow += not ok
+            verdict = scan + (', сортировка' if sort else '')
+            style = self.style.SUCCESS if ok else self.style.WARNING
+            self.stdout.write(style(f'{name}: {verdict}'))
+            if verbose_plans or not ok:
+                for line in plan:
+                    self.stdout.write(f'    {line}')
+        if slow:
+            self.stdout.write(self.style.WARNING(
+                f'Запросов без индекса или с сортировкой: {slow}'
+            ))
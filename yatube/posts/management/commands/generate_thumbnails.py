@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import generate_thumbnails, get_ready_thumbnails
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт недостающие миниатюры картинок постов, например после '
+        'перезапуска, прервавшего очередь.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Для скольких картинок искать миниатюры за одно обращение.',
+        )
+
+    def handle(self, *args, batch_size, **options):
+        images = Post.objects.exclude(image='').values_list(
+            'image', flat=True
+        )
+        batch = []
+        generated = 0
+        for name in images.iterator():
+            batch.append(name)
+            if len(batch) == batch_size:
+                generated += self.generate_missing(batch)
+                batch = []
+        generated += self.generate_missing(batch)
+        self.stdout.write(self.style.SUCCESS(
+            f'Созданы миниатюры картинок: {generated}'
+        ))
+
+    @staticmethod
+    def generate_missing(names):
+        missing = {
+            name
+            for name, *_, thumbnail in get_ready_thumbnails(names)
+            if thumbnail is None
+        }
+        for name in missing:
+            generate_thumbnails(name)
+        return len(missing)
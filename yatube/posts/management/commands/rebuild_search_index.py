@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Post, PostTerm
+from posts.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = (
+        'Заново строит поисковый индекс постов, например после '
+        'массовой загрузки, которая не отправляет сигналы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Сколько записей индекса вставлять одним запросом.',
+        )
+
+    def handle(self, *args, batch_size, **options):
+        with transaction.atomic():
+            indexed = rebuild_index(Post, PostTerm, batch_size)
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано постов: {indexed}'
+        ))
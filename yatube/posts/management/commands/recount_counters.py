@@ -0,0 +1,48 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+
+from posts.models import Comment, Follow, Post, Profile
+from posts.recount import recount_comments, recount_profiles
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счётчики постов, комментариев и подписок, '
+        'исправляя расхождения с данными.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10000,
+            help='Сколько строк обновлять в одной транзакции.',
+        )
+
+    def handle(self, *args, batch_size, **options):
+        posts = self.recount_in_batches(
+            Post, batch_size,
+            lambda start, stop: recount_comments(Post, Comment, start, stop),
+        )
+        profiles = self.recount_in_batches(
+            User, batch_size,
+            lambda start, stop: recount_profiles(
+                User, Profile, Post, Follow, start, stop
+            ),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано постов: {posts}, профилей: {profiles}'
+        ))
+
+    @staticmethod
+    def recount_in_batches(model, batch_size, recount):
+        last_pk = model.objects.aggregate(last=Max('pk'))['last'] or 0
+        updated = 0
+        for start in range(0, last_pk + 1, batch_size):
+            with transaction.atomic():
+                updated += recount(start, start + batch_size)
+        return updated
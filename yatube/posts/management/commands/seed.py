@@ -0,0 +1,98 @@
+import argparse
+
+from django.core.management.base import BaseCommand
+
+from posts.seeding import Distribution, Seeder
+
+
+def distribution(spec):
+    try:
+        return Distribution(spec)
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(str(error))
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, группами, постами, '
+        'подписками и комментариями для нагрузочных замеров.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--comments', type=int, default=50000)
+        parser.add_argument(
+            '--follows',
+            type=int,
+            default=20,
+            help='Сколько подписок в среднем у пользователя.',
+        )
+        for name, objects in (
+            ('post', 'постов по авторам'),
+            ('follow', 'подписчиков по авторам'),
+            ('comment', 'комментариев по постам'),
+        ):
+            parser.add_argument(
+                f'--{name}-distribution',
+                type=distribution,
+                default=Distribution('zipf'),
+                help=f'Распределение {objects}: uniform или zipf[:s].',
+            )
+        parser.add_argument(
+            '--group-share',
+            type=float,
+            default=0.7,
+            help='Доля постов в группах.',
+        )
+        parser.add_argument(
+            '--images',
+            type=float,
+            default=0.0,
+            help='Доля постов с картинкой-заглушкой.',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=365,
+            help='За сколько последних дней распределены посты.',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Зерно генератора: одинаковое зерно даёт одинаковые данные.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Сколько процессов создают строки.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10000,
+            help='Сколько строк вставлять в одной транзакции.',
+        )
+
+    def handle(self, *args, workers, verbosity, **options):
+        self.verbosity = verbosity
+        seeder = Seeder(**{
+            name: options[name] for name in (
+                'users', 'groups', 'posts', 'comments', 'follows',
+                'post_distribution', 'follow_distribution',
+                'comment_distribution', 'group_share', 'images', 'days',
+                'seed', 'batch_size',
+            )
+        })
+        created = seeder.run(workers, progress=self.progress)
+        self.stdout.write(self.style.SUCCESS(
+            'Созданы пользователи: {users}, группы: {groups}, посты: {posts}, '
+            'подписки: {follows}, комментарии: {comments}'.format(**created)
+        ))
+
+    def progress(self, kind, count):
+        if self.verbosity > 1:
+            self.stdout.write(f'{kind}: {count}')
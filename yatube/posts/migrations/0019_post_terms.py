@@ -0,0 +1,181 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:51
+
+import re
+from collections import Counter
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Замороженная копия токенизатора posts.search и стеммера posts.stemmer
+# на момент миграции: их дальнейшие изменения её не касаются, индекс
+# после них перестраивает команда rebuild_search_index.
+WORD = re.compile(r'[^\W_]+')
+STOP_WORDS = frozenset((
+    'а', 'без', 'бы', 'в', 'во', 'вот', 'все', 'вы', 'да', 'для', 'до',
+    'его', 'ее', 'если', 'же', 'за', 'и', 'из', 'или', 'им', 'их', 'к',
+    'как', 'ко', 'ли', 'мне', 'мы', 'на', 'не', 'нет', 'но', 'о', 'об',
+    'он', 'она', 'они', 'от', 'по', 'при', 'с', 'со', 'так', 'то', 'ты',
+    'у', 'уже', 'что', 'это', 'я',
+))
+MAX_TERM_LENGTH = 64
+BATCH_SIZE = 500
+
+VOWELS = 'аеиоуыэюя'
+
+# Окончания первых групп отсекаются, только если перед ними а или я.
+PERFECTIVE_GERUND = (
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+ADJECTIVE = (
+    (),
+    (
+        'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+        'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую',
+        'юю', 'ая', 'яя', 'ою', 'ею',
+    ),
+)
+PARTICIPLE = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+REFLEXIVE = ((), ('ся', 'сь'))
+VERB = (
+    (
+        'ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но',
+        'ет', 'ют', 'ны', 'ть', 'ешь', 'нно',
+    ),
+    (
+        'ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей',
+        'уй', 'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят',
+        'ует', 'уют', 'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю',
+    ),
+)
+NOUN = (
+    (),
+    (
+        'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии',
+        'и', 'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам',
+        'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия',
+        'ья', 'я',
+    ),
+)
+DERIVATIONAL = ('ость', 'ост')
+SUPERLATIVE = ('ейше', 'ейш')
+
+
+def next_region(word, start):
+    """Начало области после первой согласной, идущей за гласной."""
+    for i in range(start + 1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            return i + 1
+    return len(word)
+
+
+def strip_ending(rv, endings):
+    """Отсекает самое длинное окончание, None - если отсечь нечего."""
+    conditional, plain = endings
+    matches = [ending for ending in conditional + plain if rv.endswith(ending)]
+    if not matches:
+        return None
+    ending = max(matches, key=len)
+    rest = rv[:-len(ending)]
+    if ending in conditional and not rest.endswith(('а', 'я')):
+        return None
+    return rest
+
+
+def strip_inflection(rv):
+    """Первый шаг алгоритма: отсекает окончание словоформы."""
+    stripped = strip_ending(rv, PERFECTIVE_GERUND)
+    if stripped is not None:
+        return stripped
+    reflexive = strip_ending(rv, REFLEXIVE)
+    if reflexive is not None:
+        rv = reflexive
+    stripped = strip_ending(rv, ADJECTIVE)
+    if stripped is not None:
+        participle = strip_ending(stripped, PARTICIPLE)
+        return stripped if participle is None else participle
+    stripped = strip_ending(rv, VERB)
+    if stripped is None:
+        stripped = strip_ending(rv, NOUN)
+    return rv if stripped is None else stripped
+
+
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    rv_start = next(
+        (i + 1 for i, char in enumerate(word) if char in VOWELS), len(word)
+    )
+    r2_start = next_region(word, next_region(word, 0))
+    prefix, rv = word[:rv_start], word[rv_start:]
+
+    rv = strip_inflection(rv)
+    if rv.endswith('и'):
+        rv = rv[:-1]
+
+    for ending in DERIVATIONAL:
+        if rv.endswith(ending):
+            if len(prefix) + len(rv) - len(ending) >= r2_start:
+                rv = rv[:-len(ending)]
+            break
+
+    superlative = next(
+        (ending for ending in SUPERLATIVE if rv.endswith(ending)), None
+    )
+    if superlative is not None:
+        rv = rv[:-len(superlative)]
+        if rv.endswith('нн'):
+            rv = rv[:-1]
+    elif rv.endswith(('нн', 'ь')):
+        rv = rv[:-1]
+    return prefix + rv
+
+
+def post_terms(text):
+    return Counter(
+        stem(word)[:MAX_TERM_LENGTH]
+        for word in WORD.findall(text.lower().replace('ё', 'е'))
+        if word not in STOP_WORDS
+    )
+
+
+def build_search_index(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    PostTerm = apps.get_model('posts', 'PostTerm')
+    posts = Post.objects.values_list('pk', 'text').order_by('pk')
+    terms = []
+    for pk, text in posts.iterator(chunk_size=BATCH_SIZE):
+        terms.extend(
+            PostTerm(post_id=pk, term=term, count=count)
+            for term, count in post_terms(text).items()
+        )
+        if len(terms) >= BATCH_SIZE:
+            PostTerm.objects.bulk_create(terms, batch_size=BATCH_SIZE)
+            terms = []
+    PostTerm.objects.bulk_create(terms, batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Основа слова')),
+                ('count', models.PositiveIntegerField(verbose_name='Вхождений')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='posts.Post')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='postterm',
+            constraint=models.UniqueConstraint(fields=('term', 'post'), name='unique_post_term'),
+        ),
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
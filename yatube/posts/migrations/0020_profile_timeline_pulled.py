@@ -0,0 +1,28 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_pulled_authors(apps, schema_editor):
+    Profile = apps.get_model('posts', 'Profile')
+    limit = getattr(settings, 'POSTS_TIMELINE_FANOUT_LIMIT', 1000)
+    Profile.objects.filter(follower_count__gt=limit).update(
+        timeline_pulled=True
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_post_terms'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='timeline_pulled',
+            field=models.BooleanField(default=False, verbose_name='Посты читаются при чтении ленты'),
+        ),
+        migrations.RunPython(mark_pulled_authors, migrations.RunPython.noop),
+    ]
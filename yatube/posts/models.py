@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import connections, models, transaction
+from django.db.models.signals import post_delete, post_save
 from django.contrib.auth import get_user_model
 from core.models import CreateModel
 
@@ -23,16 +24,39 @@ class Group(models.Model):
         return self.title
 
 
+# Колонки, которые выводят шаблоны лент.
+FEED_FIELDS = (
+    'text',
+    'pub_date',
+    'image',
+    'comment_count',
+    'author',
+    'author__username',
+    'group',
+    'group__slug',
+    'group__title',
+)
+
+
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Посты вместе с автором и группой, без неиспользуемых колонок."""
+        return self.select_related('author', 'group').only(*FEED_FIELDS)
+
+
 class Post(CreateModel):
     text = models.TextField(
         'Текст поста',
         help_text='Введите текст поста',
     )
+    # Отдельные индексы внешних ключей не нужны: их заменяют составные
+    # индексы лент из Meta.
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
         verbose_name='Автор',
         related_name='posts',
+        db_index=False,
     )
     group = models.ForeignKey(
         Group,
@@ -42,6 +66,7 @@ class Post(CreateModel):
         verbose_name='Группа',
         related_name='posts',
         help_text='Выберите группу',
+        db_index=False,
     )
 
     image = models.ImageField(
@@ -49,12 +74,37 @@ class Post(CreateModel):
         upload_to='posts/',
         blank=True
     )
+    comment_count = models.IntegerField(
+        'Комментариев',
+        default=0,
+        editable=False,
+    )
+
+    objects = PostQuerySet.as_manager()
 
     def __str__(self):
         return self.text[:15]
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx',
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx',
+            ),
+        ]
+
+
+class CommentQuerySet(models.QuerySet):
+    def for_list(self):
+        """Комментарии вместе с именем автора для вывода списком."""
+        return self.select_related('author').only(
+            'post', 'text', 'pub_date', 'author__username'
+        )
 
 
 class Comment(CreateModel):
@@ -62,6 +112,7 @@ class Comment(CreateModel):
         Post,
         related_name='comments',
         on_delete=models.CASCADE,
+        db_index=False,
     )
     author = models.ForeignKey(
         User,
@@ -73,21 +124,191 @@ class Comment(CreateModel):
         help_text='Текст нового комментария',
     )
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['post', '-pub_date', '-id'],
+                name='comment_post_pub_date_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.text
 
 
+class FollowQuerySet(models.QuerySet):
+    """Подписка и отписка одним запросом, безопасные при гонках.
+
+    Сигналы post_save и post_delete, на которых держатся счётчики и
+    ленты, отправляются, только если строка действительно добавлена или
+    удалена; у экземпляра в сигнале заполнены лишь user_id и author_id.
+    """
+
+    def _execute(self, sql, params):
+        """Выполняет запрос, возвращает число затронутых строк."""
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.rowcount
+
+    def _columns(self):
+        """Таблица и столбцы user_id, author_id, готовые для SQL."""
+        quote = connections[self.db].ops.quote_name
+        meta = self.model._meta
+        return (
+            quote(meta.db_table),
+            quote(meta.get_field('user').column),
+            quote(meta.get_field('author').column),
+        )
+
+    def follow(self, user, author):
+        """Подписывает user на author, возвращает True для новой подписки."""
+        ops = connections[self.db].ops
+        table, user_column, author_column = self._columns()
+        sql = (
+            f'{ops.insert_statement(ignore_conflicts=True)} {table} '
+            f'({user_column}, {author_column}) VALUES (%s, %s) '
+            f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}'
+        )
+        with transaction.atomic(using=self.db):
+            created = self._execute(sql, [user.pk, author.pk]) > 0
+            if created:
+                post_save.send(
+                    sender=self.model,
+                    instance=self.model(user_id=user.pk, author_id=author.pk),
+                    created=True,
+                    update_fields=None,
+                    raw=False,
+                    using=self.db,
+                )
+        return created
+
+    def unfollow(self, user, author):
+        """Отписывает user от author, возвращает True, если подписка была."""
+        table, user_column, author_column = self._columns()
+        sql = (
+            f'DELETE FROM {table} '
+            f'WHERE {user_column} = %s AND {author_column} = %s'
+        )
+        with transaction.atomic(using=self.db):
+            deleted = self._execute(sql, [user.pk, author.pk]) > 0
+            if deleted:
+                post_delete.send(
+                    sender=self.model,
+                    instance=self.model(user_id=user.pk, author_id=author.pk),
+                    using=self.db,
+                )
+        return deleted
+
+
 class Follow(models.Model):
     user = models.ForeignKey(
         User,
         related_name="follower",
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        db_index=False,
     )
     author = models.ForeignKey(
         User,
         related_name="following",
         on_delete=models.CASCADE
     )
+
+    objects = FollowQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'], name='unique_follow'
+            ),
+        ]
+
+
+class Profile(models.Model):
+    """Денормализованные счётчики пользователя.
+
+    Обновляются сигналами при создании и удалении постов и подписок,
+    расхождения исправляет команда recount_counters. Вместе со счётчиком
+    подписчиков меняется и timeline_pulled (posts.timeline).
+    """
+    user = models.OneToOneField(
+        User,
+        primary_key=True,
+        related_name='profile',
+        on_delete=models.CASCADE,
+    )
+    post_count = models.IntegerField('Постов', default=0)
+    follower_count = models.IntegerField('Подписчиков', default=0)
+    following_count = models.IntegerField('Подписок', default=0)
+    # Посты автора с числом подписчиков больше POSTS_TIMELINE_FANOUT_LIMIT
+    # не копируются в ленты подписчиков, а подмешиваются при чтении.
+    timeline_pulled = models.BooleanField(
+        'Посты читаются при чтении ленты', default=False
+    )
+
+    def __str__(self):
+        return str(self.user)
+
+
+class TimelineEntryQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Записи ленты вместе с постами, подготовленными как в for_feed."""
+        return self.select_related('post__author', 'post__group').only(
+            'user', 'pub_date', 'post',
+            *(f'post__{field}' for field in FEED_FIELDS)
+        )
+
+
+class TimelineEntry(models.Model):
+    """Пост в материализованной ленте подписок пользователя.
+
+    pub_date копируется из поста, чтобы лента читалась одним проходом
+    по индексу (user, pub_date, post).
+    """
+    user = models.ForeignKey(
+        User,
+        related_name='timeline',
+        on_delete=models.CASCADE,
+    )
+    post = models.ForeignKey(
+        Post,
+        related_name='timeline_entries',
+        on_delete=models.CASCADE,
+    )
+    pub_date = models.DateTimeField('Дата создания поста')
+
+    objects = TimelineEntryQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-pub_date', '-post']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_timeline_post'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx',
+            ),
+        ]
+
+
+class PostTerm(models.Model):
+    """Запись обратного индекса поиска: основа слова в тексте поста."""
+    term = models.CharField('Основа слова', max_length=64)
+    post = models.ForeignKey(
+        Post,
+        related_name='terms',
+        on_delete=models.CASCADE,
+    )
+    count = models.PositiveIntegerField('Вхождений')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['term', 'post'], name='unique_post_term'
+            ),
+        ]
@@ -0,0 +1,179 @@
+import math
+
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.encoding import force_str
+from django.utils.functional import cached_property
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+from .counts import EXACT
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class CountingPaginator(Paginator):
+    """Paginator, который считает записи через FeedCounter.
+
+    Стратегия, фактически применённая при подсчёте, доступна в
+    count_strategy, чтобы можно было следить за устареванием счётчиков.
+    """
+    is_keyset = False
+
+    def __init__(self, object_list, per_page, counter=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.counter = counter
+
+    @cached_property
+    def count(self):
+        return self.count_objects()
+
+    def count_objects(self):
+        if self.counter is None:
+            return self.object_list.count()
+        return self.counter.count(self.object_list)
+
+    @property
+    def count_strategy(self):
+        if self.counter is None:
+            return EXACT
+        return self.counter.strategy
+
+    def normalize_number(self, number):
+        """Номер страницы, которую на самом деле вернёт get_page(number)."""
+        try:
+            return self.validate_number(number)
+        except PageNotAnInteger:
+            return 1
+        except EmptyPage:
+            return self.num_pages
+
+
+class KeysetPaginator(CountingPaginator):
+    """Пагинация по ключу (pub_date, id) без COUNT и OFFSET.
+
+    Страница выбирается по непрозрачному курсору, в котором закодированы
+    направление, номер страницы и ключ граничной записи. Старые ссылки
+    вида ?page=N обслуживаются через OFFSET, но не дальше max_offset_pages:
+    на более глубокий номер get_page вызывает EmptyPage.
+    """
+    is_keyset = True
+    id_field = 'pk'
+
+    def __init__(self, object_list, per_page, max_offset_pages=50, **kwargs):
+        super().__init__(
+            object_list.order_by('-pub_date', f'-{self.id_field}'),
+            per_page,
+            **kwargs
+        )
+        self.max_offset_pages = max_offset_pages
+
+    def get_page(self, number=None, cursor=None):
+        position = self.decode_cursor(cursor)
+        if position is not None:
+            return self._keyset_page(*position)
+        return self._offset_page(self.normalize_number(number))
+
+    def normalize_number(self, number):
+        """Номер страницы для ?page=N.
+
+        Страницы глубже max_offset_pages доступны только по курсору, для
+        них вызывается EmptyPage.
+        """
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            number = 1
+        if number > self.max_offset_pages:
+            raise EmptyPage(
+                f'Дальше страницы {self.max_offset_pages} лента '
+                f'листается только по курсору'
+            )
+        return max(number, 1)
+
+    @staticmethod
+    def encode_cursor(obj, direction, number):
+        raw = f'{direction}|{number}|{obj.pub_date.isoformat()}|{obj.pk}'
+        return urlsafe_base64_encode(raw.encode())
+
+    @staticmethod
+    def decode_cursor(cursor):
+        if not cursor:
+            return None
+        try:
+            direction, number, pub_date, pk = force_str(
+                urlsafe_base64_decode(cursor)
+            ).split('|')
+            position = (
+                direction, int(number), parse_datetime(pub_date), int(pk)
+            )
+        except (TypeError, ValueError):
+            return None
+        if direction not in (NEXT, PREVIOUS) or position[2] is None:
+            return None
+        return position
+
+    @staticmethod
+    def seek(queryset, direction, position=None, id_field='pk'):
+        """Упорядочивает queryset от позиции (pub_date, id) в направлении."""
+        lookup = 'lt' if direction == NEXT else 'gt'
+        if position is not None:
+            pub_date, pk = position
+            queryset = queryset.filter(
+                Q(**{f'pub_date__{lookup}': pub_date})
+                | Q(**{'pub_date': pub_date, f'{id_field}__{lookup}': pk})
+            )
+        if direction == NEXT:
+            return queryset.order_by('-pub_date', f'-{id_field}')
+        return queryset.order_by('pub_date', id_field)
+
+    def fetch(self, direction, position=None, offset=0, limit=None):
+        """Строки страницы; наследники могут собирать их из нескольких
+        источников, сохраняя порядок по (pub_date, pk)."""
+        return list(self.seek(
+            self.object_list, direction, position, self.id_field
+        )[offset:offset + limit])
+
+    def bounded_count(self, limit):
+        return self.object_list[:limit].count()
+
+    def _keyset_page(self, direction, number, pub_date, pk):
+        rows = self.fetch(direction, (pub_date, pk), limit=self.per_page + 1)
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == NEXT:
+            return self._build_page(rows, max(number, 2), has_more)
+        return self._build_page(
+            rows[::-1], max(number, 2) if has_more else 1, True
+        )
+
+    def _offset_page(self, number):
+        bottom = (number - 1) * self.per_page
+        rows = self.fetch(NEXT, offset=bottom, limit=self.per_page + 1)
+        if not rows and number > 1:
+            # Страница за концом ленты: как и Paginator.get_page, отдаём
+            # последнюю, считая записи только в пределах разрешённой глубины.
+            total = self.bounded_count(
+                self.max_offset_pages * self.per_page
+            )
+            return self._offset_page(
+                max(1, math.ceil(total / self.per_page))
+            )
+        has_next = len(rows) > self.per_page
+        return self._build_page(rows[:self.per_page], number, has_next)
+
+    def _build_page(self, rows, number, has_next):
+        # Page.has_next() и next_page_number() опираются на num_pages,
+        # поэтому подставляем значение, известное без подсчёта строк.
+        self.__dict__['num_pages'] = number + 1 if has_next else number
+        page = self._get_page(rows, number, self)
+        page.next_cursor = None
+        page.previous_cursor = None
+        if rows and has_next:
+            page.next_cursor = self.encode_cursor(rows[-1], NEXT, number + 1)
+        if rows and number > 1:
+            page.previous_cursor = self.encode_cursor(
+                rows[0], PREVIOUS, number - 1
+            )
+        return page
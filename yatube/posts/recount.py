@@ -0,0 +1,47 @@
+"""Пересчёт денормализованных счётчиков.
+
+Модели передаются параметрами. Миграции этот модуль не импортируют: у
+них своя копия пересчёта, которая не меняется вместе с ним.
+"""
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(model, field):
+    """Число строк model, у которых field ссылается на внешнюю строку."""
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+            field
+        ).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def pk_window(queryset, field, start=None, stop=None):
+    if start is not None:
+        queryset = queryset.filter(**{f'{field}__gte': start})
+    if stop is not None:
+        queryset = queryset.filter(**{f'{field}__lt': stop})
+    return queryset
+
+
+def recount_comments(Post, Comment, start=None, stop=None):
+    posts = pk_window(Post.objects.all(), 'pk', start, stop)
+    return posts.update(comment_count=count_subquery(Comment, 'post'))
+
+
+def recount_profiles(User, Profile, Post, Follow, start=None, stop=None):
+    users = pk_window(User.objects.all(), 'pk', start, stop)
+    Profile.objects.bulk_create(
+        [
+            Profile(user_id=pk) for pk in users.filter(
+                profile__isnull=True
+            ).values_list('pk', flat=True)
+        ],
+        ignore_conflicts=True,
+    )
+    profiles = pk_window(Profile.objects.all(), 'pk', start, stop)
+    return profiles.update(
+        post_count=count_subquery(Post, 'author'),
+        follower_count=count_subquery(Follow, 'author'),
+        following_count=count_subquery(Follow, 'user'),
+    )
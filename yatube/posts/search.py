@@ -0,0 +1,150 @@
+"""Полнотекстовый поиск по постам.
+
+Текст поста разбивается на слова, слова сводятся к основам стеммером
+Snowball и хранятся в обратном индексе PostTerm, который обновляют
+сигналы сохранения поста. Находятся посты со всеми основами запроса,
+ранжированные по TF-IDF: число вхождений основы, умноженное на её вес
+log(N / df). Выдача листается курсором по (ранг, id), без OFFSET.
+"""
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+
+from django.conf import settings
+from django.db.models import Case, Count, F, IntegerField, Q, Sum, When
+from django.utils.encoding import force_str
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+from .counts import get_feed_counter
+from .models import Post, PostTerm
+from .stemmer import stem
+
+WORD = re.compile(r'[^\W_]+')
+STOP_WORDS = frozenset((
+    'а', 'без', 'бы', 'в', 'во', 'вот', 'все', 'вы', 'да', 'для', 'до',
+    'его', 'ее', 'если', 'же', 'за', 'и', 'из', 'или', 'им', 'их', 'к',
+    'как', 'ко', 'ли', 'мне', 'мы', 'на', 'не', 'нет', 'но', 'о', 'об',
+    'он', 'она', 'они', 'от', 'по', 'при', 'с', 'со', 'так', 'то', 'ты',
+    'у', 'уже', 'что', 'это', 'я',
+))
+MAX_TERM_LENGTH = 64
+# Остальные слова длинного запроса не учитываются.
+MAX_QUERY_TERMS = 8
+
+# Словарь текстов намного меньше числа слов в них, основы запоминаются.
+cached_stem = lru_cache(maxsize=100000)(stem)
+
+
+def tokenize(text):
+    """Основы значимых слов текста."""
+    for word in WORD.findall(text.lower().replace('ё', 'е')):
+        if word not in STOP_WORDS:
+            yield cached_stem(word)[:MAX_TERM_LENGTH]
+
+
+def post_terms(text):
+    return Counter(tokenize(text))
+
+
+def index_post(post):
+    PostTerm.objects.filter(post=post).delete()
+    PostTerm.objects.bulk_create([
+        PostTerm(post=post, term=term, count=count)
+        for term, count in post_terms(post.text).items()
+    ])
+
+
+def rebuild_index(post_model, term_model, batch_size=500):
+    """Заново строит индекс всех постов, возвращает их число.
+
+    Модели передаются явно; у миграции 0019 своя замороженная копия.
+    """
+    term_model.objects.all().delete()
+    posts = post_model.objects.values_list('pk', 'text').order_by('pk')
+    terms = []
+    indexed = 0
+    for pk, text in posts.iterator(chunk_size=batch_size):
+        terms.extend(
+            term_model(post_id=pk, term=term, count=count)
+            for term, count in post_terms(text).items()
+        )
+        indexed += 1
+        if len(terms) >= batch_size:
+            term_model.objects.bulk_create(terms, batch_size=batch_size)
+            terms = []
+    term_model.objects.bulk_create(terms, batch_size=batch_size)
+    return indexed
+
+
+def query_terms(query):
+    return list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+
+
+def matching_post_ids(query):
+    """Подзапрос id постов, содержащих все слова запроса."""
+    terms = query_terms(query)
+    if not terms:
+        return PostTerm.objects.none().values('post')
+    return PostTerm.objects.filter(term__in=terms).values('post').annotate(
+        matched=Count('pk')
+    ).filter(matched=len(terms)).values('post')
+
+
+def term_weights(terms):
+    """IDF основ в тысячных: ранг остаётся целым и точно сравнивается
+    при листании."""
+    total = get_feed_counter('index').count(Post.objects.all())
+    frequencies = PostTerm.objects.filter(term__in=terms).values_list(
+        'term'
+    ).annotate(frequency=Count('pk'))
+    return {
+        term: 1 + round(1000 * math.log((total + 1) / frequency))
+        for term, frequency in frequencies
+    }
+
+
+def encode_cursor(score, pk):
+    return urlsafe_base64_encode(f'{score}|{pk}'.encode())
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        score, pk = force_str(urlsafe_base64_decode(cursor)).split('|')
+        return int(score), int(pk)
+    except (TypeError, ValueError):
+        return None
+
+
+def search_posts(query, cursor=None, limit=None):
+    """Страница результатов поиска и курсор следующей страницы."""
+    limit = limit or settings.POSTS_PER_PAGE
+    terms = query_terms(query)
+    weights = term_weights(terms) if terms else {}
+    if not terms or len(weights) < len(terms):
+        return [], None
+    matches = PostTerm.objects.filter(term__in=terms).values('post').annotate(
+        matched=Count('pk'),
+        score=Sum(Case(
+            *(When(term=term, then=F('count') * weight)
+              for term, weight in weights.items()),
+            output_field=IntegerField(),
+        )),
+    ).filter(matched=len(terms))
+    position = decode_cursor(cursor)
+    if position is not None:
+        score, pk = position
+        matches = matches.filter(
+            Q(score__lt=score) | Q(score=score, post_id__lt=pk)
+        )
+    rows = list(matches.order_by('-score', '-post_id').values_list(
+        'post', 'score'
+    )[:limit + 1])
+    posts = Post.objects.for_feed().in_bulk(pk for pk, _ in rows[:limit])
+    results = [posts[pk] for pk, _ in rows[:limit] if pk in posts]
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor(*reversed(rows[limit - 1]))
+    return results, next_cursor
@@ -0,0 +1,370 @@
+"""Генерация синтетических данных для нагрузочных замеров.
+
+Строки вставляются bulk_create кусками по batch_size, каждый кусок в своей
+транзакции; куски одного вида раздаются процессам. Первичные ключи
+задаются явно (после текущего максимума), а генератор случайных чисел
+каждого куска выводится из seed, вида строк и номера куска, поэтому при
+одинаковых параметрах и исходной базе данные получаются одинаковыми при
+любом числе процессов.
+
+Активность распределяется по Distribution: при 'zipf' немногие авторы
+пишут большую часть постов и собирают большую часть подписчиков, а
+немногие посты получают большую часть комментариев.
+
+bulk_create не отправляет сигналы, поэтому поисковый индекс строится
+вместе с постами, а счётчики профилей и постов и ленты подписок
+пересчитываются целиком после загрузки.
+"""
+import multiprocessing
+import random
+from contextlib import contextmanager, nullcontext
+from datetime import timedelta
+from io import BytesIO, StringIO
+from itertools import accumulate
+
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from .models import Comment, Follow, Group, Post, PostTerm
+from .search import post_terms
+from .timeline import rebuild_timelines
+
+User = get_user_model()
+
+WORDS = (
+    'утро город дорога книга кот собака море лес река дом окно друг '
+    'работа проект код ошибка релиз поиск лента пост группа фото вечер '
+    'новый старый быстрый тихий большой маленький красивый интересный '
+    'пишу читаю смотрю думаю гуляю жду люблю делаю ищу нашёл увидел'
+).split()
+PLACEHOLDER_IMAGES = 10
+
+
+class Distribution:
+    """Распределение активности по объектам: 'uniform' или 'zipf[:s]'."""
+
+    def __init__(self, spec):
+        kind, _, exponent = spec.partition(':')
+        if kind not in ('uniform', 'zipf'):
+            raise ValueError(f'Неизвестное распределение: {spec}')
+        self.kind = kind
+        self.exponent = float(exponent or 1.1)
+        if kind == 'uniform' and exponent:
+            raise ValueError('У равномерного распределения нет параметра')
+
+    def __str__(self):
+        if self.kind == 'uniform':
+            return self.kind
+        return f'{self.kind}:{self.exponent}'
+
+    def cum_weights(self, count):
+        """Накопленные веса для random.choices, None - равные веса."""
+        if self.kind == 'uniform':
+            return None
+        return list(accumulate(
+            1 / rank ** self.exponent for rank in range(1, count + 1)
+        ))
+
+
+def sentence(rng, low=5, high=40):
+    return ' '.join(rng.choices(WORDS, k=rng.randint(low, high))).capitalize()
+
+
+def next_pk(model):
+    return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+
+@contextmanager
+def explicit_pub_date(model):
+    """Даёт bulk_create записать pub_date вместо текущего времени."""
+    field = model._meta.get_field('pub_date')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+class Seeder:
+    def __init__(self, users=1000, groups=20, posts=20000, comments=50000,
+                 follows=20, post_distribution='zipf',
+                 follow_distribution='zipf', comment_distribution='zipf',
+                 group_share=0.7, images=0.0, days=365, seed=0,
+                 batch_size=10000):
+        self.users = users
+        self.groups = groups
+        self.posts = posts
+        self.comments = comments
+        # Подписок в среднем на пользователя; повторы отбрасываются.
+        self.follows = users * follows
+        self.post_distribution = Distribution(str(post_distribution))
+        self.follow_distribution = Distribution(str(follow_distribution))
+        self.comment_distribution = Distribution(str(comment_distribution))
+        self.group_share = group_share
+        self.images = images
+        self.seed = seed
+        self.batch_size = batch_size
+        self.now = timezone.now()
+        self.first_date = self.now - timedelta(days=days)
+        self.post_interval = timedelta(days=days) / max(posts, 1)
+        self.user_base = next_pk(User)
+        self.post_base = next_pk(Post)
+        self.comment_base = next_pk(Comment)
+        self.group_ids = []
+        self.image_names = []
+
+    def rng(self, kind, chunk=0):
+        return random.Random(f'{self.seed}:{kind}:{chunk}')
+
+    @cached_property
+    def password(self):
+        return make_password(None)
+
+    @cached_property
+    def authors(self):
+        """Пользователи в порядке убывания активности."""
+        authors = list(range(self.user_base, self.user_base + self.users))
+        self.rng('authors').shuffle(authors)
+        return authors
+
+    @cached_property
+    def post_author_weights(self):
+        return self.post_distribution.cum_weights(self.users)
+
+    @cached_property
+    def follow_author_weights(self):
+        return self.follow_distribution.cum_weights(self.users)
+
+    @cached_property
+    def commented_posts(self):
+        """Номера постов в порядке убывания числа комментариев."""
+        posts = list(range(self.posts))
+        self.rng('commented').shuffle(posts)
+        return posts
+
+    @cached_property
+    def comment_post_weights(self):
+        return self.comment_distribution.cum_weights(self.posts)
+
+    @cached_property
+    def group_weights(self):
+        return Distribution('zipf').cum_weights(len(self.group_ids))
+
+    def post_date(self, number):
+        return self.first_date + self.post_interval * number
+
+    def prepare(self):
+        """Создаёт группы и картинки и готовит общие для процессов данные."""
+        rng = self.rng('groups')
+        group_base = next_pk(Group)
+        Group.objects.bulk_create(
+            Group(
+                pk=pk,
+                title=f'Группа {pk}',
+                slug=f'group-{pk}',
+                description=sentence(rng),
+            )
+            for pk in range(group_base, group_base + self.groups)
+        )
+        self.group_ids = list(range(group_base, group_base + self.groups))
+        if self.images:
+            self.image_names = self.save_placeholder_images()
+        # Вычисляются до запуска процессов, чтобы те получили их готовыми.
+        for name in (
+            'password', 'authors', 'post_author_weights',
+            'follow_author_weights', 'commented_posts',
+            'comment_post_weights', 'group_weights',
+        ):
+            getattr(self, name)
+
+    def save_placeholder_images(self):
+        from PIL import Image
+
+        rng = self.rng('images')
+        names = []
+        for number in range(PLACEHOLDER_IMAGES):
+            color = tuple(rng.randrange(256) for _ in range(3))
+            output = BytesIO()
+            Image.new('RGB', (960, 540), color).save(output, 'JPEG')
+            names.append(default_storage.save(
+                f'posts/seed-{self.seed}-{number}.jpg',
+                ContentFile(output.getvalue()),
+            ))
+        return names
+
+    def chunks(self, kind, total):
+        for chunk, start in enumerate(range(0, total, self.batch_size)):
+            yield kind, chunk, start, min(start + self.batch_size, total)
+
+    def run_chunk(self, kind, chunk, start, stop, write_lock=None):
+        """Строит строки куска и вставляет их одной транзакцией.
+
+        Строки строятся до транзакции, чтобы не держать блокировку базы
+        на время генерации; write_lock по очереди пускает процессы к
+        базе, которая допускает одного пишущего.
+        """
+        build = getattr(self, f'build_{kind}')
+        rows = build(self.rng(kind, chunk), start, stop)
+        with write_lock or nullcontext(), transaction.atomic():
+            with explicit_pub_date(Post), explicit_pub_date(Comment):
+                for model, objects in rows:
+                    model.objects.bulk_create(
+                        objects, ignore_conflicts=model is Follow
+                    )
+        return len(rows[0][1])
+
+    def build_users(self, rng, start, stop):
+        return [(User, [
+            User(
+                pk=self.user_base + number,
+                username=f'user{self.user_base + number}',
+                password=self.password,
+            )
+            for number in range(start, stop)
+        ])]
+
+    def build_posts(self, rng, start, stop):
+        authors = rng.choices(
+            self.authors, cum_weights=self.post_author_weights,
+            k=stop - start,
+        )
+        posts = []
+        for number, author in zip(range(start, stop), authors):
+            group = None
+            if self.group_ids and rng.random() < self.group_share:
+                group = rng.choices(
+                    self.group_ids, cum_weights=self.group_weights
+                )[0]
+            image = ''
+            if self.image_names and rng.random() < self.images:
+                image = rng.choice(self.image_names)
+            posts.append(Post(
+                pk=self.post_base + number,
+                author_id=author,
+                group_id=group,
+                text=sentence(rng),
+                image=image,
+                pub_date=self.post_date(number),
+            ))
+        terms = [
+            PostTerm(post_id=post.pk, term=term, count=count)
+            for post in posts
+            for term, count in post_terms(post.text).items()
+        ]
+        return [(Post, posts), (PostTerm, terms)]
+
+    def build_follows(self, rng, start, stop):
+        authors = rng.choices(
+            self.authors, cum_weights=self.follow_author_weights,
+            k=stop - start,
+        )
+        edges = {
+            (self.user_base + rng.randrange(self.users), author)
+            for author in authors
+        }
+        return [(Follow, [
+            Follow(user_id=user, author_id=author)
+            for user, author in sorted(edges)
+            if user != author
+        ])]
+
+    def build_comments(self, rng, start, stop):
+        posts = rng.choices(
+            self.commented_posts, cum_weights=self.comment_post_weights,
+            k=stop - start,
+        )
+        return [(Comment, [
+            Comment(
+                pk=self.comment_base + number,
+                post_id=self.post_base + post,
+                author_id=self.user_base + rng.randrange(self.users),
+                text=sentence(rng, 2, 15),
+                pub_date=min(
+                    self.post_date(post)
+                    + timedelta(seconds=rng.expovariate(1 / 3600)),
+                    self.now,
+                ),
+            )
+            for number, post in zip(range(start, stop), posts)
+        ])]
+
+    def run(self, workers=1, progress=None):
+        """Создаёт все данные, возвращает число строк каждого вида."""
+        self.prepare()
+        phases = [
+            ('users', self.users),
+            ('posts', self.posts if self.users else 0),
+            ('follows', self.follows if self.users > 1 else 0),
+            ('comments', self.comments if self.posts else 0),
+        ]
+        created = {'groups': self.groups}
+        follows_before = Follow.objects.count()
+        pool = None
+        if workers > 1:
+            context = multiprocessing.get_context()
+            write_lock = None
+            if connection.vendor == 'sqlite':
+                # SQLite: строки строят все процессы, пишут по очереди.
+                write_lock = context.Lock()
+            # Дочерние процессы открывают свои соединения с базой.
+            connections.close_all()
+            pool = context.Pool(
+                workers, initializer=init_worker, initargs=(self, write_lock)
+            )
+        try:
+            for kind, total in phases:
+                chunks = list(self.chunks(kind, total))
+                if pool is None:
+                    done = [self.run_chunk(*chunk) for chunk in chunks]
+                else:
+                    done = pool.starmap(run_worker_chunk, chunks)
+                created[kind] = sum(done)
+                if progress:
+                    progress(kind, created[kind])
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        created['follows'] = Follow.objects.count() - follows_before
+        self.finish()
+        return created
+
+    def finish(self):
+        """Строит данные, которые при обычной записи поддерживают сигналы."""
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                no_style(), [User, Group, Post, Comment]
+            ):
+                cursor.execute(sql)
+        call_command(
+            'recount_counters', batch_size=self.batch_size, stdout=StringIO()
+        )
+        with transaction.atomic():
+            rebuild_timelines()
+        # Версии лент и закэшированные счётчики устарели.
+        caches['feeds'].clear()
+
+
+_seeder = None
+_write_lock = None
+
+
+def init_worker(seeder, write_lock):
+    global _seeder, _write_lock
+    django.setup()
+    _seeder = seeder
+    _write_lock = write_lock
+
+
+def run_worker_chunk(kind, chunk, start, stop):
+    return _seeder.run_chunk(kind, chunk, start, stop, _write_lock)
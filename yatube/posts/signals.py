@@ -0,0 +1,175 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from .counts import adjust_feed_counts, reset_feed_counts
+from .feed_cache import GROUPS, bump_feed_versions
+from .follows import forget_followed_authors
+from .models import (
+    Comment, Follow, Group, Post, Profile, TimelineEntry, User
+)
+from .search import index_post
+from .thumbnails import enqueue_thumbnails
+from .timeline import (
+    author_followed, author_unfollowed, backfill_timeline, fan_out_post,
+    prune_timeline,
+)
+
+
+def after_commit(function, *args):
+    """Вызывает function(*args) после коммита текущей транзакции.
+
+    Кэши сбрасываются только после коммита: сброшенное раньше успеет
+    заново заполниться данными, которые другие соединения ещё видят
+    старыми.
+    """
+    transaction.on_commit(lambda: function(*args))
+
+
+def bump(model, pk, **deltas):
+    """Атомарно сдвигает счётчики строки выражениями F()."""
+    model.objects.filter(pk=pk).update(**{
+        field: F(field) + delta for field, delta in deltas.items()
+    })
+
+
+def post_feeds(post, timeline_users):
+    """Ленты, в которые попадает пост."""
+    feeds = ['index', f'author:{post.author_id}']
+    if post.group_id:
+        feeds.append(f'group:{post.group_id}')
+    feeds.extend(f'follow:{user_id}' for user_id in timeline_users)
+    return feeds
+
+
+def public_feeds(post, previous_group_id=None):
+    """Кэшируемые ленты, чьи страницы меняет запись поста."""
+    feeds = {'index', f'author:{post.author_id}'}
+    for group_id in (post.group_id, previous_group_id):
+        if group_id:
+            feeds.add(f'group:{group_id}')
+    return feeds
+
+
+def prepare_thumbnails(post):
+    """Создаёт миниатюры картинки поста после коммита транзакции.
+
+    Пока миниатюр нет, ленты выводят запасную картинку, поэтому по
+    готовности их версии меняются ещё раз.
+    """
+    feeds = public_feeds(post)
+    transaction.on_commit(lambda: enqueue_thumbnails(
+        post.image.name, lambda: bump_feed_versions(feeds)
+    ))
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_group(sender, instance, **kwargs):
+    instance._previous_group_id = None
+    instance._previous_image = None
+    if instance.pk:
+        instance._previous_group_id, instance._previous_image = (
+            Post.objects.filter(pk=instance.pk).values_list(
+                'group_id', 'image'
+            ).first() or (None, None)
+        )
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    after_commit(
+        bump_feed_versions, public_feeds(instance, previous_group_id)
+    )
+    image = instance.image.name
+    if image and image != getattr(instance, '_previous_image', None):
+        prepare_thumbnails(instance)
+    if created:
+        bump(Profile, instance.author_id, post_count=1)
+        feeds = post_feeds(instance, fan_out_post(instance))
+        after_commit(adjust_feed_counts, feeds, 1)
+        return
+    if previous_group_id != instance.group_id:
+        if previous_group_id:
+            after_commit(
+                adjust_feed_counts, [f'group:{previous_group_id}'], -1
+            )
+        if instance.group_id:
+            after_commit(
+                adjust_feed_counts, [f'group:{instance.group_id}'], 1
+            )
+
+
+@receiver(post_save, sender=Post)
+def index_post_text(sender, instance, update_fields, **kwargs):
+    if update_fields is None or 'text' in update_fields:
+        index_post(instance)
+
+
+@receiver(pre_delete, sender=Post)
+def remember_timeline_users(sender, instance, **kwargs):
+    instance._timeline_users = list(TimelineEntry.objects.filter(
+        post=instance
+    ).values_list('user_id', flat=True))
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    after_commit(bump_feed_versions, public_feeds(instance))
+    bump(Profile, instance.author_id, post_count=-1)
+    timeline_users = getattr(instance, '_timeline_users', [])
+    after_commit(adjust_feed_counts, post_feeds(instance, timeline_users), -1)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    after_commit(bump_feed_versions, [GROUPS])
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        bump(Post, instance.post_id, comment_count=1)
+    after_commit(bump_feed_versions, [f'post:{instance.post_id}'])
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    bump(Post, instance.post_id, comment_count=-1)
+    after_commit(bump_feed_versions, [f'post:{instance.post_id}'])
+
+
+@receiver(post_save, sender=User)
+def create_profile(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        Profile.objects.get_or_create(user=instance)
+
+
+def forget_follows(user_id):
+    """Сбрасывает закэшированные подписки пользователя после коммита."""
+    after_commit(reset_feed_counts, [f'follow:{user_id}'])
+    after_commit(forget_followed_authors, user_id)
+    after_commit(bump_feed_versions, [f'follows:{user_id}'])
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        bump(Profile, instance.author_id, follower_count=1)
+        bump(Profile, instance.user_id, following_count=1)
+        author_followed(instance.author_id)
+        backfill_timeline(instance.user_id, instance.author_id)
+    forget_follows(instance.user_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    bump(Profile, instance.author_id, follower_count=-1)
+    bump(Profile, instance.user_id, following_count=-1)
+    prune_timeline(instance.user_id, instance.author_id)
+    author_unfollowed(instance.author_id)
+    forget_follows(instance.user_id)
@@ -0,0 +1,148 @@
+"""RSS и Atom: последние посты всего сайта, группы и автора.
+
+Лента строится одним запросом по индексу ленты с колонками, которые в
+неё попадают, и хранится в кэше 'feeds' под версией ленты не дольше
+POSTS_FEED_FRAGMENT_TIMEOUT: пока в ленте ничего не изменилось, её отдают
+из кэша, а клиенту с актуальной копией -
+ответ 304 (posts.conditional). Содержимое ленты не зависит от
+пользователя, поэтому её могут хранить и общие кэши.
+"""
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.template.defaultfilters import linebreaksbr, truncatechars
+from django.urls import reverse
+from django.utils.feedgenerator import Rss201rev2Feed
+
+from core.cache import get_or_set_locked
+
+from .conditional import not_modified, set_validators, version_validators
+from .models import Group, Post, User
+
+SYNDICATION_KEY = 'posts:syndication:{}:{}:{}'
+# Колонки постов, которые выводит лента.
+SYNDICATION_FIELDS = (
+    'text',
+    'pub_date',
+    'author',
+    'author__username',
+    'group',
+    'group__title',
+)
+
+
+class PostFeed(Feed):
+    """Лента постов; наследники задают объект, ленту версий и посты."""
+
+    def __init__(self, feed_type=Rss201rev2Feed):
+        self.feed_type = feed_type
+
+    def __call__(self, request, *args, **kwargs):
+        obj = self.get_object(request, *args, **kwargs)
+        validators = version_validators([self.feed_name(obj)])
+        response = not_modified(request, validators, private=False)
+        if response is not None:
+            return response
+        # Абсолютные ссылки ленты зависят от адреса сайта в запросе.
+        key = SYNDICATION_KEY.format(
+            self.feed_type.__name__,
+            request.build_absolute_uri('/'),
+            validators[0],
+        )
+        content = get_or_set_locked(
+            caches['feeds'],
+            key,
+            lambda: self.get_feed(obj, request).writeString('utf-8'),
+            settings.POSTS_FEED_FRAGMENT_TIMEOUT,
+        )
+        response = HttpResponse(
+            content, content_type=self.feed_type.content_type
+        )
+        return set_validators(request, response, validators, private=False)
+
+    def get_object(self, request):
+        return None
+
+    def feed_name(self, obj):
+        return 'index'
+
+    def posts(self, obj):
+        return Post.objects.all()
+
+    def items(self, obj):
+        return self.posts(obj).select_related('author', 'group').only(
+            *SYNDICATION_FIELDS
+        ).order_by('-pub_date', '-pk')[:settings.POSTS_SYNDICATION_SIZE]
+
+    def subtitle(self, obj):
+        return self._get_dynamic_attr('description', obj)
+
+    def item_title(self, post):
+        return truncatechars(post.text, 80)
+
+    def item_description(self, post):
+        return linebreaksbr(post.text, autoescape=True)
+
+    def item_link(self, post):
+        return reverse('posts:post_detail', args=[post.pk])
+
+    def item_pubdate(self, post):
+        return post.pub_date
+
+    def item_author_name(self, post):
+        return post.author.username
+
+    def item_categories(self, post):
+        return [post.group.title] if post.group_id else []
+
+
+class IndexFeed(PostFeed):
+    title = 'Yatube: последние посты'
+    description = 'Новые посты всех авторов'
+
+    def link(self):
+        return reverse('posts:index')
+
+
+class GroupFeed(PostFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def feed_name(self, group):
+        return f'group:{group.pk}'
+
+    def posts(self, group):
+        return Post.objects.filter(group=group)
+
+    def title(self, group):
+        return f'Yatube: {group.title}'
+
+    def description(self, group):
+        return group.description
+
+    def link(self, group):
+        return reverse('posts:group', args=[group.slug])
+
+
+class AuthorFeed(PostFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(
+            User.objects.only('username'), username=username
+        )
+
+    def feed_name(self, author):
+        return f'author:{author.pk}'
+
+    def posts(self, author):
+        return Post.objects.filter(author=author)
+
+    def title(self, author):
+        return f'Yatube: посты {author.username}'
+
+    def description(self, author):
+        return f'Новые посты пользователя {author.username}'
+
+    def link(self, author):
+        return reverse('posts:profile', args=[author.username])
@@ -0,0 +1,51 @@
+from django import template
+from sorl.thumbnail import default
+from sorl.thumbnail.templatetags.thumbnail import ThumbnailNode
+
+from posts.thumbnails import thumbnail_key
+
+register = template.Library()
+
+
+class ReadyThumbnailNode(ThumbnailNode):
+    """Выводит только готовую миниатюру, не создавая её при рендере.
+
+    Пока миниатюры нет, рендерится блок {% empty %}: миниатюры создаются
+    после сохранения поста или командой generate_thumbnails. Миниатюры,
+    найденные prefetch_thumbnails, повторно не ищутся.
+    """
+
+    def _render(self, context):
+        file_ = self.file_.resolve(context)
+        if not file_:
+            return ''
+        options = {}
+        for key, expr in self.options:
+            noresolve = {'True': True, 'False': False, 'None': None}
+            value = noresolve.get(str(expr), expr.resolve(context))
+            if key == 'options':
+                options.update(value)
+            else:
+                options[key] = value
+        geometry = self.geometry.resolve(context)
+        ready = getattr(file_, 'ready_thumbnails', {})
+        key = thumbnail_key(geometry, options)
+        if key in ready:
+            thumbnail = ready[key]
+        else:
+            thumbnail = default.backend.get_ready_thumbnail(
+                file_, geometry, **options
+            )
+        if thumbnail is None:
+            return self.nodelist_empty.render(context)
+        context.push()
+        context[self.as_var] = thumbnail
+        output = self.nodelist_file.render(context)
+        context.pop()
+        return output
+
+
+@register.tag
+def thumbnail(parser, token):
+    """Тег {% thumbnail ... as im %} sorl, не создающий миниатюру."""
+    return ReadyThumbnailNode(parser, token)
@@ -0,0 +1,134 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.comment_buffer import CommentBuffer, comment_buffer
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+@override_settings(
+    POSTS_COMMENT_WRITES='buffered',
+    POSTS_COMMENT_BATCH_SIZE=3,
+    POSTS_COMMENT_FLUSH_INTERVAL=None,
+)
+class CommentBufferTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        self.buffer = CommentBuffer()
+
+    def comment(self, post=None):
+        return Comment(
+            post=post or self.post, author=self.author, text='Текст'
+        )
+
+    def test_flush_writes_batch_and_counter_once(self):
+        """Сброс пишет пачку и сдвигает счётчик одним запросом"""
+        other = Post.objects.create(author=self.author, text='Другой')
+        for post in (self.post, self.post, other):
+            self.buffer.add(self.comment(post))
+        self.assertFalse(Comment.objects.exists())
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.buffer.flush(), 3)
+        updates = [
+            query for query in queries
+            if query['sql'].startswith('UPDATE "posts_post"')
+        ]
+        self.assertEqual(len(updates), 2)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 2)
+        self.assertEqual(self.buffer.flush(), 0)
+
+    def test_full_batch_is_written_at_once(self):
+        """Полная пачка пишется, не дожидаясь сброса"""
+        for _ in range(3):
+            self.buffer.add(self.comment())
+        self.assertEqual(Comment.objects.count(), 3)
+
+    def test_comments_of_deleted_post_are_dropped(self):
+        """Комментарии удалённого поста отбрасываются"""
+        post = Post.objects.create(author=self.author, text='Удалённый')
+        self.buffer.add(self.comment(post))
+        post.delete()
+        with self.assertLogs('posts.comment_buffer', 'WARNING'):
+            self.assertEqual(self.buffer.drain(), 0)
+        self.assertFalse(Comment.objects.exists())
+
+    def test_failed_batch_is_kept(self):
+        """Пачка, упавшая на временной ошибке базы, остаётся в буфере"""
+        self.buffer.add(self.comment())
+        with mock.patch.object(
+            Comment.objects, 'bulk_create', side_effect=OperationalError
+        ):
+            with self.assertLogs('posts.comment_buffer', 'WARNING'):
+                self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(Comment.objects.count(), 1)
+
+    @override_settings(POSTS_COMMENT_WRITE_RETRIES=2)
+    def test_failed_batch_is_dropped_after_retries(self):
+        """Пачка отбрасывается, когда попытки записи исчерпаны"""
+        self.buffer.add(self.comment())
+        with mock.patch.object(
+            Comment.objects, 'bulk_create', side_effect=OperationalError
+        ):
+            for _ in range(2):
+                self.buffer.flush()
+            with self.assertLogs('posts.comment_buffer', 'ERROR'):
+                self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(self.buffer.flush(), 0)
+        self.assertFalse(Comment.objects.exists())
+
+    def test_batch_with_bad_row_is_written_row_by_row(self):
+        """При нарушении ограничений отбрасывается только плохая строка"""
+        bad = self.comment()
+        bad.text = None
+        self.buffer.add(self.comment())
+        self.buffer.add(bad)
+        with self.assertLogs('posts.comment_buffer', 'WARNING'):
+            self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(Comment.objects.count(), 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+
+    def test_unexpected_error_drops_batch(self):
+        """Пачка с неожиданной ошибкой не возвращается в буфер"""
+        self.buffer.add(self.comment())
+        with mock.patch.object(
+            Comment.objects, 'bulk_create', side_effect=ValueError
+        ):
+            with self.assertLogs('posts.comment_buffer', 'ERROR'):
+                self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(self.buffer.flush(), 0)
+
+    def test_drain_registered_without_interval(self):
+        """Остаток буфера пишется при выходе и без фонового сброса"""
+        with mock.patch('posts.comment_buffer.atexit.register') as register:
+            self.buffer.add(self.comment())
+            self.buffer.add(self.comment())
+        register.assert_called_once_with(self.buffer.drain)
+
+    def test_add_comment_view_buffers(self):
+        """Комментарий из формы принимается в буфер"""
+        client = Client()
+        client.force_login(self.author)
+        response = client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Из формы'},
+        )
+        self.assertRedirects(response, reverse(
+            'posts:post_detail', args=[self.post.pk]
+        ))
+        self.assertFalse(Comment.objects.exists())
+        comment_buffer.flush()
+        self.assertTrue(Comment.objects.filter(text='Из формы').exists())
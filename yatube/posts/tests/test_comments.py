@@ -0,0 +1,90 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+@override_settings(POSTS_COMMENTS_PER_PAGE=5)
+class CommentPagesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        cls.comments = [
+            Comment.objects.create(
+                post=cls.post,
+                author=User.objects.create(username=f'Reader{i}'),
+                text=f'Комментарий {i}',
+            )
+            for i in range(7)
+        ][::-1]
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(
+                reverse('posts:post_detail', args=[self.post.pk])
+            )
+        return len(queries)
+
+    def test_post_detail_shows_first_page(self):
+        """Страница поста выводит первую страницу комментариев"""
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk])
+        )
+        comments = response.context['comments']
+        self.assertEqual(list(comments), self.comments[:5])
+        self.assertTrue(comments.has_next())
+        self.assertContains(response, reverse(
+            'posts:post_comments', args=[self.post.pk]
+        ))
+
+    def test_comment_authors_do_not_add_queries(self):
+        """Число запросов не зависит от числа авторов комментариев"""
+        queries = self.count_queries()
+        Comment.objects.filter(pk__in=[
+            comment.pk for comment in self.comments[3:]
+        ]).delete()
+        self.assertEqual(self.count_queries(), queries)
+
+    def test_fragment_returns_next_page(self):
+        """Фрагмент отдаёт следующую страницу по курсору"""
+        first = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk])
+        ).context['comments']
+        url = reverse('posts:post_comments', args=[self.post.pk])
+        response = self.client.get(url, {'cursor': first.next_cursor})
+        self.assertEqual(list(response.context['comments']),
+                         self.comments[5:])
+        self.assertNotContains(response, 'data-comments-more')
+
+    def test_fragment_as_json(self):
+        """Фрагмент в JSON содержит комментарии и курсор"""
+        url = reverse('posts:post_comments', args=[self.post.pk])
+        data = self.client.get(url, {'format': 'json'}).json()
+        self.assertEqual(
+            [comment['id'] for comment in data['comments']],
+            [comment.pk for comment in self.comments[:5]],
+        )
+        self.assertEqual(data['comments'][0]['author'], 'Reader6')
+        data = self.client.get(
+            url, {'format': 'json', 'cursor': data['next_cursor']}
+        ).json()
+        self.assertEqual(len(data['comments']), 2)
+        self.assertIsNone(data['next_cursor'])
+
+    def test_fragment_of_missing_post(self):
+        """Фрагмент несуществующего поста - 404"""
+        response = self.client.get(
+            reverse('posts:post_comments', args=[self.post.pk + 1])
+        )
+        self.assertEqual(response.status_code, 404)
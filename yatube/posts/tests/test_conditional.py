@@ -0,0 +1,103 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.testing import capture_on_commit_callbacks
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='Author')
+        cls.reader = User.objects.create(username='Reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Пост'
+        )
+        cls.urls = {
+            'index': reverse('posts:index'),
+            'group': reverse('posts:group', args=[cls.group.slug]),
+            'profile': reverse('posts:profile', args=[cls.author.username]),
+            'post_detail': reverse('posts:post_detail', args=[cls.post.pk]),
+        }
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_not_modified_without_rendering(self):
+        """Повторный запрос с ETag - 304 не больше чем за один запрос"""
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response['Cache-Control'], 'no-cache')
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag']
+                    )
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+                self.assertIsNone(response.context)
+                self.assertLessEqual(len(queries), 0 if name == 'index' else 1)
+
+    def test_if_modified_since(self):
+        """Гостю отдаётся Last-Modified, и по нему тоже приходит 304"""
+        response = self.client.get(self.urls['index'])
+        response = self.client.get(
+            self.urls['index'],
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_write_changes_etag(self):
+        """Новый пост и комментарий меняют ETag затронутых страниц"""
+        etags = {
+            name: self.client.get(url)['ETag']
+            for name, url in self.urls.items()
+        }
+        with capture_on_commit_callbacks(execute=True):
+            Comment.objects.create(
+                post=self.post, author=self.reader, text='Комментарий'
+            )
+        self.assertNotEqual(
+            self.client.get(self.urls['post_detail'])['ETag'],
+            etags['post_detail'],
+        )
+        self.assertEqual(
+            self.client.get(self.urls['index'])['ETag'], etags['index']
+        )
+        with capture_on_commit_callbacks(execute=True):
+            Post.objects.create(author=self.author, text='Новый пост')
+        for name in ('index', 'profile', 'post_detail'):
+            with self.subTest(page=name):
+                response = self.client.get(
+                    self.urls[name], HTTP_IF_NONE_MATCH=etags[name]
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_user_pages_validated_separately(self):
+        """Вошедший пользователь получает свой ETag без Last-Modified"""
+        url = self.urls['profile']
+        guest = self.client.get(url)
+        response = self.reader_client.get(url)
+        self.assertNotEqual(response['ETag'], guest['ETag'])
+        self.assertFalse(response.has_header('Last-Modified'))
+        self.assertIn('private', response['Cache-Control'])
+        self.assertEqual(self.reader_client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag']
+        ).status_code, 304)
+        with capture_on_commit_callbacks(execute=True):
+            Follow.objects.create(user=self.reader, author=self.author)
+        response = self.reader_client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertContains(response, 'Отписаться')
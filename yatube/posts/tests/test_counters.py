@@ -0,0 +1,70 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post, Profile
+
+User = get_user_model()
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='Author')
+        cls.reader = User.objects.create(username='Reader')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def assertCounters(self, user, **expected):
+        profile = Profile.objects.get(user=user)
+        for field, value in expected.items():
+            with self.subTest(field=field):
+                self.assertEqual(getattr(profile, field), value)
+
+    def test_counters_follow_writes(self):
+        """Счётчики меняются при создании и удалении объектов"""
+        post = Post.objects.create(author=self.author, text='Ещё')
+        Comment.objects.create(post=post, author=self.reader, text='1')
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='2'
+        )
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertCounters(self.author, post_count=2, follower_count=1)
+        self.assertCounters(self.reader, following_count=1)
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 2)
+        comment.delete()
+        follow.delete()
+        post.delete()
+        self.assertCounters(self.author, post_count=1, follower_count=0)
+        self.assertCounters(self.reader, following_count=0)
+
+    def test_recount_repairs_drift(self):
+        """Команда recount_counters исправляет расхождения"""
+        Post.objects.bulk_create([
+            Post(author=self.author, text=str(i)) for i in range(3)
+        ])
+        Comment.objects.bulk_create([
+            Comment(post=self.post, author=self.reader, text='Комментарий')
+        ])
+        Profile.objects.filter(user=self.reader).delete()
+        call_command('recount_counters', batch_size=1, stdout=StringIO())
+        self.assertCounters(self.author, post_count=4)
+        self.assertCounters(self.reader, post_count=0)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+
+    def test_post_detail_reads_counters(self):
+        """Страница поста не агрегирует посты и комментарии"""
+        url = reverse('posts:post_detail', args=[self.post.id])
+        with CaptureQueriesContext(connection) as queries:
+            response = Client().get(url)
+        self.assertEqual(response.context['count_posts'], 1)
+        for query in queries.captured_queries:
+            with self.subTest(sql=query['sql']):
+                self.assertNotIn('COUNT(', query['sql'].upper())
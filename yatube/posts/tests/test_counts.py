@@ -0,0 +1,143 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.testing import capture_on_commit_callbacks
+from posts.counts import CACHED, ESTIMATED, EXACT, get_feed_counter
+from posts.feed_cache import bump_feed_versions
+from posts.models import Follow, Group, Post
+from posts.paginator import CountingPaginator
+
+User = get_user_model()
+
+
+@override_settings(POSTS_COUNT_STRATEGIES={
+    'index': ESTIMATED, 'group': CACHED, 'follow': CACHED,
+})
+class FeedCounterTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='Testuser')
+        cls.reader = User.objects.create(username='Reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        Post.objects.bulk_create([
+            Post(author=cls.user, group=cls.group, text=str(i))
+            for i in range(3)
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def count(self, feed, queryset):
+        paginator = CountingPaginator(
+            queryset, 10, counter=get_feed_counter(feed)
+        )
+        return paginator.count, paginator.count_strategy
+
+    def test_cached_count_follows_signals(self):
+        """Кэшированный счётчик обновляется при создании и удалении"""
+        feed = f'group:{self.group.pk}'
+        self.assertEqual(self.count(feed, self.group.posts.all()), (3, CACHED))
+        with capture_on_commit_callbacks(execute=True):
+            post = Post.objects.create(
+                author=self.user, group=self.group, text='Новый'
+            )
+        with CaptureQueriesContext(connection) as queries:
+            count = self.count(feed, self.group.posts.all())
+        self.assertEqual(count, (4, CACHED))
+        self.assertEqual(len(queries), 0)
+        post.group = None
+        with capture_on_commit_callbacks(execute=True):
+            post.save()
+        self.assertEqual(
+            self.count(feed, self.group.posts.none()), (3, CACHED)
+        )
+
+    def test_follow_count_reset_on_follow(self):
+        """Подписка сбрасывает счётчик ленты подписок"""
+        feed = f'follow:{self.reader.pk}'
+        queryset = Post.objects.filter(author__following__user=self.reader)
+        self.assertEqual(self.count(feed, queryset), (0, CACHED))
+        with capture_on_commit_callbacks(execute=True):
+            Follow.objects.create(user=self.reader, author=self.user)
+        self.assertEqual(self.count(feed, queryset), (3, CACHED))
+        with capture_on_commit_callbacks(execute=True):
+            Post.objects.create(author=self.user, text='Ещё')
+        self.assertEqual(self.count(feed, queryset), (4, CACHED))
+
+    def test_estimated_count(self):
+        """Оценка берётся из статистики БД, без неё - из кэша"""
+        queryset = Post.objects.all()
+        self.assertEqual(self.count('index', queryset), (3, CACHED))
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        cache.clear()
+        with self.settings(POSTS_COUNT_ESTIMATE_MIN=0):
+            self.assertEqual(self.count('index', queryset), (3, ESTIMATED))
+
+    def test_unknown_feed_counts_exactly(self):
+        self.assertEqual(
+            self.count('author:1', Post.objects.all()), (3, EXACT)
+        )
+
+
+@override_settings(POSTS_PAGINATION='offset', POSTS_PER_PAGE=2)
+class OffsetIndexCountTest(TestCase):
+    """Стратегии подсчёта на главной в режиме 'offset'.
+
+    В режиме 'keyset' страницы ленты записи не считают вовсе.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='Testuser')
+        Post.objects.bulk_create([
+            Post(author=cls.user, text=str(i)) for i in range(3)
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def get_index(self):
+        """Главная без кэша фрагмента; запросы COUNT и пагинатор."""
+        bump_feed_versions(['index'])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('posts:index'))
+        counts = [
+            query for query in queries.captured_queries
+            if 'COUNT(' in query['sql'].upper()
+        ]
+        return len(counts), response.context['page_obj'].paginator
+
+    @override_settings(POSTS_COUNT_STRATEGIES={'index': CACHED})
+    def test_cached_count(self):
+        """Число постов считается один раз и дальше берётся из кэша"""
+        counts, paginator = self.get_index()
+        self.assertEqual((counts, paginator.num_pages), (1, 2))
+        counts, paginator = self.get_index()
+        self.assertEqual((counts, paginator.count_strategy), (0, CACHED))
+
+    @override_settings(
+        POSTS_COUNT_STRATEGIES={'index': ESTIMATED},
+        POSTS_COUNT_ESTIMATE_MIN=0,
+    )
+    def test_estimated_count(self):
+        """С собранной статистикой COUNT не выполняется"""
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        counts, paginator = self.get_index()
+        self.assertEqual(
+            (counts, paginator.count, paginator.count_strategy),
+            (0, 3, ESTIMATED),
+        )
+
+    @override_settings(POSTS_COUNT_STRATEGIES={'index': EXACT})
+    def test_exact_count(self):
+        """Точный подсчёт выполняет COUNT на каждой странице"""
+        self.assertEqual(self.get_index()[0], 1)
+        self.assertEqual(self.get_index()[0], 1)
@@ -0,0 +1,110 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.testing import capture_on_commit_callbacks
+from posts.feed_cache import GROUPS, get_feed_versions
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class FeedCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='Author')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.other_group = Group.objects.create(title='Другая', slug='other')
+        for i in range(12):
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {i}'
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cache_hit_skips_page_query(self):
+        """Повторный показ страницы не читает посты из БД"""
+        url = reverse('posts:group', args=[self.group.slug])
+        first = self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(url)
+        self.assertEqual(first.content, second.content)
+        for query in queries.captured_queries:
+            with self.subTest(sql=query['sql']):
+                self.assertNotIn('posts_post', query['sql'])
+
+    def test_pages_cached_separately(self):
+        """Страницы одной ленты кэшируются под разными ключами"""
+        url = reverse('posts:index')
+        first = self.client.get(url)
+        second = self.client.get(url, {'page': 2})
+        self.assertNotEqual(first.content, second.content)
+        self.assertContains(second, 'Пост 0')
+
+    def test_invalid_page_reuses_fragment(self):
+        """Неверный номер страницы не создаёт новый фрагмент"""
+        url = reverse('posts:index')
+        for first, second in ((None, 'abc'), ('1', '-5')):
+            self.client.get(url, {'page': first} if first else {})
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(url, {'page': second})
+            with self.subTest(page=second):
+                self.assertFalse(any(
+                    'posts_post' in query['sql']
+                    for query in queries.captured_queries
+                ))
+
+    def test_post_write_bumps_affected_feeds(self):
+        """Новый пост меняет версии только затронутых лент"""
+        feeds = (
+            'index',
+            f'author:{self.author.pk}',
+            f'group:{self.group.pk}',
+            f'group:{self.other_group.pk}',
+            GROUPS,
+        )
+        before = get_feed_versions(*feeds)
+        with capture_on_commit_callbacks(execute=True):
+            Post.objects.create(
+                author=self.author, group=self.group, text='Н'
+            )
+        changed = [
+            old != new
+            for old, new in zip(before, get_feed_versions(*feeds))
+        ]
+        self.assertEqual(changed, [True, True, True, False, False])
+
+    def test_versions_bumped_after_commit(self):
+        """Версии лент меняются только после коммита записи"""
+        url = reverse('posts:profile', args=[self.author.username])
+        post = Post.objects.first()
+        feeds = ('index', f'author:{self.author.pk}', f'post:{post.pk}')
+        before = get_feed_versions(*feeds)
+        with capture_on_commit_callbacks() as callbacks:
+            Post.objects.create(author=self.author, text='Свежий пост')
+            Comment.objects.create(
+                post=post, author=self.author, text='Комментарий'
+            )
+            self.assertEqual(get_feed_versions(*feeds), before)
+            # Страница, отрисованная до коммита, кэшируется под старой
+            # версией и после коммита не показывается.
+            self.client.get(url)
+        for callback in callbacks:
+            callback()
+        self.assertTrue(all(
+            old != new for old, new in zip(before, get_feed_versions(*feeds))
+        ))
+        self.assertContains(self.client.get(url), 'Свежий пост')
+
+    def test_new_post_shown_after_write(self):
+        """После записи поста лента показывает его без очистки кэша"""
+        url = reverse('posts:profile', args=[self.author.username])
+        self.client.get(url)
+        with capture_on_commit_callbacks(execute=True):
+            Post.objects.create(author=self.author, text='Свежий пост')
+        self.assertContains(self.client.get(url), 'Свежий пост')
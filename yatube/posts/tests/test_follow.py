@@ -0,0 +1,155 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.testing import capture_on_commit_callbacks
+from posts.follows import followed_author_ids
+from posts.models import Follow, Post, Profile
+
+User = get_user_model()
+
+
+class FollowTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Author')
+        cls.reader = User.objects.create(username='Reader')
+
+    def follow_queries(self, action):
+        with CaptureQueriesContext(connection) as queries:
+            result = action(self.reader, self.author)
+        statements = [
+            query['sql'] for query in queries
+            if 'posts_follow' in query['sql']
+        ]
+        return result, statements
+
+    def assert_counts(self, follower_count, following_count):
+        self.assertEqual(
+            Profile.objects.get(user=self.author).follower_count,
+            follower_count,
+        )
+        self.assertEqual(
+            Profile.objects.get(user=self.reader).following_count,
+            following_count,
+        )
+
+    def test_follow_is_idempotent(self):
+        """Повторная подписка - один INSERT без новой строки"""
+        self.assertTrue(Follow.objects.follow(self.reader, self.author))
+        created, statements = self.follow_queries(Follow.objects.follow)
+        self.assertFalse(created)
+        self.assertEqual(len(statements), 1)
+        self.assertTrue(statements[0].startswith('INSERT'))
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assert_counts(1, 1)
+
+    def test_unfollow_is_idempotent(self):
+        """Отписка - один DELETE, повторная отписка ничего не меняет"""
+        Follow.objects.follow(self.reader, self.author)
+        deleted, statements = self.follow_queries(Follow.objects.unfollow)
+        self.assertTrue(deleted)
+        self.assertEqual(len(statements), 1)
+        self.assertTrue(statements[0].startswith('DELETE'))
+        self.assertFalse(Follow.objects.unfollow(self.reader, self.author))
+        self.assert_counts(0, 0)
+
+    def test_unfollow_view_without_follow(self):
+        """Отписка без подписки перенаправляет на профиль"""
+        client = Client()
+        client.force_login(self.reader)
+        response = client.get(reverse(
+            'posts:profile_unfollow', args=[self.author.username]
+        ))
+        self.assertRedirects(response, reverse(
+            'posts:profile', args=[self.author.username]
+        ))
+
+
+class FollowStateTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Author')
+        cls.reader = User.objects.create(username='Reader')
+        for i in range(5):
+            Follow.objects.follow(
+                User.objects.create(username=f'Fan{i}'), cls.author
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_profile_checks_follow_with_one_exists(self):
+        """Профиль проверяет подписку одним EXISTS"""
+        url = reverse('posts:profile', args=[self.author.username])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        follow_queries = [
+            query['sql'] for query in queries
+            if 'posts_follow' in query['sql']
+        ]
+        self.assertEqual(len(follow_queries), 1)
+        self.assertIn('LIMIT 1', follow_queries[0])
+        self.assertFalse(response.context['following'])
+        Follow.objects.follow(self.reader, self.author)
+        self.assertTrue(self.client.get(url).context['following'])
+
+    def test_followed_ids_are_cached_until_follow(self):
+        """Множество подписок кэшируется и сбрасывается подпиской"""
+        self.assertEqual(followed_author_ids(self.reader), frozenset())
+        with self.assertNumQueries(0):
+            followed_author_ids(self.reader)
+        with capture_on_commit_callbacks(execute=True):
+            Follow.objects.follow(self.reader, self.author)
+        self.assertEqual(
+            followed_author_ids(self.reader), {self.author.pk}
+        )
+        with capture_on_commit_callbacks(execute=True):
+            Follow.objects.unfollow(self.reader, self.author)
+        self.assertEqual(followed_author_ids(self.reader), frozenset())
+
+    def test_followed_ids_are_reset_after_commit(self):
+        """Кэш подписок сбрасывается после коммита, а не внутри транзакции"""
+        followed_author_ids(self.reader)
+        with capture_on_commit_callbacks() as callbacks:
+            Follow.objects.follow(self.reader, self.author)
+            # Читатель до коммита не видит подписку и кэширует старое.
+            self.assertEqual(followed_author_ids(self.reader), frozenset())
+        for callback in callbacks:
+            callback()
+        self.assertEqual(
+            followed_author_ids(self.reader), {self.author.pk}
+        )
+
+    def test_repeated_follow_sends_no_signal(self):
+        """Повторная подписка и отписка не трогают счётчики и кэши"""
+        followers = Profile.objects.get(user=self.author).follower_count
+        Follow.objects.follow(self.reader, self.author)
+        with capture_on_commit_callbacks() as callbacks:
+            self.assertFalse(Follow.objects.follow(self.reader, self.author))
+        self.assertEqual(callbacks, [])
+        Follow.objects.unfollow(self.reader, self.author)
+        with capture_on_commit_callbacks() as callbacks:
+            self.assertFalse(
+                Follow.objects.unfollow(self.reader, self.author)
+            )
+        self.assertEqual(callbacks, [])
+        self.assertEqual(
+            Profile.objects.get(user=self.author).follower_count, followers
+        )
+
+    def test_post_detail_renders_follow_state(self):
+        """Страница поста показывает кнопку по кэшу подписок"""
+        post = Post.objects.create(author=self.author, text='Пост')
+        Follow.objects.follow(self.reader, self.author)
+        response = self.client.get(
+            reverse('posts:post_detail', args=[post.pk])
+        )
+        self.assertContains(response, reverse(
+            'posts:profile_unfollow', args=[self.author.username]
+        ))
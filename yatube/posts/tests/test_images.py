@@ -0,0 +1,102 @@
+from io import BytesIO
+
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+
+from posts.forms import PostForm
+from posts.images import EXIF_ORIENTATION, normalize_image
+
+
+def make_upload(name, size, mode='RGB', format_='JPEG', orientation=None):
+    image = Image.new(mode, size, 'red')
+    options = {}
+    if orientation is not None:
+        exif = Image.Exif()
+        exif[EXIF_ORIENTATION] = orientation
+        options['exif'] = exif.tobytes()
+    buffer = BytesIO()
+    image.save(buffer, format_, **options)
+    return SimpleUploadedFile(
+        name, buffer.getvalue(), Image.MIME[format_]
+    )
+
+
+@override_settings(POSTS_IMAGE_MAX_SIDE=100, POSTS_IMAGE_KEEP_SIZE=10000)
+class NormalizeImageTest(SimpleTestCase):
+    def open(self, upload):
+        upload.seek(0)
+        return Image.open(upload)
+
+    def test_large_photo_is_downscaled(self):
+        """Большая картинка уменьшается и перекодируется в JPEG"""
+        upload = make_upload('photo.png', (400, 200), format_='PNG')
+        result = normalize_image(upload)
+        self.assertEqual(result.name, 'photo.jpg')
+        self.assertEqual(result.content_type, 'image/jpeg')
+        with self.open(result) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (100, 50))
+            self.assertIn('progressive', image.info)
+
+    def test_metadata_is_stripped_and_orientation_applied(self):
+        """EXIF удаляется, а поворот из него применяется"""
+        upload = make_upload('photo.jpg', (40, 20), orientation=6)
+        with self.open(normalize_image(upload)) as image:
+            self.assertFalse(image.getexif())
+            self.assertEqual(image.size, (20, 40))
+
+    def test_transparent_image_is_stored_as_png(self):
+        """Картинка с прозрачностью сохраняется в PNG"""
+        upload = make_upload('logo.png', (400, 400), 'RGBA', 'PNG')
+        result = normalize_image(upload)
+        self.assertEqual(result.name, 'logo.png')
+        with self.open(result) as image:
+            self.assertEqual(image.mode, 'RGBA')
+
+    def test_small_clean_image_is_kept(self):
+        """Небольшая картинка без метаданных сохраняется как есть"""
+        upload = make_upload('small.png', (50, 50), format_='PNG')
+        self.assertIs(normalize_image(upload), upload)
+
+    @override_settings(POSTS_IMAGE_MAX_PIXELS=100)
+    def test_huge_image_is_rejected(self):
+        """Слишком большая по числу пикселей картинка отклоняется"""
+        with self.assertRaises(ValidationError):
+            normalize_image(make_upload('huge.jpg', (20, 20)))
+
+    def test_large_animation_is_rejected(self):
+        """Анимация крупнее лимитов отклоняется, а не хранится как есть"""
+        frames = [Image.new('P', (200, 20), color) for color in (1, 2)]
+        buffer = BytesIO()
+        frames[0].save(
+            buffer, 'GIF', save_all=True, append_images=frames[1:]
+        )
+        upload = SimpleUploadedFile(
+            'anim.gif', buffer.getvalue(), 'image/gif'
+        )
+        with self.assertRaises(ValidationError) as raised:
+            normalize_image(upload)
+        self.assertEqual(raised.exception.code, 'animation_too_large')
+
+    def test_truncated_image_is_rejected(self):
+        """Обрезанный файл картинки вызывает ошибку валидации"""
+        upload = make_upload('photo.jpg', (400, 300))
+        upload = SimpleUploadedFile(
+            'photo.jpg', upload.read()[:1000], 'image/jpeg'
+        )
+        with self.assertRaises(ValidationError) as raised:
+            normalize_image(upload)
+        self.assertEqual(raised.exception.code, 'invalid_image')
+
+    def test_form_normalizes_upload(self):
+        """Форма поста сохраняет нормализованную картинку"""
+        form = PostForm(
+            data={'text': 'Текст'},
+            files={'image': make_upload('photo.jpg', (400, 300))},
+        )
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data['image'].name, 'photo.jpg')
+        with self.open(form.cleaned_data['image']) as image:
+            self.assertEqual(image.size, (100, 75))
@@ -0,0 +1,36 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class FeedIndexesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Author')
+        cls.reader = User.objects.create(username='Reader')
+        group = Group.objects.create(title='Группа', slug='group')
+        for i in range(3):
+            post = Post.objects.create(
+                author=cls.author, group=group, text=str(i)
+            )
+            Comment.objects.create(post=post, author=cls.reader, text='К')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def test_feed_queries_use_indexes(self):
+        """Запросы лент читают таблицы по индексу без сортировки"""
+        out = StringIO()
+        call_command('explain_feeds', stdout=out)
+        self.assertNotIn('сортировка', out.getvalue())
+        self.assertNotIn('full scan', out.getvalue())
+
+    def test_follow_is_unique(self):
+        """Повторная подписка отклоняется базой"""
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(user=self.reader, author=self.author)
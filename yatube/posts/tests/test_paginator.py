@@ -0,0 +1,66 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Post
+
+User = get_user_model()
+
+
+class KeysetPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='Testuser')
+        Post.objects.bulk_create([
+            Post(author=cls.user, text=str(i)) for i in range(25)
+        ])
+        cls.ordered = list(Post.objects.order_by('-pub_date', '-pk'))
+
+    def get_page(self, **params):
+        response = self.client.get(reverse('posts:index'), params)
+        return response.context['page_obj']
+
+    def test_first_page_without_count(self):
+        """Первая страница не считает все записи ленты"""
+        with CaptureQueriesContext(connection) as queries:
+            page = self.get_page()
+        self.assertEqual(list(page), self.ordered[:10])
+        self.assertTrue(page.has_next())
+        self.assertFalse(page.has_previous())
+        for query in queries.captured_queries:
+            with self.subTest(sql=query['sql']):
+                self.assertNotIn('COUNT(', query['sql'].upper())
+
+    def test_cursor_navigation(self):
+        """Курсоры ведут на следующую и предыдущую страницы"""
+        second = self.get_page(cursor=self.get_page().next_cursor)
+        self.assertEqual(second.number, 2)
+        self.assertEqual(list(second), self.ordered[10:20])
+        third = self.get_page(cursor=second.next_cursor)
+        self.assertEqual(list(third), self.ordered[20:])
+        self.assertFalse(third.has_next())
+        back = self.get_page(cursor=third.previous_cursor)
+        self.assertEqual(back.number, 2)
+        self.assertEqual(list(back), self.ordered[10:20])
+        first = self.get_page(cursor=back.previous_cursor)
+        self.assertEqual(first.number, 1)
+        self.assertFalse(first.has_previous())
+
+    def test_legacy_page_links(self):
+        """Старые ссылки ?page=N продолжают работать"""
+        self.assertEqual(list(self.get_page(page=2)), self.ordered[10:20])
+        self.assertEqual(self.get_page(page=50).number, 3)
+        self.assertEqual(self.get_page(page='abc').number, 1)
+        self.assertEqual(self.get_page(cursor='broken').number, 1)
+
+    def test_offset_fallback_is_bounded(self):
+        """Глубина ?page=N ограничена POSTS_MAX_OFFSET_PAGES"""
+        with self.settings(POSTS_MAX_OFFSET_PAGES=2):
+            page = self.get_page(page=2)
+            response = self.client.get(reverse('posts:index'), {'page': 3})
+        self.assertEqual(list(page), self.ordered[10:20])
+        self.assertIsNotNone(page.next_cursor)
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,43 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class FeedQueriesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='Author')
+        cls.reader = User.objects.create(username='Reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(15):
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=str(i)
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_feed_query_budget(self):
+        """Число запросов ленты не зависит от числа постов на странице"""
+        # Сессия и пользователь занимают два запроса на каждой странице.
+        budgets = {
+            reverse('posts:index'): 3,
+            reverse('posts:group', args=[self.group.slug]): 4,
+            reverse('posts:profile', args=[self.author.username]): 5,
+            reverse('posts:follow_index'): 4,
+        }
+        for url, budget in budgets.items():
+            with self.subTest(url=url):
+                cache.clear()
+                with self.assertNumQueries(budget):
+                    response = self.client.get(url)
+                self.assertEqual(len(response.context['page_obj']), 10)
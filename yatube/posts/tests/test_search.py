@@ -0,0 +1,107 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post, PostTerm
+from posts.search import search_posts
+from posts.stemmer import stem
+
+User = get_user_model()
+
+
+class StemmerTest(TestCase):
+    def test_word_forms_share_stem(self):
+        """Формы слова сводятся к одной основе"""
+        for words in (
+            ('пост', 'посты', 'постами', 'поста'),
+            ('группа', 'группы', 'группой'),
+            ('красивый', 'красивая', 'красивейший'),
+        ):
+            with self.subTest(words=words):
+                self.assertEqual(len({stem(word) for word in words}), 1)
+
+    def test_other_words_are_kept(self):
+        """Слова не на кириллице не меняются"""
+        self.assertEqual(stem('django'), 'django')
+
+
+@override_settings(POSTS_PER_PAGE=2)
+class SearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Author')
+        cls.rare = Post.objects.create(
+            author=cls.author, text='Кот и коты: котов много не бывает'
+        )
+        cls.posts = [
+            Post.objects.create(author=cls.author, text=text)
+            for text in (
+                'Кот спит',
+                'Кот ловит мышей',
+                'Собака и кот дружат',
+                'Собака лает',
+            )
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_results_are_ranked(self):
+        """Пост с большим числом вхождений идёт первым"""
+        posts, _ = search_posts('котов', limit=10)
+        self.assertEqual(posts[0], self.rare)
+        self.assertEqual(len(posts), 4)
+
+    def test_all_words_must_match(self):
+        """Находятся только посты со всеми словами запроса"""
+        posts, _ = search_posts('собаки коты', limit=10)
+        self.assertEqual(posts, [self.posts[2]])
+        self.assertEqual(search_posts('собака жираф')[0], [])
+
+    def test_cursor_pages_do_not_overlap(self):
+        """Курсор продолжает выдачу с места остановки"""
+        first, cursor = search_posts('кот')
+        second, cursor = search_posts('кот', cursor)
+        self.assertIsNone(cursor)
+        found = first + second
+        self.assertEqual(len(found), 4)
+        self.assertEqual(len(set(found)), 4)
+
+    def test_index_follows_edits_and_deletes(self):
+        """Индекс обновляется при правке и удалении поста"""
+        post = self.posts[3]
+        post.text = 'Попугай говорит'
+        post.save()
+        self.assertEqual(search_posts('попугаи')[0], [post])
+        self.assertEqual(search_posts('лает')[0], [])
+        post.delete()
+        self.assertFalse(PostTerm.objects.filter(post_id=post.pk).exists())
+
+    def test_view_renders_results(self):
+        """Страница поиска выводит найденные посты и ссылку дальше"""
+        response = Client().get(reverse('posts:search'), {'q': 'кот'})
+        self.assertEqual(len(response.context['posts']), 2)
+        self.assertContains(response, 'cursor=')
+
+    def test_command_rebuilds_index(self):
+        """Команда восстанавливает индекс"""
+        PostTerm.objects.all().delete()
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(search_posts('кот', limit=10)[0]), 4)
+
+    def test_admin_uses_index(self):
+        """Поиск в админке идёт по индексу"""
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        client = Client()
+        client.force_login(admin)
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'собаки'}
+        )
+        self.assertEqual(
+            set(response.context['cl'].result_list),
+            {self.posts[2], self.posts[3]},
+        )
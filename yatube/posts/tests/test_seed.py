@@ -0,0 +1,85 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.models import (
+    Comment, Follow, Group, Post, PostTerm, Profile, TimelineEntry
+)
+from posts.seeding import Distribution
+from posts.search import search_posts
+
+User = get_user_model()
+
+
+class SeedTest(TestCase):
+    def seed(self, **options):
+        options = {
+            'users': 30, 'groups': 3, 'posts': 200, 'comments': 300,
+            'follows': 5, 'batch_size': 64, 'stdout': StringIO(), **options,
+        }
+        call_command('seed', **options)
+
+    def snapshot(self):
+        return (
+            list(Post.objects.order_by('pk').values_list(
+                'author__username', 'group__slug', 'text'
+            )),
+            list(Comment.objects.order_by('pk').values_list(
+                'post__text', 'author__username', 'text'
+            )),
+            set(Follow.objects.values_list(
+                'user__username', 'author__username'
+            )),
+        )
+
+    def test_rows_and_derived_data_are_created(self):
+        """Создаются строки, счётчики, ленты и поисковый индекс"""
+        self.seed()
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 300)
+        self.assertTrue(Follow.objects.exists())
+        self.assertEqual(Profile.objects.count(), 30)
+        profile = Profile.objects.order_by('-post_count').first()
+        self.assertEqual(profile.post_count, profile.user.posts.count())
+        post = Post.objects.order_by('-comment_count').first()
+        self.assertEqual(post.comment_count, post.comments.count())
+        self.assertEqual(
+            TimelineEntry.objects.count(),
+            Post.objects.filter(author__following__isnull=False).count(),
+        )
+        self.assertTrue(PostTerm.objects.exists())
+        self.assertTrue(search_posts(post.text)[0])
+
+    def test_activity_follows_distribution(self):
+        """При zipf активность сосредоточена у немногих авторов"""
+        self.seed(post_distribution='zipf:1.5')
+        counts = sorted(
+            Profile.objects.values_list('post_count', flat=True),
+            reverse=True,
+        )
+        self.assertGreater(sum(counts[:3]), sum(counts) / 2)
+
+    def test_same_seed_gives_same_data(self):
+        """Одинаковое зерно даёт одинаковые данные"""
+        self.seed(seed=7)
+        first = self.snapshot()
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        self.seed(seed=7)
+        self.assertEqual(self.snapshot(), first)
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        self.seed(seed=8)
+        self.assertNotEqual(self.snapshot(), first)
+
+    def test_distribution_spec(self):
+        """Распределение задаётся строкой"""
+        self.assertEqual(str(Distribution('zipf:2')), 'zipf:2.0')
+        self.assertIsNone(Distribution('uniform').cum_weights(3))
+        for spec in ('normal', 'uniform:2'):
+            with self.subTest(spec=spec), self.assertRaises(ValueError):
+                Distribution(spec)
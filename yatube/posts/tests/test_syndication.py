@@ -0,0 +1,114 @@
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.testing import capture_on_commit_callbacks
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class SyndicationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='Author')
+        cls.other = User.objects.create(username='Other')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание группы'
+        )
+        Post.objects.create(
+            author=cls.author, group=cls.group, text='Пост в группе'
+        )
+        Post.objects.create(author=cls.other, text='Пост без группы')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feeds(self):
+        """RSS и Atom сайта, группы и автора содержат их посты"""
+        feeds = {
+            ('index_rss', ()): ('Пост в группе', 'Пост без группы'),
+            ('group_rss', ('group',)): ('Пост в группе',),
+            ('author_rss', ('Other',)): ('Пост без группы',),
+        }
+        for (name, args), texts in feeds.items():
+            for feed_format, content_type in (
+                ('rss', 'application/rss+xml'),
+                ('atom', 'application/atom+xml'),
+            ):
+                with self.subTest(feed=name, format=feed_format):
+                    response = self.client.get(reverse(
+                        f'posts:{name.replace("rss", feed_format)}', args=args
+                    ))
+                    self.assertTrue(
+                        response['Content-Type'].startswith(content_type)
+                    )
+                    content = response.content.decode()
+                    for text in ('Пост в группе', 'Пост без группы'):
+                        self.assertEqual(text in content, text in texts)
+
+    def test_one_query_then_cache(self):
+        """Лента строится одним запросом и дальше берётся из кэша"""
+        url = reverse('posts:index_rss')
+        with self.assertNumQueries(1):
+            first = self.client.get(url)
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+        self.assertEqual(first.content, second.content)
+        with self.assertNumQueries(2):
+            self.client.get(reverse('posts:group_atom', args=['group']))
+
+    @override_settings(POSTS_FEED_FRAGMENT_TIMEOUT=60)
+    def test_cached_feed_expires(self):
+        """Лента в кэше живёт не дольше POSTS_FEED_FRAGMENT_TIMEOUT"""
+        url = reverse('posts:index_rss')
+        with self.assertNumQueries(1):
+            self.client.get(url)
+        later = time.time() + 61
+        with mock.patch('time.time', return_value=later):
+            with self.assertNumQueries(1):
+                self.client.get(url)
+
+    def test_new_post_changes_feed(self):
+        """Новый пост меняет версию ленты, и она строится заново"""
+        url = reverse('posts:group_rss', args=['group'])
+        etag = self.client.get(url)['ETag']
+        with capture_on_commit_callbacks(execute=True):
+            Post.objects.create(
+                author=self.author, group=self.group, text='Свежий пост'
+            )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Свежий пост')
+
+    def test_conditional_get(self):
+        """Актуальная копия - 304, ответ общий для всех пользователей"""
+        url = reverse('posts:author_rss', args=['Author'])
+        guest = self.client.get(url)
+        self.assertEqual(guest['Cache-Control'], 'no-cache')
+        client = Client()
+        client.force_login(self.other)
+        response = client.get(url)
+        self.assertEqual(response['ETag'], guest['ETag'])
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=guest['ETag'])
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=guest['Last-Modified']
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_unknown_object(self):
+        """Ленты несуществующих группы и автора - 404"""
+        for url in (
+            reverse('posts:group_rss', args=['missing']),
+            reverse('posts:author_atom', args=['missing']),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
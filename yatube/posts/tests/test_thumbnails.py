@@ -0,0 +1,139 @@
+import shutil
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from sorl.thumbnail import default
+
+from posts.models import Post
+from posts.thumbnails import (
+    MISS_TIMEOUT, enqueue_thumbnails, prefetch_thumbnails
+)
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, POSTS_THUMBNAIL_WORKERS=0)
+class ThumbnailTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='Author')
+        cls.post = cls.create_post('small')
+
+    @classmethod
+    def create_post(cls, text):
+        return Post.objects.create(
+            author=cls.author,
+            text=text,
+            image=SimpleUploadedFile(
+                f'{text}.gif', SMALL_GIF, 'image/gif'
+            ),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def get_ready(self):
+        geometry, options = settings.POSTS_THUMBNAILS[0]
+        return default.backend.get_ready_thumbnail(
+            self.post.image, geometry, **options
+        )
+
+    def test_render_does_not_generate_thumbnail(self):
+        """Страница без готовой миниатюры выводит исходную картинку"""
+        response = Client().get(reverse('posts:index'))
+        self.assertIsNone(self.get_ready())
+        self.assertContains(response, self.post.image.url)
+
+    def test_command_generates_missing_thumbnails(self):
+        """Команда создаёт только недостающие миниатюры"""
+        enqueue_thumbnails(self.post.image.name)
+        other = self.create_post('other')
+        out = StringIO()
+        with mock.patch(
+            'posts.management.commands.generate_thumbnails.'
+            'generate_thumbnails'
+        ) as generate:
+            call_command('generate_thumbnails', batch_size=1, stdout=out)
+        generate.assert_called_once_with(other.image.name)
+        self.assertIn('1', out.getvalue())
+
+    def test_ready_thumbnail_is_rendered(self):
+        """Готовая миниатюра выводится вместо картинки"""
+        on_ready = mock.Mock()
+        enqueue_thumbnails(self.post.image.name, on_ready)
+        on_ready.assert_called_once_with()
+        thumbnail = self.get_ready()
+        self.assertIsNotNone(thumbnail)
+        response = Client().get(reverse('posts:index'))
+        self.assertContains(response, thumbnail.url)
+        self.assertNotContains(response, f'"{self.post.image.url}"')
+
+    def test_thumbnail_found_after_missed_lookup(self):
+        """Миниатюра, созданная после неудачного поиска, находится через
+        MISS_TIMEOUT секунд"""
+        prefetch_thumbnails([self.post])
+        self.assertIsNone(self.get_ready())
+        # Пул другого процесса пишет в свой кэш, а не в кэш этого.
+        with self.settings(THUMBNAIL_CACHE='counts'):
+            enqueue_thumbnails(self.post.image.name)
+        self.assertIsNone(self.get_ready())
+        later = time.time() + MISS_TIMEOUT + 1
+        with mock.patch('time.time', return_value=later):
+            self.assertIsNotNone(self.get_ready())
+            del self.post.image.ready_thumbnails
+            prefetch_thumbnails([self.post])
+        self.assertTrue(all(self.post.image.ready_thumbnails.values()))
+
+    def test_page_thumbnails_are_fetched_at_once(self):
+        """Миниатюры страницы ищутся одним запросом"""
+        posts = [self.post] + [self.create_post(str(i)) for i in range(3)]
+        for post in posts[:2]:
+            enqueue_thumbnails(post.image.name)
+        cache.clear()
+        with self.assertNumQueries(1):
+            prefetch_thumbnails(posts)
+        ready = [
+            thumbnail is not None
+            for post in posts
+            for thumbnail in post.image.ready_thumbnails.values()
+        ]
+        self.assertEqual(ready, [True, True, False, False])
+        for post in posts:
+            post.image.ready_thumbnails.clear()
+        with self.assertNumQueries(0):
+            prefetch_thumbnails(posts)
+
+    def test_tag_uses_prefetched_thumbnails(self):
+        """Тег не обращается к хранилищу, если миниатюры уже найдены"""
+        enqueue_thumbnails(self.post.image.name)
+        with mock.patch.object(
+            default.backend, 'get_ready_thumbnail'
+        ) as get_ready:
+            response = Client().get(reverse('posts:index'))
+        get_ready.assert_not_called()
+        self.assertContains(response, self.get_ready().url)
@@ -0,0 +1,114 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.testing import capture_on_commit_callbacks
+from posts.models import Follow, Post, Profile, TimelineEntry
+from posts.timeline import rebuild_timelines
+
+User = get_user_model()
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='Author')
+        cls.reader = User.objects.create(username='Reader')
+        cls.old_post = Post.objects.create(author=cls.author, text='Старый')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def get_feed(self, **params):
+        response = self.client.get(reverse('posts:follow_index'), params)
+        return list(response.context['page_obj'])
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        """Подписка наполняет ленту, отписка очищает её"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.get_feed(), [self.old_post])
+        Follow.objects.get(user=self.reader, author=self.author).delete()
+        self.assertFalse(TimelineEntry.objects.filter(user=self.reader))
+        self.assertEqual(self.get_feed(), [])
+
+    def test_new_post_fans_out(self):
+        """Новый пост копируется в ленты подписчиков"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый')
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post, pub_date=post.pub_date
+        ).exists())
+        self.assertEqual(self.get_feed(), [post, self.old_post])
+
+    def test_popular_author_is_read_on_demand(self):
+        """Посты популярного автора подмешиваются при чтении"""
+        other = User.objects.create(username='Other')
+        Follow.objects.create(user=self.reader, author=other)
+        other_posts = [
+            Post.objects.create(author=other, text=str(i)) for i in range(6)
+        ]
+        with self.settings(POSTS_TIMELINE_FANOUT_LIMIT=0):
+            with capture_on_commit_callbacks(execute=True):
+                Follow.objects.create(user=self.reader, author=self.author)
+            posts = [
+                Post.objects.create(author=self.author, text=str(i))
+                for i in range(6)
+            ]
+            self.assertFalse(TimelineEntry.objects.filter(
+                post__in=posts
+            ).exists())
+            with self.settings(POSTS_PER_PAGE=5):
+                response = self.client.get(reverse('posts:follow_index'))
+                page_obj = response.context['page_obj']
+                rest = self.get_feed(cursor=page_obj.next_cursor)
+        expected = sorted(
+            other_posts + posts + [self.old_post],
+            key=lambda post: (post.pub_date, post.pk),
+            reverse=True,
+        )
+        self.assertEqual(list(page_obj) + rest[:5], expected[:10])
+
+    def test_rebuild_restores_timelines(self):
+        """Ленты восстанавливаются целиком после загрузки в обход сигналов"""
+        Follow.objects.bulk_create([
+            Follow(user=self.reader, author=self.author)
+        ])
+        self.assertEqual(self.get_feed(), [])
+        self.assertEqual(rebuild_timelines(), 1)
+        self.assertEqual(self.get_feed(), [self.old_post])
+
+    @override_settings(
+        POSTS_TIMELINE_FANOUT_LIMIT=2, POSTS_TIMELINE_WORKERS=0
+    )
+    def test_author_well_under_limit_is_fanned_out(self):
+        """Посты автора попадают в ленты, только когда подписчиков
+        заметно меньше лимита"""
+        others = [
+            User.objects.create(username=f'Other{i}') for i in range(2)
+        ]
+        with capture_on_commit_callbacks(execute=True):
+            for user in [self.reader, *others]:
+                Follow.objects.create(user=user, author=self.author)
+        self.assertTrue(Profile.objects.get(user=self.author).timeline_pulled)
+        post = Post.objects.create(author=self.author, text='Новый')
+        self.assertFalse(TimelineEntry.objects.filter(post=post))
+        # Два подписчика - уже не больше лимита, но ещё не ниже 80% от него.
+        with capture_on_commit_callbacks(execute=True):
+            Follow.objects.unfollow(others[0], self.author)
+        self.assertTrue(Profile.objects.get(user=self.author).timeline_pulled)
+        with capture_on_commit_callbacks() as callbacks:
+            Follow.objects.unfollow(others[1], self.author)
+        # До коммита отписки посты копируются только при чтении.
+        self.assertTrue(Profile.objects.get(user=self.author).timeline_pulled)
+        self.assertEqual(self.get_feed(), [post, self.old_post])
+        for callback in callbacks:
+            callback()
+        self.assertFalse(Profile.objects.get(user=self.author).timeline_pulled)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post
+        ).exists())
+        self.assertEqual(self.get_feed(), [post, self.old_post])
@@ -0,0 +1,188 @@
+"""Создание миниатюр картинок постов вне цикла запроса.
+
+Миниатюры всех размеров из POSTS_THUMBNAILS ставятся в очередь пулу
+потоков, когда пост сохраняется с картинкой. Шаблоны только ищут готовую
+миниатюру и, пока её нет, выводят запасной вариант. Миниатюры страницы
+ленты ищутся заранее, одним обращением к хранилищу sorl.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend as BaseThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.kvstores.cached_db_kvstore import KVStore as BaseKVStore
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+logger = logging.getLogger(__name__)
+
+# Сколько секунд помнить, что миниатюры ещё нет.
+MISS_TIMEOUT = 5
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+def thumbnail_key(geometry, options):
+    return geometry, tuple(sorted(options.items()))
+
+
+class KVStore(BaseKVStore):
+    """Хранилище sorl, умеющее искать записи пачкой.
+
+    Миниатюры создаются в фоне, поэтому их отсутствие кэшируется лишь на
+    MISS_TIMEOUT секунд: иначе процесс, заглянувший раньше пула, до
+    истечения THUMBNAIL_CACHE_TIMEOUT выводил бы исходную картинку.
+    """
+
+    def _get_raw(self, key):
+        return self.get_raw_many([key])[key]
+
+    def get_raw_many(self, keys):
+        values = self.cache.get_many(keys)
+        missing = [key for key in keys if key not in values]
+        if missing:
+            found = dict(KVStoreModel.objects.filter(
+                key__in=missing
+            ).values_list('key', 'value'))
+            self.cache.set_many(
+                found, sorl_settings.THUMBNAIL_CACHE_TIMEOUT
+            )
+            self.cache.set_many(
+                {key: EMPTY_VALUE for key in missing if key not in found},
+                MISS_TIMEOUT,
+            )
+            values.update(found)
+        return {
+            key: None if values.get(key, EMPTY_VALUE) == EMPTY_VALUE
+            else values[key]
+            for key in keys
+        }
+
+    def get_many(self, image_files):
+        keys = [add_prefix(image_file.key) for image_file in image_files]
+        values = self.get_raw_many(keys)
+        return [
+            None if values[key] is None
+            else deserialize_image_file(values[key])
+            for key in keys
+        ]
+
+
+class ThumbnailBackend(BaseThumbnailBackend):
+    """Бэкенд sorl, умеющий искать миниатюры, не создавая их."""
+
+    def get_thumbnail_file(self, file_, geometry_string, **options):
+        source = ImageFile(file_)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+    def get_ready_thumbnail(self, file_, geometry_string, **options):
+        return default.kvstore.get(
+            self.get_thumbnail_file(file_, geometry_string, **options)
+        )
+
+
+def get_ready_thumbnails(images):
+    """Ищет миниатюры всех размеров для картинок одним обращением.
+
+    Картинки - файлы полей или имена в хранилище. Возвращает кортежи
+    (картинка, размер, опции, миниатюра или None).
+    """
+    requests = [
+        (image, geometry, options)
+        for image in images
+        for geometry, options in settings.POSTS_THUMBNAILS
+    ]
+    if not requests:
+        return []
+    thumbnails = default.kvstore.get_many([
+        default.backend.get_thumbnail_file(image, geometry, **options)
+        for image, geometry, options in requests
+    ])
+    return [
+        request + (thumbnail,)
+        for request, thumbnail in zip(requests, thumbnails)
+    ]
+
+
+def prefetch_thumbnails(posts):
+    """Ищет готовые миниатюры картинок постов одним обращением.
+
+    Найденное складывается в атрибут ready_thumbnails картинки, где его
+    берёт тег {% thumbnail %}; None значит, что миниатюры ещё нет.
+    """
+    images = [post.image for post in posts if post.image]
+    for image, geometry, options, thumbnail in get_ready_thumbnails(images):
+        if not hasattr(image, 'ready_thumbnails'):
+            image.ready_thumbnails = {}
+        image.ready_thumbnails[thumbnail_key(geometry, options)] = thumbnail
+
+
+def prefetch_page_thumbnails(page):
+    """Загружает записи страницы и ищет их миниатюры."""
+    page.object_list = list(page.object_list)
+    prefetch_thumbnails(page.object_list)
+    return page
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.POSTS_THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+    return _executor
+
+
+def enqueue_thumbnails(name, on_ready=None):
+    """Ставит в очередь создание всех миниатюр картинки name.
+
+    Повторная заявка на картинку, миниатюры которой ещё создаются, не
+    дублируется. on_ready вызывается, когда миниатюры готовы. При
+    POSTS_THUMBNAIL_WORKERS = 0 миниатюры создаются сразу, в текущем
+    потоке.
+    """
+    with _lock:
+        if name in _pending:
+            return
+        _pending.add(name)
+    if settings.POSTS_THUMBNAIL_WORKERS:
+        get_executor().submit(
+            generate_thumbnails, name, on_ready, in_worker=True
+        )
+    else:
+        generate_thumbnails(name, on_ready)
+
+
+def generate_thumbnails(name, on_ready=None, in_worker=False):
+    try:
+        for geometry, options in settings.POSTS_THUMBNAILS:
+            default.backend.get_thumbnail(name, geometry, **options)
+        if on_ready is not None:
+            on_ready()
+    except Exception:
+        logger.exception('Не удалось создать миниатюры %s', name)
+    finally:
+        with _lock:
+            _pending.discard(name)
+        if in_worker:
+            connection.close()
@@ -0,0 +1,291 @@
+"""Материализованная лента подписок.
+
+Новый пост копируется в ленты подписчиков автора (fan-out on write).
+Посты авторов, у которых подписчиков больше POSTS_TIMELINE_FANOUT_LIMIT,
+не копируются, а подмешиваются при чтении (fan-out on read). Такие авторы
+отмечены в Profile.timeline_pulled. Когда подписчиков становится меньше
+доли POSTS_TIMELINE_FANOUT_RESUME_RATIO от лимита, их посты в фоне
+копируются в ленты подписчиков, и автор снова раздаётся при записи.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.db.models import Count, Exists, OuterRef
+
+from core.cache import get_or_set_locked
+from core.concurrency import gather
+from core.db import immediate_transaction
+
+from .models import Follow, Post, Profile, TimelineEntry
+from .paginator import NEXT, KeysetPaginator
+
+logger = logging.getLogger(__name__)
+
+PULLED_AUTHORS_KEY = 'posts:timeline:pulled_authors'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def pulled_author_ids():
+    """Авторы, чьи посты читаются из Post, а не из материализованных лент.
+
+    Признак хранится в Profile.timeline_pulled, кэш лишь избавляет от
+    запроса и сбрасывается после коммита, когда признак меняется.
+    """
+    return get_or_set_locked(
+        caches['timeline'],
+        PULLED_AUTHORS_KEY,
+        lambda: frozenset(Profile.objects.filter(
+            timeline_pulled=True
+        ).values_list('user_id', flat=True)),
+    )
+
+
+def forget_pulled_authors():
+    transaction.on_commit(
+        lambda: caches['timeline'].delete(PULLED_AUTHORS_KEY)
+    )
+
+
+def author_followed(author_id):
+    """Переводит автора в fan-out on read, если подписчиков стало много.
+
+    Вызывается после увеличения follower_count. Условный UPDATE не
+    теряет одновременных изменений, в отличие от правки общего множества.
+    """
+    pulled = Profile.objects.filter(
+        pk=author_id,
+        timeline_pulled=False,
+        follower_count__gt=settings.POSTS_TIMELINE_FANOUT_LIMIT,
+    ).update(timeline_pulled=True)
+    if pulled:
+        forget_pulled_authors()
+
+
+def author_unfollowed(author_id):
+    """После коммита отписки возвращает автора к fan-out on write, если
+    подписчиков стало заметно меньше лимита.
+
+    Копирование всех постов автора в ленты подписчиков выполняется в
+    фоне, а не в транзакции чужой отписки.
+    """
+    if author_id in pulled_author_ids():
+        transaction.on_commit(
+            lambda: run_in_background(push_author, author_id)
+        )
+
+
+def push_author(author_id):
+    """Копирует посты автора в ленты подписчиков и снимает признак.
+
+    Признак снимается в той же транзакции, что и копирование: до её
+    коммита посты автора по-прежнему подмешиваются при чтении.
+    """
+    resume_below = (
+        settings.POSTS_TIMELINE_FANOUT_LIMIT
+        * settings.POSTS_TIMELINE_FANOUT_RESUME_RATIO
+    )
+    with immediate_transaction():
+        pushed = Profile.objects.filter(
+            pk=author_id,
+            timeline_pulled=True,
+            follower_count__lt=resume_below,
+        ).update(timeline_pulled=False)
+        if pushed:
+            backfill_followers(author_id)
+            forget_pulled_authors()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.POSTS_TIMELINE_WORKERS,
+                thread_name_prefix='timeline',
+            )
+    return _executor
+
+
+def run_in_background(function, *args):
+    """Вызывает function(*args) в фоновом потоке.
+
+    При POSTS_TIMELINE_WORKERS = 0 функция вызывается сразу.
+    """
+    if not settings.POSTS_TIMELINE_WORKERS:
+        function(*args)
+        return
+    get_executor().submit(run_job, function, *args)
+
+
+def run_job(function, *args):
+    try:
+        function(*args)
+    except Exception:
+        logger.exception('Фоновая задача лент %s не выполнена', function)
+    finally:
+        connection.close()
+
+
+def fan_out_post(post):
+    """Копирует пост в ленты подписчиков, возвращает их id."""
+    if post.author_id in pulled_author_ids():
+        return []
+    followers = list(Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True))
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in followers
+        ],
+        batch_size=settings.POSTS_TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    return followers
+
+
+def backfill_timeline(user_id, author_id):
+    """Добавляет в ленту пользователя посты автора после подписки."""
+    if author_id in pulled_author_ids():
+        return
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'pk', 'pub_date'
+    )
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+            for pk, pub_date in posts.iterator()
+        ),
+        batch_size=settings.POSTS_TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def prune_timeline(user_id, author_id):
+    """Убирает из ленты пользователя посты автора после отписки."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def copy_posts_sql(pulled_count=0, author=False):
+    """INSERT SELECT постов авторов в ленты их подписчиков.
+
+    Без author копируются посты всех авторов, кроме pulled_count
+    исключённых; с author - посты одного автора.
+    """
+    ops = connection.ops
+    quote = ops.quote_name
+    timeline = quote(TimelineEntry._meta.db_table)
+    follow = quote(Follow._meta.db_table)
+    post = quote(Post._meta.db_table)
+    sql = (
+        f'{ops.insert_statement(ignore_conflicts=True)} {timeline} '
+        f'(user_id, post_id, pub_date) '
+        f'SELECT f.user_id, p.id, p.pub_date FROM {follow} f '
+        f'INNER JOIN {post} p ON p.author_id = f.author_id'
+    )
+    if author:
+        sql += ' WHERE f.author_id = %s'
+    elif pulled_count:
+        sql += (
+            f' WHERE f.author_id NOT IN '
+            f'({", ".join(["%s"] * pulled_count)})'
+        )
+    return f'{sql} {ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}'
+
+
+def backfill_followers(author_id):
+    """Добавляет все посты автора в ленты всех его подписчиков."""
+    with connection.cursor() as cursor:
+        cursor.execute(copy_posts_sql(author=True), [author_id])
+
+
+def rebuild_timelines():
+    """Заново материализует ленты всех пользователей одним INSERT SELECT.
+
+    Нужна после загрузки подписок и постов в обход сигналов: заново
+    отмечает авторов с подписчиками больше POSTS_TIMELINE_FANOUT_LIMIT
+    (в том числе после смены лимита) и возвращает число записей в лентах.
+    """
+    Profile.objects.update(timeline_pulled=Exists(
+        Follow.objects.filter(author_id=OuterRef('pk')).order_by().values(
+            'author_id'
+        ).annotate(followers=Count('pk')).filter(
+            followers__gt=settings.POSTS_TIMELINE_FANOUT_LIMIT
+        )
+    ))
+    forget_pulled_authors()
+    pulled = list(Profile.objects.filter(
+        timeline_pulled=True
+    ).values_list('user_id', flat=True))
+    TimelineEntry.objects.all().delete()
+    with connection.cursor() as cursor:
+        cursor.execute(copy_posts_sql(len(pulled)), pulled)
+    return TimelineEntry.objects.count()
+
+
+def pulled_posts(user):
+    """Посты популярных авторов, на которых подписан пользователь."""
+    pulled = pulled_author_ids()
+    if not pulled:
+        return None
+    authors = list(Follow.objects.filter(
+        user=user, author_id__in=pulled
+    ).values_list('author_id', flat=True))
+    if not authors:
+        return None
+    return Post.objects.filter(author_id__in=authors).for_feed()
+
+
+class TimelinePaginator(KeysetPaginator):
+    """Пагинатор ленты подписок.
+
+    object_list - записи TimelineEntry пользователя, pulled - посты
+    популярных авторов, которые сливаются с ними при чтении.
+    """
+    id_field = 'post_id'
+
+    def __init__(self, object_list, per_page, pulled=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.pulled = pulled
+
+    def fetch(self, direction, position=None, offset=0, limit=None):
+        entries = self.seek(
+            self.object_list.for_feed(),
+            direction,
+            position,
+            self.id_field,
+        )[:offset + limit]
+        if self.pulled is None:
+            rows = {entry.post_id: entry.post for entry in entries}
+        else:
+            # Записи ленты и посты популярных авторов не зависят друг от
+            # друга и читаются одновременно.
+            pulled = self.seek(self.pulled, direction, position)
+            entries, pulled = gather(
+                lambda: list(entries), lambda: list(pulled[:offset + limit])
+            )
+            rows = {entry.post_id: entry.post for entry in entries}
+            rows.update((post.pk, post) for post in pulled)
+        rows = sorted(
+            rows.values(),
+            key=lambda post: (post.pub_date, post.pk),
+            reverse=direction == NEXT,
+        )
+        return rows[offset:offset + limit]
+
+    def bounded_count(self, limit):
+        return len(self.fetch(NEXT, limit=limit))
+
+    def count_objects(self):
+        count = super().count_objects()
+        if self.pulled is not None:
+            count += self.pulled.count()
+        return count
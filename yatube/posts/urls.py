@@ -1,16 +1,38 @@
 from django.urls import path
+from django.utils.feedgenerator import Atom1Feed
 
 from . import views
+from .syndication import AuthorFeed, GroupFeed, IndexFeed
 
 app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('feed/', IndexFeed(), name='index_rss'),
+    path('feed/atom/', IndexFeed(Atom1Feed), name='index_atom'),
     path('group/<slug:slug>/', views.group_posts, name='group'),
+    path('group/<slug:slug>/feed/', GroupFeed(), name='group_rss'),
+    path(
+        'group/<slug:slug>/feed/atom/',
+        GroupFeed(Atom1Feed),
+        name='group_atom'
+    ),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path('profile/<str:username>/feed/', AuthorFeed(), name='author_rss'),
+    path(
+        'profile/<str:username>/feed/atom/',
+        AuthorFeed(Atom1Feed),
+        name='author_atom'
+    ),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path('search/', views.search, name='search'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments'
+    ),
     path(
         'posts/<int:post_id>/comment/',
         views.add_comment,
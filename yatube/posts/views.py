@@ -1,64 +1,226 @@
-from django.core.paginator import Paginator
+from functools import partial
+
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.paginator import EmptyPage
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.functional import SimpleLazyObject
 
+from core.db import immediate_transaction
 
 from .forms import PostForm, CommentForm
-from .models import Post, Group, User, Follow
+from .models import (
+    Post, Group, User, Follow, TimelineEntry, Profile, Comment
+)
+from .comment_buffer import is_buffered, save_comment
+from .conditional import not_modified, page_validators, set_validators
+from .counts import get_feed_counter
+from .feed_cache import feed_cache_context
+from .follows import is_following
+from .paginator import CountingPaginator, KeysetPaginator
+from .recount import recount_profiles
+from .search import search_posts
+from .thumbnails import prefetch_page_thumbnails, prefetch_thumbnails
+from .timeline import TimelinePaginator, pulled_posts
 from django.contrib.auth.decorators import login_required
 
 
-def get_page_pagination(queryset, request):
-    paginator = Paginator(queryset, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    return {
-        'page_obj': page_obj,
-    }
+def feed_paginator(queryset, feed, paginator_class=None):
+    counter = get_feed_counter(feed)
+    if paginator_class is None and settings.POSTS_PAGINATION == 'keyset':
+        paginator_class = KeysetPaginator
+    if paginator_class is None:
+        return CountingPaginator(
+            queryset, settings.POSTS_PER_PAGE, counter=counter
+        )
+    return paginator_class(
+        queryset,
+        settings.POSTS_PER_PAGE,
+        counter=counter,
+        max_offset_pages=settings.POSTS_MAX_OFFSET_PAGES,
+    )
+
+
+def get_page_pagination(
+    queryset, request, feed, paginator_class=None, cached=False
+):
+    """Страница ленты для контекста шаблона.
+
+    Для кэшируемых лент страница загружается лениво: если шаблон отдаёт
+    фрагмент из кэша, запрос за записями страницы не выполняется.
+    """
+    paginator = feed_paginator(queryset, feed, paginator_class)
+    cursor = request.GET.get('cursor')
+    if paginator.is_keyset and paginator.decode_cursor(cursor):
+        page_obj = prefetch_page_thumbnails(paginator.get_page(cursor=cursor))
+        if not cached:
+            return {'page_obj': page_obj}
+        # Курсор может указывать на любую точку между записями, поэтому
+        # ключом фрагмента служат записи, которые он на самом деле выбрал.
+        rows = page_obj.object_list[:1] + page_obj.object_list[-1:]
+        page_key = ':'.join(map(str, (
+            page_obj.number, page_obj.has_next(), *(row.pk for row in rows)
+        )))
+    else:
+        try:
+            page_key = paginator.normalize_number(request.GET.get('page'))
+        except EmptyPage:
+            raise Http404('Страница за пределами ленты')
+        get_page = partial(paginator.get_page, page_key)
+        if not cached:
+            return {'page_obj': prefetch_page_thumbnails(get_page())}
+        page_obj = SimpleLazyObject(
+            lambda: prefetch_page_thumbnails(get_page())
+        )
+    context = {'page_obj': page_obj}
+    context.update(feed_cache_context(request, feed, page_key))
+    return context
+
+
+def get_profile(user):
+    try:
+        return user.profile
+    except Profile.DoesNotExist:
+        recount_profiles(User, Profile, Post, Follow, user.pk, user.pk + 1)
+        return Profile.objects.get(user=user)
 
 
 def index(request):
-    context = get_page_pagination(Post.objects.all(), request)
-    return render(request, 'posts/index.html', context)
+    validators = page_validators(request, 'index')
+    response = not_modified(request, validators)
+    if response is not None:
+        return response
+    context = get_page_pagination(
+        Post.objects.for_feed(), request, 'index', cached=True
+    )
+    return set_validators(
+        request, render(request, 'posts/index.html', context), validators
+    )
 
 
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
+    feed = f'group:{group.pk}'
+    validators = page_validators(request, feed)
+    response = not_modified(request, validators)
+    if response is not None:
+        return response
     context = {
         'group': group,
     }
-    context.update(get_page_pagination(group.posts.all(), request))
-    return render(request, 'posts/group_list.html', context)
+    context.update(get_page_pagination(
+        group.posts.for_feed(), request, feed, cached=True
+    ))
+    return set_validators(
+        request, render(request, 'posts/group_list.html', context), validators
+    )
 
 
 def profile(request, username):
     template_name = 'posts/profile.html'
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
-    user_posts = post_list.count()
-    following = author.following.all()
+    author = get_object_or_404(
+        User.objects.select_related('profile'), username=username
+    )
+    feed = f'author:{author.pk}'
+    validators = page_validators(request, feed)
+    response = not_modified(request, validators)
+    if response is not None:
+        return response
+    user_posts = get_profile(author).post_count
+    following = is_following(request.user, author)
     context = {
         'author': author,
         'user_posts': user_posts,
         'following': following,
     }
-    context.update(get_page_pagination(author.posts.all(), request))
-    return render(request, template_name, context)
+    context.update(get_page_pagination(
+        author.posts.for_feed(), request, feed, cached=True
+    ))
+    return set_validators(
+        request, render(request, template_name, context), validators
+    )
 
 
 def post_detail(request, post_id):
     template_name = 'posts/post_detail.html'
-    full_post = get_object_or_404(Post, id=post_id)
-    count_posts = full_post.author.posts.count()
+    full_post = get_object_or_404(
+        Post.objects.select_related('author__profile', 'group'), id=post_id
+    )
+    # Версия ленты автора меняется с каждым его постом, а с ней и
+    # счётчик постов на странице; версия post:<id> - с комментариями.
+    validators = page_validators(
+        request,
+        f'author:{full_post.author_id}',
+        f'post:{post_id}',
+    )
+    response = not_modified(request, validators)
+    if response is not None:
+        return response
+    count_posts = get_profile(full_post.author).post_count
     comment_form = CommentForm(request.POST or None)
-    comments = full_post.comments.all()
+    comments = get_comments_page(full_post.comments.all(), request)
     context = {
         'full_post': full_post,
         'count_posts': count_posts,
         'comment_form': comment_form,
         'comments': comments,
+        'post_id': post_id,
     }
-    return render(request, template_name, context)
+    return set_validators(
+        request, render(request, template_name, context), validators
+    )
+
+
+def get_comments_page(queryset, request):
+    """Страница комментариев по курсору, без COUNT и OFFSET."""
+    paginator = KeysetPaginator(
+        queryset.for_list(),
+        settings.POSTS_COMMENTS_PER_PAGE,
+        max_offset_pages=1,
+    )
+    return paginator.get_page(cursor=request.GET.get('cursor'))
+
+
+def post_comments(request, post_id):
+    """Следующая страница комментариев для подгрузки на странице поста.
+
+    Отдаёт HTML-фрагмент, а с ?format=json - комментарии в JSON.
+    """
+    comments = get_comments_page(
+        Comment.objects.filter(post_id=post_id), request
+    )
+    if not comments and not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    if request.GET.get('format') != 'json':
+        return render(request, 'posts/includes/comments.html', {
+            'comments': comments,
+            'post_id': post_id,
+        })
+    return JsonResponse({
+        'comments': [
+            {
+                'id': comment.pk,
+                'author': comment.author.username,
+                'text': comment.text,
+                'pub_date': comment.pub_date,
+            }
+            for comment in comments
+        ],
+        'next_cursor': comments.next_cursor,
+    })
+
+
+def search(request):
+    """Поиск постов по словам с ранжированием по релевантности."""
+    query = request.GET.get('q', '').strip()
+    posts, next_cursor = search_posts(query, request.GET.get('cursor'))
+    prefetch_thumbnails(posts)
+    return render(request, 'posts/search.html', {
+        'query': query,
+        'posts': posts,
+        'next_cursor': next_cursor,
+    })
 
 
 @login_required
@@ -72,7 +234,8 @@ def post_create(request):
         if form.is_valid():
             post = form.save(commit=False)
             post.author = request.user
-            post.save()
+            with immediate_transaction():
+                post.save()
             return redirect('posts:profile', username=post.author)
         return render(request, template_name, {'form': form})
     form = PostForm()
@@ -93,7 +256,12 @@ def post_edit(request, post_id):
             post_id=post_id,
         )
     if form.is_valid():
-        form.save()
+        # Счётчики поста обновляются отдельно, поэтому сохраняем только
+        # поля формы, чтобы не затереть их устаревшими значениями.
+        with immediate_transaction():
+            form.save(commit=False).save(
+                update_fields=PostForm.Meta.fields
+            )
         return redirect(
             'posts:post_detail',
             post_id=post_id,
@@ -108,37 +276,41 @@ def post_edit(request, post_id):
 @login_required
 def add_comment(request, post_id):
     form = CommentForm(request.POST or None)
-    post = get_object_or_404(Post, id=post_id)
+    if not is_buffered():
+        # В буферизованном режиме комментарии к удалённым постам
+        # отбрасываются при записи пачки.
+        get_object_or_404(Post.objects.only('pk'), id=post_id)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
-        comment.post = post
-        comment.save()
+        comment.post_id = post_id
+        save_comment(comment)
     return redirect('posts:post_detail', post_id)
 
 
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    context = get_page_pagination(post_list.all(), request)
+    context = get_page_pagination(
+        TimelineEntry.objects.filter(user=request.user),
+        request,
+        f'follow:{request.user.pk}',
+        partial(TimelinePaginator, pulled=pulled_posts(request.user)),
+    )
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
 def profile_follow(request, username):
     follow = get_object_or_404(User, username=username)
-    already_following = Follow.objects.filter(
-        user=request.user,
-        author=follow
-    ).exists()
-    if request.user != follow and not already_following:
-        Follow.objects.get_or_create(user=request.user, author=follow)
+    if request.user != follow:
+        with immediate_transaction():
+            Follow.objects.follow(request.user, follow)
     return redirect('posts:profile', username=username)
 
 
 @login_required
 def profile_unfollow(request, username):
     following = get_object_or_404(User, username=username)
-    follower = get_object_or_404(Follow, author=following, user=request.user)
-    follower.delete()
+    with immediate_transaction():
+        Follow.objects.unfollow(request.user, following)
     return redirect('posts:profile', username=username)
@@ -0,0 +1,22 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Django 2.2 has no ASGI support of its own: core.asgi.ASGIHandler runs the
+regular request handler in a bounded thread pool (ASGI_THREADS).
+"""
+
+import os
+
+from django.conf import settings
+
+from core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+application = get_asgi_application()
+
+if settings.TEMPLATES_PRECOMPILE:
+    from core.templates import precompile_templates
+
+    precompile_templates()
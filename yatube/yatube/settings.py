@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     'users',
     'core',
     'posts',
+    'api',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -49,6 +50,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -72,6 +74,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'posts.context_processors.following',
             ],
         },
     },
@@ -79,22 +82,106 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+# Parse and check every template of TEMPLATES DIRS when a worker starts
+# (core.templates.precompile_templates), failing on broken ones. Pays off
+# with the cached loader of yatube.settings_production, which keeps parsed
+# templates; without it templates are read and parsed on every render.
+TEMPLATES_PRECOMPILE = False
+
+# yatube.asgi serves connections from an event loop and runs Django in a
+# pool of ASGI_THREADS threads, which also bounds concurrent database access.
+# Independent lookups within a view (core.concurrency.gather) share a pool of
+# CONCURRENT_LOOKUP_THREADS threads; 0 runs them one after another.
+ASGI_THREADS = 8
+CONCURRENT_LOOKUP_THREADS = 4
+
+# Cache backend shared by worker processes, chosen by YATUBE_CACHE_BACKEND:
+# 'locmem' (per process), 'file', 'db' (run manage.py createcachetable),
+# 'memcached' or 'redis' (needs django-redis). YATUBE_CACHE_LOCATION points
+# the backend at another directory, table or server.
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', ''),
+    'file': (
+        'django.core.cache.backends.filebased.FileBasedCache',
+        os.path.join(BASE_DIR, 'cache'),
+    ),
+    'db': ('django.core.cache.backends.db.DatabaseCache', 'yatube_cache'),
+    'memcached': (
+        'django.core.cache.backends.memcached.MemcachedCache',
+        '127.0.0.1:11211',
+    ),
+    'redis': ('django_redis.cache.RedisCache', 'redis://127.0.0.1:6379/1'),
+}
+CACHE_BACKEND, CACHE_LOCATION = CACHE_BACKENDS[
+    os.environ.get('YATUBE_CACHE_BACKEND', 'locmem')
+]
+CACHE_LOCATION = os.environ.get('YATUBE_CACHE_LOCATION', CACHE_LOCATION)
+
+# Every namespace is a cache alias over the same storage with its own key
+# prefix and default timeout in seconds (None - no expiry).
+CACHE_TTLS = {
+    'default': 300,
+    # Feed versions, bumped by signals, and rendered feed pages keyed by
+    # them and RSS/Atom documents (those expire after
+    # POSTS_FEED_FRAGMENT_TIMEOUT).
+    'feeds': None,
+    # Cached feed counts.
+    'counts': 60 * 5,
+    # Authors whose posts are merged into follow feeds on read.
+    'timeline': 60 * 10,
+}
 CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'
+    namespace: {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': CACHE_LOCATION,
+        'KEY_PREFIX': namespace,
+        'TIMEOUT': timeout,
     }
+    for namespace, timeout in CACHE_TTLS.items()
 }
 
+# Stampede protection: on a miss of a hot key one process recomputes the
+# value while the others wait for it up to CACHE_LOCK_WAIT seconds.
+CACHE_LOCK_TIMEOUT = 30
+CACHE_LOCK_WAIT = 2
+CACHE_LOCK_POLL = 0.05
+
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# SQLite runs through core.backends.sqlite3, which applies SQLITE_PRAGMAS on
+# every new connection: WAL lets readers work alongside a writer, a writer
+# waits busy_timeout milliseconds for the lock instead of failing, and
+# synchronous=NORMAL is durable in WAL except for the last transactions on
+# power loss. Connections are reused for CONN_MAX_AGE seconds. With
+# YATUBE_SQLITE_TUNING=0 the stock backend is used, each request connecting
+# anew.
+SQLITE_TUNING = os.environ.get('YATUBE_SQLITE_TUNING', '1') == '1'
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    # In bytes; up to this much of the file is read through the page cache.
+    'mmap_size': 256 * 1024 * 1024,
+    # Negative values are in KiB: 64 MiB per connection.
+    'cache_size': -64 * 1024,
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'NAME': os.environ.get(
+            'YATUBE_DATABASE', os.path.join(BASE_DIR, 'db.sqlite3')
+        ),
     }
 }
+if SQLITE_TUNING:
+    DATABASES['default'].update(
+        ENGINE='core.backends.sqlite3',
+        CONN_MAX_AGE=600,
+        OPTIONS={'pragmas': SQLITE_PRAGMAS},
+    )
 
 
 # Password validation
@@ -146,3 +233,108 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Pagination of post feeds: 'keyset' (cursor by pub_date and id, no COUNT)
+# or 'offset' (django.core.paginator.Paginator).
+POSTS_PAGINATION = 'keyset'
+POSTS_PER_PAGE = 10
+# Deepest page reachable with legacy ?page=N links in keyset mode.
+POSTS_MAX_OFFSET_PAGES = 50
+# Rendered feed pages of outdated feed versions are never read again and
+# only expire, so they must not live forever.
+POSTS_FEED_FRAGMENT_TIMEOUT = 60 * 60
+
+# How feed paginators count posts: 'exact', 'cached' (kept in the 'counts'
+# cache and adjusted by post signals) or 'estimated' (database table statistics,
+# unfiltered feeds only, falls back to 'cached'). Only 'offset' pagination
+# counts feed posts: keyset pages never need a total. The 'index' strategy
+# also counts all posts for search ranking.
+POSTS_COUNT_STRATEGIES = {
+    'index': 'estimated',
+    'group': 'cached',
+    'author': 'cached',
+    'follow': 'cached',
+}
+# Below this estimate statistics are too coarse, count through the cache.
+POSTS_COUNT_ESTIMATE_MIN = 10000
+
+# Follow feed is materialized per user on write. Posts of authors with more
+# followers than the limit are merged into the feed on read instead.
+# The follow feed is always paginated with cursors.
+POSTS_TIMELINE_FANOUT_LIMIT = 1000
+POSTS_TIMELINE_BATCH_SIZE = 500
+# Such an author returns to fan-out on write only once followers drop below
+# this share of the limit, so an author near the limit does not flip on
+# every follow. Copying their posts into follower feeds then runs after
+# commit in a background thread (inline with zero workers).
+POSTS_TIMELINE_FANOUT_RESUME_RATIO = 0.8
+POSTS_TIMELINE_WORKERS = 1
+
+# Thumbnails are generated off the request path; templates only look up
+# ready ones, fetched for a whole feed page at once. With zero workers they
+# are generated inline; tests that need the thumbnails override it to 0.
+THUMBNAIL_BACKEND = 'posts.thumbnails.ThumbnailBackend'
+THUMBNAIL_KVSTORE = 'posts.thumbnails.KVStore'
+POSTS_THUMBNAILS = [
+    ('960x339', {'crop': 'center', 'upscale': True}),
+]
+POSTS_THUMBNAIL_WORKERS = 2
+
+# Uploaded post images are downscaled to this many pixels on the long side,
+# re-encoded and stripped of metadata, unless already smaller than
+# POSTS_IMAGE_KEEP_SIZE bytes, within the limit and free of metadata.
+# Images with transparency are stored as PNG when the format is JPEG.
+POSTS_IMAGE_MAX_SIDE = 1920
+POSTS_IMAGE_FORMAT = 'JPEG'
+POSTS_IMAGE_QUALITY = 85
+POSTS_IMAGE_KEEP_SIZE = 200 * 1024
+# Larger uploads are rejected before decoding.
+POSTS_IMAGE_MAX_PIXELS = 50 * 1000 * 1000
+
+# RSS and Atom feeds (posts.syndication) list this many latest posts.
+POSTS_SYNDICATION_SIZE = 20
+
+# Comments on the post page are paginated with cursors; further pages are
+# loaded from posts:post_comments.
+POSTS_COMMENTS_PER_PAGE = 20
+
+# 'direct' saves each comment in its request. 'buffered' accepts it at once
+# and writes comments of a post in bulk: when POSTS_COMMENT_BATCH_SIZE pile
+# up or every POSTS_COMMENT_FLUSH_INTERVAL milliseconds (None disables the
+# background flush). Buffered comments are lost if the process crashes.
+# A batch that hit a transient database error (e.g. a locked database) is
+# retried on the next flushes, at most POSTS_COMMENT_WRITE_RETRIES times.
+POSTS_COMMENT_WRITES = 'direct'
+POSTS_COMMENT_BATCH_SIZE = 100
+POSTS_COMMENT_WRITE_RETRIES = 3
+POSTS_COMMENT_FLUSH_INTERVAL = 200
+
+# Per-request profiling: query count and SQL time, repeated queries, template
+# and cache stats in a Server-Timing header and a JSON line in the
+# core.profiling log. Disabled, the middleware drops out of the chain.
+# SQL run more than REQUEST_PROFILING_REPEAT_LIMIT times in one request is
+# reported as a likely N+1.
+REQUEST_PROFILING = bool(os.environ.get('YATUBE_REQUEST_PROFILING'))
+REQUEST_PROFILING_REPEAT_LIMIT = 3
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.profiling': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+# Read-only JSON API under /api/v1/: page size of cursor-paginated lists
+# (?limit= up to API_MAX_PAGE_SIZE) and how many rows exports read and
+# encode at a time.
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 100
+API_EXPORT_CHUNK_SIZE = 2000
@@ -0,0 +1,30 @@
+"""
+Production settings for yatube project.
+
+Enabled with DJANGO_SETTINGS_MODULE=yatube.settings_production; everything
+not overridden here comes from yatube.settings.
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import TEMPLATES
+
+DEBUG = False
+
+# Templates are read and parsed once per process and kept by the cached
+# loader, instead of on every render. Template changes need a restart.
+TEMPLATES = [
+    {
+        **TEMPLATES[0],
+        'APP_DIRS': False,
+        'OPTIONS': {
+            **TEMPLATES[0]['OPTIONS'],
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
+        },
+    },
+]
+TEMPLATES_PRECOMPILE = True